@@ -15,3 +15,6 @@ class Context:
         self.parent: Self | None = parent
         self.parent_entry_pos: Position | None = parent_entry_pos
         self.symbol_table: SymbolTable = SymbolTable()
+        # Locals of a function call, indexed by the slots the resolver assigned.
+        self.frame: list[Any] | None = None
+        self.slots: dict[str, int] | None = None
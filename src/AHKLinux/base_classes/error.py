@@ -33,12 +33,11 @@ class Error:
             if not context or not pos:
                 return result
             result = get_call_stack(context.parent, context.parent_entry_pos, result)
+            line: int = pos.line
             result += " File: '{}', line {}, in {}\n".format(
-                pos.filename, pos.line, context.display_name
-            )
-            result += "   {}\n".format(
-                pos.ftext.strip().split("\n")[pos.line - 1].strip()
+                pos.filename, line, context.display_name
             )
+            result += "   {}\n".format(pos.source.get_line_text(line).strip())
             return result
 
         result = get_call_stack(context, pos, result)
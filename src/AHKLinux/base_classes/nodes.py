@@ -1,42 +1,71 @@
 from typing import Any
 
 from base_classes.position import Position
+from base_classes.template import Template
 from base_classes.tokens import Token
 from constants import T_DOT
 
 
 class NumberNode:
+    __slots__ = ("tok",)
+
     def __init__(self, tok: Token) -> None:
         self.tok: Token = tok
-        self.pos_start: Position = self.tok.pos_start
-        self.pos_end: Position = self.tok.pos_end
+
+    @property
+    def pos_start(self) -> Position:
+        return self.tok.pos_start
+
+    @property
+    def pos_end(self) -> Position:
+        return self.tok.pos_end
 
     def __repr__(self) -> str:
         return f"{self.tok}"
 
 
 class StringNode:
+    __slots__ = ("tok", "quoted", "template")
+
     def __init__(self, tok: Token, quoted: bool = True) -> None:
         self.tok: Token = tok
         self.quoted: bool = quoted
-        self.pos_start: Position = self.tok.pos_start
-        self.pos_end: Position = self.tok.pos_end
+        # '%var%' references of an unquoted string, parsed once.
+        self.template: Template | None = None if quoted else Template(tok.value)
+
+    @property
+    def pos_start(self) -> Position:
+        return self.tok.pos_start
+
+    @property
+    def pos_end(self) -> Position:
+        return self.tok.pos_end
 
     def __repr__(self) -> str:
         return f"{self.tok}"
 
 
 class BooleanNode:
+    __slots__ = ("tok",)
+
     def __init__(self, tok: Token) -> None:
         self.tok: Token = tok
-        self.pos_start: Position = self.tok.pos_start
-        self.pos_end: Position = self.tok.pos_end
+
+    @property
+    def pos_start(self) -> Position:
+        return self.tok.pos_start
+
+    @property
+    def pos_end(self) -> Position:
+        return self.tok.pos_end
 
     def __repr__(self) -> str:
         return f"{self.tok}"
 
 
 class ArrayNode:
+    __slots__ = ("value_list", "pos_start", "pos_end")
+
     def __init__(
         self, value_list: list[Any], pos_start: Position, pos_end: Position
     ) -> None:
@@ -49,6 +78,8 @@ class ArrayNode:
 
 
 class AssociativeArrayNode:
+    __slots__ = ("value_dict", "pos_start", "pos_end")
+
     def __init__(
         self, value_dict: dict[Any, Any], pos_start: Position, pos_end: Position
     ) -> None:
@@ -61,6 +92,8 @@ class AssociativeArrayNode:
 
 
 class BinOpNode:
+    __slots__ = ("left_node", "op_tok", "right_node", "pos_start", "pos_end")
+
     def __init__(self, left_node: Any, op_tok: Token, right_node: Any) -> None:
         self.left_node: Any = left_node
         self.op_tok: Token = op_tok
@@ -75,6 +108,8 @@ class BinOpNode:
 
 
 class UnaryOpNode:
+    __slots__ = ("op_tok", "node", "pos_start", "pos_end")
+
     def __init__(self, op_tok: Token, node: Any) -> None:
         self.op_tok: Token = op_tok
         self.node: Any = node
@@ -86,6 +121,8 @@ class UnaryOpNode:
 
 
 class TernaryOpNode:
+    __slots__ = ("condition_node", "true_node", "false_node", "pos_start", "pos_end")
+
     def __init__(self, condition_node: Any, true_node: Any, false_node: Any) -> None:
         self.condition_node: Any = condition_node
         self.true_node: Any = true_node
@@ -98,10 +135,14 @@ class TernaryOpNode:
 
 
 class VarAssignNode:
+    __slots__ = ("var_name", "value_node", "scope", "slot", "pos_start", "pos_end")
+
     def __init__(self, var_name: Token, value_node: Any, scope: str = "local") -> None:
         self.var_name: Token = var_name
         self.value_node: Any = value_node
         self.scope: str = scope
+        # Index in the call frame, set by the resolver for function locals.
+        self.slot: int | None = None
 
         self.pos_start: Position = self.var_name.pos_start
         self.pos_end: Position = self.value_node.pos_end
@@ -111,28 +152,55 @@ class VarAssignNode:
 
 
 class L_VarAssignNode:
+    __slots__ = ("var_name", "string_node", "var_nodes", "slot")
+
     def __init__(self, var_name: Token, string_node: Any, var_nodes: list[Any]) -> None:
         self.var_name: Token = var_name
         self.string_node: Any = string_node
         self.var_nodes: list[Any] = var_nodes
-        self.pos_start: Position = self.var_name.pos_start
-        self.pos_end: Position = self.var_name.pos_end
+        self.slot: int | None = None
+
+    @property
+    def pos_start(self) -> Position:
+        return self.var_name.pos_start
+
+    @property
+    def pos_end(self) -> Position:
+        return self.var_name.pos_end
 
     def __repr__(self) -> str:
         return f"{self.var_name}:{self.string_node}"
 
 
 class VarAccessNode:
-    def __init__(self, var_name_tok: Token) -> None:
+    __slots__ = ("var_name_tok", "slot")
+
+    def __init__(self, var_name_tok: Token, slot: int | None = None) -> None:
         self.var_name_tok: Token = var_name_tok
-        self.pos_start: Position = self.var_name_tok.pos_start
-        self.pos_end: Position = self.var_name_tok.pos_end
+        self.slot: int | None = slot
+
+    @property
+    def pos_start(self) -> Position:
+        return self.var_name_tok.pos_start
+
+    @property
+    def pos_end(self) -> Position:
+        return self.var_name_tok.pos_end
 
     def __repr__(self) -> str:
         return f"{self.var_name_tok}"
 
 
 class ObjectAssignNode:
+    __slots__ = (
+        "access_node",
+        "key",
+        "access_method",
+        "value_node",
+        "pos_start",
+        "pos_end",
+    )
+
     def __init__(
         self, access_node: Any, key: Any, access_method: str, value_node: Any
     ) -> None:
@@ -148,6 +216,8 @@ class ObjectAssignNode:
 
 
 class ObjectAccessNode:
+    __slots__ = ("access_node", "key", "access_method", "pos_start", "pos_end")
+
     def __init__(self, access_node: Any, key: Any, access_method: Any) -> None:
         self.access_node: Any = access_node
         self.key: Any = key
@@ -160,22 +230,34 @@ class ObjectAccessNode:
 
 
 class ObjectKeyNode:
+    __slots__ = ("node", "name", "slot")
+
     def __init__(self, node: Any) -> None:
         self.node: Any = node
+        # Slot of the variable a token key names when it is concatenated.
+        self.slot: int | None = None
         if isinstance(self.node, Token):
             self.name: Any | None = self.node.value
         elif isinstance(self.node, UnaryOpNode) or isinstance(self.node, BinOpNode):
             self.name: Any | None = None
         else:
             self.name: Any | None = self.node.tok.value
-        self.pos_start: Position = self.node.pos_start
-        self.pos_end: Position = self.node.pos_end
+
+    @property
+    def pos_start(self) -> Position:
+        return self.node.pos_start
+
+    @property
+    def pos_end(self) -> Position:
+        return self.node.pos_end
 
     def __repr__(self) -> str:
         return f"{self.node}"
 
 
 class IfNode:
+    __slots__ = ("condition_node", "if_body", "pos_start", "pos_end")
+
     def __init__(self, condition_node: Any, if_body: list[Any]) -> None:
         self.condition_node: Any = condition_node
         self.if_body: list[Any] = if_body
@@ -191,6 +273,8 @@ class IfNode:
 
 
 class IfElseNode:
+    __slots__ = ("condition_node", "if_body", "else_body", "pos_start", "pos_end")
+
     def __init__(
         self, condition_node: Any, if_body: list[Any], else_body: list[Any]
     ) -> None:
@@ -210,10 +294,14 @@ class IfElseNode:
 
 
 class FunctionDeclareNode:
+    __slots__ = ("name", "parameters", "body", "slots", "pos_start", "pos_end")
+
     def __init__(self, name: Token, parameters: list[Any], body: list[Any]) -> None:
         self.name: Token = name
         self.parameters: list[Any] = parameters
         self.body: list[Any] = body
+        # Casefolded local name -> frame slot, set by the resolver.
+        self.slots: dict[str, int] | None = None
         self.pos_start: Position = name.pos_start
         self.pos_end: Position = (
             self.body[-1].pos_end
@@ -226,6 +314,8 @@ class FunctionDeclareNode:
 
 
 class FunctionCallNode:
+    __slots__ = ("name", "parameters", "pos_start", "pos_end")
+
     def __init__(self, name: Token, parameters: list[Any]) -> None:
         self.name: Token = name
         self.parameters: list[Any] = parameters
@@ -239,6 +329,8 @@ class FunctionCallNode:
 
 
 class ReturnNode:
+    __slots__ = ("node", "pos_start", "pos_end")
+
     def __init__(self, node: Any) -> None:
         self.node: Any = node
         self.pos_start: Position | None = (
@@ -253,11 +345,43 @@ class ReturnNode:
 
 
 class CommandNode:
+    __slots__ = ("name", "args")
+
     def __init__(self, name: Token, **kwargs) -> None:
         self.name: Token = name
         self.args: dict[Any, Any] = kwargs
-        self.pos_start: Position = name.pos_start
-        self.pos_end: Position = name.pos_end
+
+    @property
+    def pos_start(self) -> Position:
+        return self.name.pos_start
+
+    @property
+    def pos_end(self) -> Position:
+        return self.name.pos_end
 
     def __repr__(self) -> str:
         return f"{self.name} {self.args}"
+
+
+NODE_CLASSES: tuple[type, ...] = (
+    NumberNode,
+    StringNode,
+    BooleanNode,
+    ArrayNode,
+    AssociativeArrayNode,
+    BinOpNode,
+    UnaryOpNode,
+    TernaryOpNode,
+    VarAssignNode,
+    L_VarAssignNode,
+    VarAccessNode,
+    ObjectAssignNode,
+    ObjectAccessNode,
+    ObjectKeyNode,
+    IfNode,
+    IfElseNode,
+    FunctionDeclareNode,
+    FunctionCallNode,
+    ReturnNode,
+    CommandNode,
+)
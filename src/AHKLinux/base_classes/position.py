@@ -1,18 +1,70 @@
+from bisect import bisect_right
 from typing import Any, Self
 
 
-class Position:
-    def __init__(self, filename: str, idx: int, line: int, ftext: str) -> None:
+class Source:
+    def __init__(self, filename: str, text: str, first_line: int = 1) -> None:
         self.filename: str = filename
+        self.text: str = text
+        # Line number of the first line of text, for sources that hold a slice
+        # of a larger file.
+        self.first_line: int = first_line
+        # Set when the slice can move within the file, its first_line property
+        # then gives the current line instead.
+        self.line_origin: Any = None
+        self.line_starts: list[int] | None = None
+
+    def get_first_line(self) -> int:
+        if self.line_origin is not None:
+            return self.line_origin.first_line
+        return self.first_line
+
+    def get_line_starts(self) -> list[int]:
+        # Built on the first line lookup only, a successful run never pays for it.
+        if self.line_starts is None:
+            line_starts: list[int] = [0]
+            idx: int = self.text.find("\n")
+            while idx != -1:
+                line_starts.append(idx + 1)
+                idx = self.text.find("\n", idx + 1)
+            self.line_starts = line_starts
+        return self.line_starts
+
+    def get_line(self, idx: int) -> int:
+        return bisect_right(self.get_line_starts(), idx) + self.get_first_line() - 1
+
+    def get_line_text(self, line: int) -> str:
+        line_starts: list[int] = self.get_line_starts()
+        line -= self.get_first_line() - 1
+        if line < 1 or line > len(line_starts):
+            return ""
+        start: int = line_starts[line - 1]
+        end: int = line_starts[line] - 1 if line < len(line_starts) else len(self.text)
+        return self.text[start:end]
+
+
+class Position:
+    __slots__ = ("source", "idx")
+
+    def __init__(self, source: Source, idx: int) -> None:
+        self.source: Source = source
         self.idx: int = idx
-        self.line: int = line
-        self.ftext: str = ftext
 
-    def advance(self, current_char: Any) -> Self:
+    @property
+    def filename(self) -> str:
+        return self.source.filename
+
+    @property
+    def line(self) -> int:
+        return self.source.get_line(self.idx)
+
+    @property
+    def ftext(self) -> str:
+        return self.source.text
+
+    def advance(self, current_char: Any = None) -> Self:
         self.idx += 1
-        if current_char == "\n":
-            self.line += 1
         return self
 
     def copy(self) -> Self:
-        return Position(self.filename, self.idx, self.line, self.ftext)
+        return Position(self.source, self.idx)
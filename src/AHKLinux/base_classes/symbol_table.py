@@ -2,28 +2,37 @@ from typing import Any
 
 
 class SymbolTable:
-    def __init__(self, symbols: dict[str, Any] = {}) -> None:
-        self.symbols: dict[str, Any] = symbols
+    """
+    Variables and functions of one scope. Names are case insensitive, so the
+    symbols are keyed on the casefolded name; the spelling a name was first set
+    with is kept in `names` for display.
+    """
+
+    def __init__(self, symbols: dict[str, Any] | None = None) -> None:
+        self.symbols: dict[str, Any] = {}
+        self.names: dict[str, str] = {}
         self.parent: SymbolTable | None = None
+        for name, value in (symbols or {}).items():
+            self.set(name, value)
 
     def get(self, name: str) -> Any:
-        for name_ in self.symbols:
-            if name_.lower() == name.lower():
-                return self.symbols[name_][0]
+        entry: Any = self.symbols.get(name.casefold())
+        if entry is not None:
+            return entry[0]
 
     def set(self, name: str, value: tuple[Any, bool]) -> None:
-        for name_ in self.symbols:
-            if name_.lower() == name.lower():
-                self.symbols[name_] = value
-                break
-        else:
-            self.symbols[name] = value
+        key: str = name.casefold()
+        if key not in self.symbols:
+            self.names[key] = name
+        self.symbols[key] = value
 
     def remove(self, name: str) -> None:
-        del self.symbols[name]
+        key: str = name.casefold()
+        del self.symbols[key]
+        del self.names[key]
 
     def global_from_child(self, name: str) -> Any | bool:
-        for name_ in self.symbols.keys():
-            if name_.lower() == name.lower():
-                return self.symbols[name_][1]
+        entry: Any = self.symbols.get(name.casefold())
+        if entry is not None:
+            return entry[1]
         return False
@@ -0,0 +1,29 @@
+import re
+
+# A '%name%' reference inside an unquoted string, the group is the name.
+VAR_REFERENCE: re.Pattern = re.compile(r"%\s*([a-zA-Z0-9_@#$]*)\s*%")
+
+
+class Template:
+    """
+    An unquoted string split once into its literal text and the names of the
+    variables it references, so that every evaluation only has to look the
+    names up and join the pieces.
+
+    `parts` alternates literal text and names, names at the odd indexes:
+    'a %b% c' is ['a ', 'b', ' c'].
+    """
+
+    __slots__ = ("parts", "names")
+
+    def __init__(self, text: str) -> None:
+        self.parts: list[str] = VAR_REFERENCE.split(text)
+        self.names: list[str] = self.parts[1::2]
+
+    def render(self, values: list[str]) -> str:
+        parts: list[str] = self.parts.copy()
+        parts[1::2] = values
+        return "".join(parts)
+
+    def __repr__(self) -> str:
+        return "Template({})".format(self.parts)
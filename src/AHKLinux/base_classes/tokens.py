@@ -4,6 +4,8 @@ from base_classes.position import Position
 
 
 class Token:
+    __slots__ = ("type", "value", "pos_start", "pos_end")
+
     def __init__(
         self,
         type_: str,
@@ -13,9 +15,11 @@ class Token:
     ) -> None:
         self.type: str = type_
         self.value: Any | None = value
+        # Positions are never mutated once handed to a token, so a single-character
+        # token shares one Position for both ends.
         if pos_start:
-            self.pos_start: Position = pos_start.copy()
-            self.pos_end: Position = pos_start.copy()
+            self.pos_start: Position = pos_start
+            self.pos_end: Position = pos_start
 
         if pos_end:
             self.pos_end: Position = pos_end
@@ -19,3 +19,8 @@ class Value:
     def set_context(self, context: Context | None = None) -> Self:
         self.context: Context | None = context
         return self
+
+    @property
+    def boolean(self) -> bool:
+        # Only computed when a condition or a logical operator asks for it.
+        return True if self.value else False
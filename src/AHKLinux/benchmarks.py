@@ -0,0 +1,387 @@
+"""
+Micro-benchmarks for the interpreter pipeline.
+Run from src/AHKLinux/:
+    python3 benchmarks.py              (every benchmark)
+    python3 benchmarks.py lex_string   (benchmarks whose name contains "lex_string")
+Timing benchmarks report the best run, memory benchmarks report how much memory
+the object returned by the benchmark keeps alive and allocation benchmarks how
+many memory blocks it keeps alive per element.
+"""
+
+import argparse
+import timeit
+import tracemalloc
+from typing import Any, Callable
+
+from base_classes.context import Context
+from lexer.lexer import Lexer
+from lexer.regex_lexer import RegexLexer
+from interpreter.interpreter import Interpreter
+from interpreter.trace import TextSink, TraceSink
+from main import ENGINES
+from parser.incremental import IncrementalDocument
+from parser.parser import Parser
+
+LEXERS: dict[str, Any] = {"classic": Lexer, "regex": RegexLexer}
+MEGABYTE: int = 1024 * 1024
+
+# name -> factory; the factory builds the input once and returns the callable to
+# measure.
+BENCHMARKS: dict[str, Callable[[], Callable[[], Any]]] = {}
+MEMORY_BENCHMARKS: dict[str, Callable[[], Callable[[], Any]]] = {}
+ALLOCATION_BENCHMARKS: dict[str, Callable[[], Callable[[], list[Any]]]] = {}
+
+
+def benchmark(name: str) -> Callable:
+    def register(factory: Callable[[], Callable[[], Any]]) -> Callable:
+        BENCHMARKS[name] = factory
+        return factory
+
+    return register
+
+
+def memory_benchmark(name: str) -> Callable:
+    def register(factory: Callable[[], Callable[[], Any]]) -> Callable:
+        MEMORY_BENCHMARKS[name] = factory
+        return factory
+
+    return register
+
+
+def allocation_benchmark(name: str) -> Callable:
+    def register(factory: Callable[[], Callable[[], list[Any]]]) -> Callable:
+        ALLOCATION_BENCHMARKS[name] = factory
+        return factory
+
+    return register
+
+
+def generate_script(lines: int) -> str:
+    return "".join(
+        'v{0} := a + b * 3 - c / (d + {0}) . "s"\n'
+        "f{0}(x, y) {{\n"
+        "    return x * y + {0}\n"
+        "}}\n"
+        "if (v{0} = 1) {{\n"
+        "    w := f{0}(v{0}, 2)\n"
+        "}}\n".format(idx)
+        for idx in range(lines // 7)
+    )
+
+
+def parse(text: str) -> list[Any]:
+    context: Context = Context("<module>")
+    tokens, _ = RegexLexer(text, "<benchmark>", context).tokenize()
+    ast, _ = Parser(tokens, context).parse()
+    return [res.node for res in ast]
+
+
+def lex(lexer_class: Any, text: str) -> Callable[[], Any]:
+    def run() -> Any:
+        tokens, error = lexer_class(text, "<benchmark>", Context("<module>")).tokenize()
+        if error:
+            raise RuntimeError(error.as_string())
+        return tokens
+
+    return run
+
+
+for lexer_name, lexer_class in LEXERS.items():
+
+    @benchmark("lex_string_1mb[{}]".format(lexer_name))
+    def lex_string(lexer_class: Any = lexer_class) -> Callable[[], Any]:
+        body: str = ('lorem ipsum ""quoted"" ' * (MEGABYTE // 24))[:MEGABYTE]
+        return lex(lexer_class, 'x := "{}"\n'.format(body))
+
+    @benchmark("lex_u_string_1mb[{}]".format(lexer_name))
+    def lex_u_string(lexer_class: Any = lexer_class) -> Callable[[], Any]:
+        body: str = ("continuation section text " * (MEGABYTE // 26))[:MEGABYTE]
+        return lex(lexer_class, "x = {}\n".format(body))
+
+    @benchmark("lex_identifiers_1mb[{}]".format(lexer_name))
+    def lex_identifiers(lexer_class: Any = lexer_class) -> Callable[[], Any]:
+        line: str = "some_long_variable_name := another_variable_name + 0x1f * 2.5\n"
+        return lex(lexer_class, line * (MEGABYTE // len(line)))
+
+
+@benchmark("parse_expressions")
+def parse_expressions() -> Callable[[], Any]:
+    text: str = "".join(
+        'v{0} := a{0} + b * 3 - c / (d + {0}) . "s" + f(x, y * 2)\n'.format(idx)
+        for idx in range(5000)
+    )
+    tokens, _ = RegexLexer(text, "<benchmark>", Context("<module>")).tokenize()
+
+    def run() -> Any:
+        return Parser(tokens, Context("<module>")).parse()
+
+    return run
+
+
+@benchmark("incremental_newline_edits_10k_lines")
+def incremental_newline_edits() -> Callable[[], Any]:
+    # Pressing Enter near the top moves every later line of the file down.
+    text: str = "".join("v{0} := {0} + 1\n".format(idx) for idx in range(10000))
+    document: IncrementalDocument = IncrementalDocument(
+        text, "<benchmark>", Context("<module>")
+    )
+
+    def run() -> Any:
+        for _ in range(1000):
+            document.edit(3, 3, "\n")
+
+    return run
+
+
+@memory_benchmark("ast_memory_100k_lines")
+def ast_memory() -> Callable[[], Any]:
+    text: str = generate_script(100000)
+    return lambda: parse(text)
+
+
+@memory_benchmark("array_memory_100k_numbers")
+def array_memory() -> Callable[[], Any]:
+    # Only the evaluated array is measured, the literal is parsed beforehand.
+    text: str = "v := [{}]\n".format(", ".join(str(idx) for idx in range(100000)))
+    node: Any = parse(text)[0].value_node
+    interpreter: Interpreter = Interpreter()
+    return lambda: interpreter.visit(node, Context("<module>")).value
+
+
+# The language has no comparison operators, the base cases of the recursive
+# functions test numbers for zero through their truth value.
+FIB_SCRIPT: str = (
+    "fib(n) {\n"
+    "    r := n\n"
+    "    if (n - 1) {\n"
+    "        if (n) {\n"
+    "            a := fib(n - 1)\n"
+    "            b := fib(n - 2)\n"
+    "            r := a + b\n"
+    "        }\n"
+    "    }\n"
+    "    return r\n"
+    "}\n"
+)
+ACKERMANN_SCRIPT: str = (
+    "ack(m, n) {\n"
+    "    r := n + 1\n"
+    "    if (m) {\n"
+    "        if (n) {\n"
+    "            t := ack(m, n - 1)\n"
+    "            r := ack(m - 1, t)\n"
+    "        } else {\n"
+    "            r := ack(m - 1, 1)\n"
+    "        }\n"
+    "    }\n"
+    "    return r\n"
+    "}\n"
+)
+
+CALLS_SCRIPT: str = (
+    "a := 1\n"
+    "f(x, y) {\n"
+    "    z := (x + y) * 3 - x / 2 + (y - x) * (x + 2)\n"
+    "    w := z * (y - 1) + x * (z - y) / 4\n"
+    "    return (z + w) * 2 - (x + y + z) / 3\n"
+    "}\n" + "".join("v := f(a, {})\n".format(idx) for idx in range(20000))
+)
+
+
+def interpret(engine_class: Any, text: str, debug: bool = True) -> Callable[[], Any]:
+    nodes: list[Any] = parse(text)
+
+    def run() -> Any:
+        context: Context = Context("<module>")
+        trace: TraceSink = TextSink() if debug else TraceSink()
+        interpreter: Any = engine_class(trace=trace)
+        for node in nodes:
+            interpreter.visit(node, context)
+            # The -d lines are formatted but not printed.
+            trace.discard()
+
+    return run
+
+
+for engine_name, engine_class in ENGINES.items():
+
+    @benchmark("interpret_arithmetic[{}]".format(engine_name))
+    def interpret_arithmetic(engine_class: Any = engine_class) -> Callable[[], Any]:
+        # Every statement runs once, so compiling engines pay full price here.
+        text: str = "".join(
+            "v := (a + {0}) * 3 - b / 2 + c * (d - {0})\n".format(idx)
+            for idx in range(20000)
+        )
+        return interpret(engine_class, "a := 1\nb := 2\nc := 3\nd := 4\n" + text)
+
+    @benchmark("interpret_calls[{}]".format(engine_name))
+    def interpret_calls(engine_class: Any = engine_class) -> Callable[[], Any]:
+        return interpret(engine_class, CALLS_SCRIPT)
+
+    @benchmark("interpret_calls_quiet[{}]".format(engine_name))
+    def interpret_calls_quiet(engine_class: Any = engine_class) -> Callable[[], Any]:
+        # What a run without -d does, no debug messages are formatted.
+        return interpret(engine_class, CALLS_SCRIPT, debug=False)
+
+    @benchmark("interpret_strings[{}]".format(engine_name))
+    def interpret_strings(engine_class: Any = engine_class) -> Callable[[], Any]:
+        # A quoted string right of '.' is looked up as a variable, so only
+        # variables are concatenated.
+        text: str = "".join('v := f("{}", sep)\n'.format(idx) for idx in range(20000))
+        return interpret(
+            engine_class,
+            'sep := "-"\n'
+            "f(x, s) {\n"
+            "    y := x . s . x . s . x\n"
+            "    return y . s . y . s . x\n"
+            "}\n" + text,
+        )
+
+
+for engine_name, engine_class in ENGINES.items():
+
+    @benchmark("interpret_templates[{}]".format(engine_name))
+    def interpret_templates(engine_class: Any = engine_class) -> Callable[[], Any]:
+        # The same unquoted string is expanded with new values on every call.
+        text: str = "".join("v := f({}, a)\n".format(idx) for idx in range(20000))
+        return interpret(
+            engine_class,
+            'a := "x"\n'
+            "f(x, y) {\n"
+            "    z = item %x% of %y%, %x% again\n"
+            "    return z\n"
+            "}\n" + text,
+        )
+
+    @benchmark("recursion_fib_25[{}]".format(engine_name))
+    def recursion_fib(engine_class: Any = engine_class) -> Callable[[], Any]:
+        return interpret(engine_class, FIB_SCRIPT + "v := fib(25)\n")
+
+    @benchmark("recursion_ackermann_3_3[{}]".format(engine_name))
+    def recursion_ackermann(engine_class: Any = engine_class) -> Callable[[], Any]:
+        # ack(3, 4) already nests deeper than Python's default recursion limit.
+        text: str = "v := ack(3, 3)\n" * 10
+        return interpret(engine_class, ACKERMANN_SCRIPT + text)
+
+
+@benchmark("concat_100k_fragments")
+def concat_fragments() -> Callable[[], Any]:
+    # Each statement appends to the string the previous one built.
+    text: str = 'p := "fragment "\ns := p\n' + "s := s . p\n" * 100000
+    return interpret(ENGINES["tree"], text, debug=False)
+
+
+@benchmark("visit_dispatch_1m_nodes")
+def visit_dispatch() -> Callable[[], Any]:
+    # A cheap node, so the time is dominated by the per-node cost of visit().
+    node: Any = parse("x := 1\n")[0].value_node
+    context: Context = Context("<module>")
+    interpreter: Interpreter = Interpreter()
+
+    def run() -> Any:
+        visit: Callable = interpreter.visit
+        for _ in range(1000000):
+            visit(node, context)
+
+    return run
+
+
+@benchmark("symbol_lookup_5000_globals")
+def symbol_lookup() -> Callable[[], Any]:
+    # Every read and write looks a name up among thousands of globals.
+    text: str = "".join("Var{0} := {0}\n".format(idx) for idx in range(5000))
+    text += "".join(
+        "w := var{} + VAR{}\n".format(idx, 4999 - idx) for idx in range(5000)
+    )
+    return interpret(ENGINES["tree"], text)
+
+
+@benchmark("object_100k_keys")
+def object_keys() -> Callable[[], Any]:
+    # One object grows to 100k keys, then each one is read back in another case.
+    text: str = "obj := {}\n"
+    text += "".join("obj.key{0} := {0}\n".format(idx) for idx in range(100000))
+    text += "".join("v := obj.KEY{}\n".format(idx) for idx in range(100000))
+    return interpret(ENGINES["tree"], text, debug=False)
+
+
+def evaluate(text: str) -> Callable[[], list[Any]]:
+    # Every value is kept, so each block allocated for it is still traced.
+    node: Any = parse("x := {}\n".format(text))[0].value_node
+    context: Context = Context("<module>")
+    interpreter: Interpreter = Interpreter()
+
+    def run() -> list[Any]:
+        visit: Callable = interpreter.visit
+        return [visit(node, context).value for _ in range(100000)]
+
+    return run
+
+
+@allocation_benchmark("allocations_arithmetic_result")
+def arithmetic_allocations() -> Callable[[], list[Any]]:
+    return evaluate("1 + 2")
+
+
+@allocation_benchmark("allocations_logical_result")
+def logical_allocations() -> Callable[[], list[Any]]:
+    return evaluate("1 and 0")
+
+
+def run_benchmarks(pattern: str, repeat: int, collect: bool = False) -> None:
+    # timeit turns the garbage collector off while timing, which hides the cost
+    # of code that leaves reference cycles behind.
+    setup: str = "import gc; gc.enable()" if collect else "pass"
+    for name, factory in BENCHMARKS.items():
+        if pattern not in name:
+            continue
+        func: Callable[[], Any] = factory()
+        best: float = min(timeit.repeat(func, setup, number=1, repeat=repeat))
+        print("{:<40} {:>10.4f}s".format(name, best))
+    for name, factory in MEMORY_BENCHMARKS.items():
+        if pattern not in name:
+            continue
+        func: Callable[[], Any] = factory()
+        tracemalloc.start()
+        result: Any = func()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        print("{:<40} {:>10.2f}MB".format(name, size / MEGABYTE))
+    for name, factory in ALLOCATION_BENCHMARKS.items():
+        if pattern not in name:
+            continue
+        func: Callable[[], list[Any]] = factory()
+        tracemalloc.start()
+        values: list[Any] = func()
+        snapshot: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        blocks: int = sum(stat.count for stat in snapshot.statistics("filename"))
+        print("{:<40} {:>10.2f} blocks".format(name, blocks / len(values)))
+        del values
+
+
+if __name__ == "__main__":
+    arg_parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        "pattern",
+        type=str,
+        nargs="?",
+        default="",
+        help="Only run benchmarks whose name contains this string.",
+    )
+    arg_parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of timed runs per benchmark, the best one is reported.",
+    )
+    arg_parser.add_argument(
+        "-g",
+        "--gc",
+        action="store_true",
+        help="Keep the garbage collector enabled during timed runs.",
+    )
+    args: argparse.Namespace = arg_parser.parse_args()
+    run_benchmarks(args.pattern, args.repeat, args.gc)
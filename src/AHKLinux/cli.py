@@ -26,11 +26,63 @@ def start() -> int:
         const=input,
         help="To run the interpreter in debug mode.",
     )
+    arg_parser.add_argument(
+        "-l",
+        "--lexer",
+        type=str,
+        choices=["classic", "regex"],
+        default="classic",
+        help="The tokenizer engine to use.",
+    )
+    arg_parser.add_argument(
+        "--compact-tokens",
+        action="store_true",
+        help="Store tokens in compact parallel arrays to save memory.",
+    )
+    arg_parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Lex the whole file before parsing instead of streaming tokens.",
+    )
+    arg_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the on-disk cache of parsed scripts.",
+    )
+    arg_parser.add_argument(
+        "-e",
+        "--engine",
+        type=str,
+        choices=["tree", "closure", "vm", "python"],
+        default="tree",
+        help="The execution engine to use.",
+    )
+    arg_parser.add_argument(
+        "--disassemble",
+        action="store_true",
+        help="Print the bytecode the 'vm' engine would run instead of running the script.",
+    )
+    arg_parser.add_argument(
+        "--trace",
+        type=str,
+        metavar="FILE",
+        help="Write the steps the interpreter has taken to FILE as JSON lines instead of printing the debug output.",
+    )
     args: argparse.Namespace = arg_parser.parse_args()
     input_file: str = args.input
     debug_mode: bool = True if args.debug is not None else False
 
-    return main(input_file, debug_mode)
+    return main(
+        input_file,
+        debug_mode,
+        args.lexer,
+        args.compact_tokens,
+        not args.no_stream,
+        not args.no_cache,
+        args.engine,
+        args.disassemble,
+        args.trace,
+    )
 
 
 if __name__ == "__main__":
@@ -38,3 +38,4 @@ KEYWORDS: list[str] = ["global", "and", "or", "not", "if", "else", "return"]
 BOOLEANS: list[str] = ["true", "false"]
 COMMANDS: list[str] = ["MsgBox"]
 ESCAPE_CHARS: dict[str, str] = {"`n": "\n", "`t": "\t", "`r": "\r"}
+VERSION: str = "0.0.1"
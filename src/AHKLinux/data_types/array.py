@@ -1,16 +1,101 @@
-from typing import Any, Self
+import array
+from typing import Any, Iterator, Self
 
+from base_classes.context import Context
 from base_classes.value import Value
-from data_types.boolean import Boolean
+from data_types.number import Number
 from error_classes.runtime_error import RunTimeError
 
+# array.array type codes for the Python types a number buffer can hold.
+TYPECODES: dict[type, str] = {int: "q", float: "d"}
+
+
+class NumberBuffer:
+    """
+    The elements of an array whose elements are all numbers of one type, kept
+    unboxed in an array.array. A Number is only built when an element is read.
+
+    Storing a value the buffer cannot hold turns it into a list of Numbers in
+    place, so every Array sharing the buffer keeps seeing the same elements.
+    """
+
+    __slots__ = ("numbers", "items", "type", "context")
+
+    def __init__(self, numbers: array.array, type_: str, context: Context | None):
+        self.numbers: array.array | None = numbers
+        self.items: list[Any] | None = None
+        self.type: str = type_
+        self.context: Context | None = context
+
+    def __len__(self) -> int:
+        if self.items is not None:
+            return len(self.items)
+        return len(self.numbers)
+
+    def __getitem__(self, idx: int) -> Any:
+        if self.items is not None:
+            return self.items[idx]
+        return Number(self.numbers[idx], self.type).set_context(self.context)
+
+    def __setitem__(self, idx: int, value: Any) -> None:
+        if self.items is None:
+            if (
+                isinstance(value, Number)
+                and value.type == self.type
+                and type(value.value) is type(self.numbers[idx])
+            ):
+                try:
+                    self.numbers[idx] = value.value
+                    return
+                except OverflowError:
+                    pass
+            self.items = [
+                Number(number, self.type).set_context(self.context)
+                for number in self.numbers
+            ]
+            self.numbers = None
+        self.items[idx] = value
+
+    def __iter__(self) -> Iterator[Any]:
+        if self.items is not None:
+            return iter(self.items)
+        return (self[idx] for idx in range(len(self.numbers)))
+
+
+def pack(elements: list[Any]) -> list[Any] | NumberBuffer:
+    # The elements stay a list unless they are all numbers of the same type
+    # holding the same Python type.
+    if not elements or not isinstance(elements[0], Number):
+        return elements
+    first: Number = elements[0]
+    kind: type = type(first.value)
+    typecode: str | None = TYPECODES.get(kind)
+    if typecode is None:
+        return elements
+    for element in elements:
+        if (
+            not isinstance(element, Number)
+            or element.type != first.type
+            or type(element.value) is not kind
+        ):
+            return elements
+    try:
+        numbers: array.array = array.array(
+            typecode, [element.value for element in elements]
+        )
+    except OverflowError:
+        return elements
+    return NumberBuffer(numbers, first.type, first.context)
+
 
 class Array(Value):
-    def __init__(self, value: list[Any]):
+    def __init__(self, value: list[Any] | NumberBuffer):
         super().__init__()
         self.value: Any = value
-        self.boolean: bool = True if self.value else False
-        self.repr_boolean: Boolean = Boolean("true") if self.value else Boolean("false")
+
+    @classmethod
+    def from_elements(cls, elements: list[Any]) -> Self:
+        return cls(pack(elements))
 
     def set(self, idx, value) -> tuple[int, RunTimeError | None]:
         if int(idx) - 1 < len(self.value) and int(idx) - 1 >= 0:
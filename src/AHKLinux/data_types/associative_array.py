@@ -1,35 +1,54 @@
-from typing import Any, Self
+from typing import Any, Iterable, Self
 
 from base_classes.value import Value
-from constants import DIGITS, LETTERS, T_DECIMAL
-from data_types.boolean import Boolean
+from constants import T_DECIMAL
 from data_types.number import Number
 from data_types.string import String
 from error_classes.runtime_error import RunTimeError
 
 
+def normalize_key(key: Any) -> Any:
+    # String keys are case-insensitive, numbers are their own key.
+    if isinstance(key, str):
+        return key.casefold()
+    return key
+
+
 class AssociativeArray(Value):
-    def __init__(self, value: dict[Any, Any]) -> None:
+    """
+    An object, its value maps every normalized key to the key as it was first
+    written and the value stored under it. Looking a key up is a single dict
+    access and the dict keeps the order the keys were added in for display.
+    """
+
+    def __init__(self, value: dict[Any, tuple[Any, Any]]) -> None:
         super().__init__()
-        self.value: dict[Any, Any] = value
-        self.boolean: bool = True if self.value else False
-        self.repr_boolean: Boolean = Boolean("true") if self.value else Boolean("false")
-
-    def set(self, key: str, value: Any) -> None:
-        for key_ in self.value:
-            if key_.value == key:
-                self.value[key_] = value
-                break
+        self.value: dict[Any, tuple[Any, Any]] = value
+
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[Any, Any]]) -> Self:
+        # items holds the evaluated key and value of every pair in the literal.
+        value: dict[Any, tuple[Any, Any]] = {}
+        for key, item in items:
+            normalized: Any = normalize_key(key.value)
+            entry: tuple[Any, Any] | None = value.get(normalized)
+            value[normalized] = (key if entry is None else entry[0], item)
+        return cls(value)
+
+    def set(self, key: Any, value: Any) -> None:
+        normalized: Any = normalize_key(key)
+        entry: tuple[Any, Any] | None = self.value.get(normalized)
+        if entry is not None:
+            self.value[normalized] = (entry[0], value)
+        elif isinstance(key, str):
+            self.value[normalized] = (String(key), value)
         else:
-            if key in DIGITS:
-                self.value[Number(key, T_DECIMAL)] = value
-            elif key in LETTERS + "_":
-                self.value[String(key)] = value
-
-    def get(self, key) -> tuple[Any | None, RunTimeError | None]:
-        for key_ in self.value:
-            if key_.value == key:
-                return self.value[key_], None
+            self.value[normalized] = (Number(key, T_DECIMAL), value)
+
+    def get(self, key: Any) -> tuple[Any | None, RunTimeError | None]:
+        entry: tuple[Any, Any] | None = self.value.get(normalize_key(key))
+        if entry is not None:
+            return entry[1], None
         return None, RunTimeError(
             self.pos_start,
             self.pos_end,
@@ -44,13 +63,11 @@ class AssociativeArray(Value):
         return copy
 
     def __repr__(self) -> str:
-        rep_str = "{"
-        count_ = 0
-        for key, value in self.value.items():
-            if count_ != len(self.value) - 1:
-                rep_str += str(key.__repr__()) + ":" + str(value.__repr__()) + ","
-            else:
-                rep_str += str(key.__repr__()) + ":" + str(value.__repr__())
-            count_ += 1
-        rep_str += "}"
-        return rep_str
+        return (
+            "{"
+            + ",".join(
+                "{}:{}".format(key.__repr__(), value.__repr__())
+                for key, value in self.value.values()
+            )
+            + "}"
+        )
@@ -1,32 +1,51 @@
-from typing import Self
+from typing import Any, Self
 
+from base_classes.context import Context
+from base_classes.position import Position
 from base_classes.value import Value
 
 
 class Boolean(Value):
+    """
+    Scripts only ever see the two shared instances TRUE and FALSE. They are
+    immutable: setting a position or a context on one keeps it unchanged, so a
+    boolean never points back into the script that produced it.
+    """
+
     def __init__(self, value: str) -> None:
-        super().__init__()
         self.value: str = value
-        self.boolean: bool = True if self.value == "true" else False
-        self.repr_boolean: Self = self
-
-    def compare(self, other: Self, operator: str) -> Self:
-        if operator == "and":
-            result = self.boolean and other.boolean
-            if result:
-                return Boolean("true")
-            return Boolean("false")
-        else:
-            result = self.boolean or other.boolean
-            if result:
-                return Boolean("true")
-            return Boolean("false")
+        self.pos_start: Position | None = None
+        self.pos_end: Position | None = None
+        self.context: Context | None = None
+
+    def set_pos(
+        self, pos_start: Position | None = None, pos_end: Position | None = None
+    ) -> Self:
+        return self
+
+    def set_context(self, context: Context | None = None) -> Self:
+        return self
+
+    @property
+    def boolean(self) -> bool:
+        return self.value == "true"
+
+    def compare(self, other: Any, operator: str) -> Self:
+        return evaluate_logical(self, other, operator)
 
     def copy(self) -> Self:
-        copy: Self = Boolean(self.value)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
+        return self
 
     def __repr__(self) -> str:
         return f"{self.value}"
+
+
+TRUE: Boolean = Boolean("true")
+FALSE: Boolean = Boolean("false")
+
+
+def evaluate_logical(left: Any, right: Any, operator: str) -> Boolean:
+    # 'and' or 'or' of any two values, both have already been evaluated.
+    if operator == "and":
+        return TRUE if left.boolean and right.boolean else FALSE
+    return TRUE if left.boolean or right.boolean else FALSE
@@ -4,11 +4,18 @@ from base_classes.value import Value
 
 
 class Function(Value):
-    def __init__(self, name: str, parameters: list[Any], body: list[Any]) -> None:
+    def __init__(
+        self,
+        name: str,
+        parameters: list[Any],
+        body: list[Any],
+        slots: dict[str, int],
+    ) -> None:
         super().__init__()
         self.name: str = name
         self.parameters: list[Any] = parameters
         self.body: list[Any] = body
+        self.slots: dict[str, int] = slots
 
     def __repr__(self) -> str:
         return r"{}({}){{}}".format(self.name, self.parameters, self.body)
@@ -2,51 +2,33 @@ from typing import Any, Self
 
 from base_classes.value import Value
 from constants import T_HEXADECIMAL
-from data_types.boolean import Boolean
 from error_classes.runtime_error import RunTimeError
 
 
 class Number(Value):
+    """
+    A number, the value is an int or a float. The type is the token type the
+    number was written as and only decides how it is displayed: hexadecimal
+    numbers hold a plain int that is formatted as '0x..' when printed.
+    """
+
     def __init__(self, value: Any, type_: str):
         super().__init__()
         self.value: Any = value
         self.type: str = type_
+
+    def result_type(self, other: Self) -> str:
+        # The result is hexadecimal only when both operands are.
         if self.type == T_HEXADECIMAL:
-            self.boolean = True if int(self.value, base=16) else False
-            self.repr_boolean = (
-                Boolean("true") if int(self.value, base=16) else Boolean("false")
-            )
-        else:
-            self.boolean = True if self.value else False
-            self.repr_boolean = Boolean("true") if self.value else Boolean("false")
+            return other.type
+        return self.type
 
     def added_to(self, other: Self) -> tuple[Self | None, RunTimeError | None]:
         if isinstance(other, Number):
-            if self.type == T_HEXADECIMAL and other.type == T_HEXADECIMAL:
-                return (
-                    Number(
-                        hex(int(self.value, base=16) + int(other.value, base=16)),
-                        self.type,
-                    ).set_context(self.context),
-                    None,
-                )
-            elif self.type == T_HEXADECIMAL and other.type != T_HEXADECIMAL:
-                return None, RunTimeError(
-                    other.pos_start,
-                    other.pos_end,
-                    "Invalid Hexadecimal addition",
-                    self.context,
-                )
-            elif self.type != T_HEXADECIMAL and other.type == T_HEXADECIMAL:
-                return None, RunTimeError(
-                    self.pos_start,
-                    self.pos_end,
-                    "Invalid Hexadecimal addition",
-                    self.context,
-                )
-
             return (
-                Number(self.value + other.value, self.type).set_context(self.context),
+                Number(self.value + other.value, self.result_type(other)).set_context(
+                    self.context
+                ),
                 None,
             )
         return None, RunTimeError(
@@ -58,30 +40,10 @@ class Number(Value):
 
     def subtracted_by(self, other: Self) -> tuple[Self | None, RunTimeError | None]:
         if isinstance(other, Number):
-            if self.type == T_HEXADECIMAL and other.type == T_HEXADECIMAL:
-                return (
-                    Number(
-                        hex(int(self.value, base=16) - int(other.value, base=16)),
-                        self.type,
-                    ),
-                    None,
-                )
-            elif self.type == T_HEXADECIMAL and other.type != T_HEXADECIMAL:
-                return None, RunTimeError(
-                    other.pos_start,
-                    other.pos_end,
-                    "Invalid Hexadecimal subtraction",
-                    self.context,
-                )
-            elif self.type != T_HEXADECIMAL and other.type == T_HEXADECIMAL:
-                return None, RunTimeError(
-                    self.pos_start,
-                    self.pos_end,
-                    "Invalid Hexadecimal subtraction",
-                    self.context,
-                )
             return (
-                Number(self.value - other.value, self.type).set_context(self.context),
+                Number(self.value - other.value, self.result_type(other)).set_context(
+                    self.context
+                ),
                 None,
             )
         return None, RunTimeError(
@@ -93,30 +55,10 @@ class Number(Value):
 
     def multiplied_by(self, other: Self) -> tuple[Self | None, RunTimeError | None]:
         if isinstance(other, Number):
-            if self.type == T_HEXADECIMAL and other.type == T_HEXADECIMAL:
-                return (
-                    Number(
-                        hex(int(self.value, base=16) * int(other.value, base=16)),
-                        self.type,
-                    ),
-                    None,
-                )
-            elif self.type == T_HEXADECIMAL and other.type != T_HEXADECIMAL:
-                return None, RunTimeError(
-                    other.pos_start,
-                    other.pos_end,
-                    "Invalid Hexadecimal multiplication",
-                    self.context,
-                )
-            elif self.type != T_HEXADECIMAL and other.type == T_HEXADECIMAL:
-                return None, RunTimeError(
-                    self.pos_start,
-                    self.pos_end,
-                    "Invalid Hexadecimal multiplication",
-                    self.context,
-                )
             return (
-                Number(self.value * other.value, self.type).set_context(self.context),
+                Number(self.value * other.value, self.result_type(other)).set_context(
+                    self.context
+                ),
                 None,
             )
         return None, RunTimeError(
@@ -128,44 +70,26 @@ class Number(Value):
 
     def divided_by(self, other: Self) -> tuple[Self | None, RunTimeError | None]:
         if isinstance(other, Number):
-            if self.type == T_HEXADECIMAL and other.type == T_HEXADECIMAL:
-                if int(other.value, base=16) == 0:
-                    return None, RunTimeError(
-                        other.pos_start,
-                        other.pos_end,
-                        "Division by zero not allowed.",
-                        self.context,
-                    )
-                return (
-                    Number(
-                        hex(int(int(self.value, base=16) / int(other.value, base=16))),
-                        self.type,
-                    ),
-                    None,
-                )
-            elif self.type == T_HEXADECIMAL and other.type != T_HEXADECIMAL:
-                return None, RunTimeError(
-                    other.pos_start,
-                    other.pos_end,
-                    "Invalid Hexadecimal addition",
-                    self.context,
-                )
-            elif self.type != T_HEXADECIMAL and other.type == T_HEXADECIMAL:
-                return None, RunTimeError(
-                    self.pos_start,
-                    self.pos_end,
-                    "Invalid Hexadecimal addition",
-                    self.context,
-                )
-            elif other.value == 0:
+            if other.value == 0:
                 return None, RunTimeError(
                     other.pos_start,
                     other.pos_end,
                     "Division by zero not allowed.",
                     self.context,
                 )
+            type_: str = self.result_type(other)
+            if type_ == T_HEXADECIMAL:
+                # Hexadecimal division truncates towards zero, in integers so
+                # values past 2**53 keep every digit.
+                quotient: int = abs(self.value) // abs(other.value)
+                if (self.value < 0) != (other.value < 0):
+                    quotient = -quotient
+                return (
+                    Number(quotient, type_).set_context(self.context),
+                    None,
+                )
             return (
-                Number(self.value / other.value, self.type).set_context(self.context),
+                Number(self.value / other.value, type_).set_context(self.context),
                 None,
             )
         return None, RunTimeError(
@@ -182,4 +106,6 @@ class Number(Value):
         return copy
 
     def __repr__(self) -> str:
+        if self.type == T_HEXADECIMAL:
+            return hex(self.value)
         return f"{self.value}"
@@ -1,35 +1,61 @@
 from typing import Self
 
 from base_classes.value import Value
-from constants import ESCAPE_CHARS
-from data_types.boolean import Boolean
 from error_classes.runtime_error import RunTimeError
 
 
 class String(Value):
+    """
+    A string kept as a list of pieces that are only joined when the value is
+    read, so a chain of concatenations appends instead of copying the text
+    built so far.
+
+    Concatenation results share one pieces list, a string owns its first
+    `length` pieces. The string owning the whole list appends in place, any
+    other copies its own pieces first, so no string ever sees the pieces
+    appended for another one.
+    """
+
     def __init__(self, value: str) -> None:
         super().__init__()
-        self.value: str = self.replace_escape_chars(value)
-        self.boolean: bool = True if self.value else False
-        self.repr_boolean: Boolean = Boolean("true") if self.value else Boolean("false")
+        self.pieces: list[str] = [value]
+        self.length: int = 1
+
+    @classmethod
+    def from_pieces(cls, pieces: list[str]) -> Self:
+        string: Self = cls.__new__(cls)
+        Value.__init__(string)
+        string.pieces = pieces
+        string.length = len(pieces)
+        return string
 
-    def replace_escape_chars(self, value: str) -> str:
-        for key_, value_ in ESCAPE_CHARS.items():
-            value = value.replace(key_, value_)
-        return value
+    @property
+    def value(self) -> str:
+        if self.length != 1:
+            pieces: list[str] = self.pieces
+            if len(pieces) != self.length:
+                pieces = pieces[: self.length]
+            self.pieces = ["".join(pieces)]
+            self.length = 1
+        return self.pieces[0]
 
     def concatenated_to(self, other: Self) -> tuple[Self | None, RunTimeError | None]:
-        if not isinstance(other, String) or self.value is None or other.value is None:
+        if not isinstance(other, String):
             return None, RunTimeError(
                 self.pos_start,
                 self.pos_end,
                 "Invalid String concatenation. A string can only be concatenated with another string.",
                 self.context,
             )
-        return String(self.value + other.value), None
+        pieces: list[str] = self.pieces
+        if len(pieces) != self.length:
+            pieces = pieces[: self.length]
+        pieces.append(other.value)
+        return String.from_pieces(pieces), None
 
     def copy(self) -> Self:
-        copy: Self = String(self.value)
+        copy: Self = String.from_pieces(self.pieces)
+        copy.length = self.length
         copy.set_pos(self.pos_start, self.pos_end)
         copy.set_context(self.context)
         return copy
@@ -0,0 +1,370 @@
+from typing import Any
+
+from base_classes.nodes import *
+from base_classes.tokens import Token
+from constants import *
+from data_types.number import Number
+
+# Every instruction is an opcode followed by one integer argument. Arguments of
+# instructions that need more than a number index the constants pool.
+MAKE_NUMBER: int = 0
+MAKE_STRING: int = 1
+MAKE_BOOLEAN: int = 2
+MAKE_EMPTY_STRING: int = 3
+MAKE_ARRAY: int = 4
+MAKE_ASSOCIATIVE_ARRAY: int = 5
+LOAD_NAME: int = 6
+STORE_NAME: int = 7
+CHECK_NUMBER: int = 8
+BINARY_ARITHMETIC: int = 9
+BINARY_LOGICAL: int = 10
+ACCESS_DOT: int = 11
+CONCATENATE: int = 12
+ACCESS_OBJECT: int = 13
+CONCATENATE_KEY: int = 14
+UNARY_NOT: int = 15
+UNARY_NEGATIVE: int = 16
+UNARY_POSITIVE: int = 17
+JUMP: int = 18
+POP_JUMP_IF_FALSE: int = 19
+PUSH_NONE: int = 20
+PREPARE_CALL: int = 21
+BIND_ARGUMENT: int = 22
+CALL_FUNCTION: int = 23
+CHECK_RETURN: int = 24
+RETURN_VALUE: int = 25
+WALK: int = 26
+LOAD_FAST: int = 27
+STORE_FAST: int = 28
+POP_RESULT: int = 29
+
+OPNAMES: list[str] = [
+    "MAKE_NUMBER",
+    "MAKE_STRING",
+    "MAKE_BOOLEAN",
+    "MAKE_EMPTY_STRING",
+    "MAKE_ARRAY",
+    "MAKE_ASSOCIATIVE_ARRAY",
+    "LOAD_NAME",
+    "STORE_NAME",
+    "CHECK_NUMBER",
+    "BINARY_ARITHMETIC",
+    "BINARY_LOGICAL",
+    "ACCESS_DOT",
+    "CONCATENATE",
+    "ACCESS_OBJECT",
+    "CONCATENATE_KEY",
+    "UNARY_NOT",
+    "UNARY_NEGATIVE",
+    "UNARY_POSITIVE",
+    "JUMP",
+    "POP_JUMP_IF_FALSE",
+    "PUSH_NONE",
+    "PREPARE_CALL",
+    "BIND_ARGUMENT",
+    "CALL_FUNCTION",
+    "CHECK_RETURN",
+    "RETURN_VALUE",
+    "WALK",
+    "LOAD_FAST",
+    "STORE_FAST",
+    "POP_RESULT",
+]
+# Instructions whose argument is a plain number or a jump target rather than an
+# index into the constants pool.
+NUMERIC_ARGUMENTS: tuple[int, ...] = (
+    MAKE_EMPTY_STRING,
+    JUMP,
+    POP_JUMP_IF_FALSE,
+    PUSH_NONE,
+    RETURN_VALUE,
+)
+
+ARITHMETIC_OPERATIONS: dict[str, Any] = {
+    T_PLUS: Number.added_to,
+    T_MINUS: Number.subtracted_by,
+    T_MULTIPLY: Number.multiplied_by,
+    T_DIVIDE: Number.divided_by,
+}
+
+
+def yields_number(node: Any) -> bool:
+    if isinstance(node, NumberNode):
+        return True
+    return isinstance(node, BinOpNode) and node.op_tok.type in ARITHMETIC_OPERATIONS
+
+
+class CodeObject:
+    __slots__ = ("name", "ops", "consts")
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        # Flat [opcode, argument, opcode, argument, ...] list.
+        self.ops: list[int] = []
+        self.consts: list[Any] = []
+
+    def __repr__(self) -> str:
+        return "<code {}, {} instructions>".format(self.name, len(self.ops) // 2)
+
+
+class Compiler:
+    """
+    Lowers nodes into a CodeObject for the VirtualMachine.
+
+    Node types the compiler has no instructions for (declarations, commands,
+    legacy assignments, unquoted strings, '[]' accesses, ...) are emitted as a
+    WALK instruction that hands the node to the tree-walking visit_* handler.
+    """
+
+    def __init__(self) -> None:
+        self.code: CodeObject = CodeObject("<statement>")
+        self.emitters: dict[type, Any] = {
+            node_class: getattr(self, "emit_{}".format(node_class.__name__))
+            for node_class in NODE_CLASSES
+            if hasattr(self, "emit_{}".format(node_class.__name__))
+        }
+
+    def compile_statement(self, node: Any, name: str = "<statement>") -> CodeObject:
+        self.code = CodeObject(name)
+        self.emit_node(node)
+        return self.code
+
+    def compile_body(self, body: list[Any], name: str) -> CodeObject:
+        # A function returns the value of its first top level return statement,
+        # or an empty string when there is none.
+        self.code = CodeObject(name)
+        for statement in body:
+            self.emit_node(statement)
+            if isinstance(statement, ReturnNode):
+                self.emit(RETURN_VALUE, 0)
+                return self.code
+            self.emit_pop_result(statement)
+        self.emit(MAKE_EMPTY_STRING, 0)
+        self.emit(RETURN_VALUE, 0)
+        return self.code
+
+    def emit(self, op: int, arg: int) -> int:
+        self.code.ops.append(op)
+        self.code.ops.append(arg)
+        return len(self.code.ops) - 1
+
+    def emit_const(self, op: int, const: Any) -> int:
+        self.code.consts.append(const)
+        return self.emit(op, len(self.code.consts) - 1)
+
+    def emit_jump(self, op: int) -> int:
+        return self.emit(op, -1)
+
+    def patch_jump(self, arg_index: int) -> None:
+        self.code.ops[arg_index] = len(self.code.ops)
+
+    def emit_node(self, node: Any) -> None:
+        self.emitters.get(type(node), self.emit_walk)(node)
+
+    def emit_walk(self, node: Any) -> None:
+        self.emit_const(WALK, node)
+
+    def emit_statements(self, statements: list[Any]) -> None:
+        # Every statement leaves a value, the block leaves None.
+        for statement in statements:
+            self.emit_node(statement)
+            self.emit_pop_result(statement)
+        self.emit(PUSH_NONE, 0)
+
+    def emit_pop_result(self, statement: Any) -> None:
+        # The parser may leave None for a statement, it fails when it is run.
+        self.emit_const(
+            POP_RESULT,
+            (
+                getattr(statement, "pos_start", None),
+                getattr(statement, "pos_end", None),
+            ),
+        )
+
+    def emit_NumberNode(self, node: Any) -> None:
+        self.emit_const(
+            MAKE_NUMBER, (node.tok.value, node.tok.type, node.pos_start, node.pos_end)
+        )
+
+    def emit_StringNode(self, node: Any) -> None:
+        if not node.quoted:
+            # The resolver gives '%var%' names no slots, they are looked up by name
+            # while the template renders, reuse the handler doing that.
+            self.emit_walk(node)
+            return
+        self.emit_const(MAKE_STRING, (node.tok.value, node.pos_start, node.pos_end))
+
+    def emit_BooleanNode(self, node: Any) -> None:
+        self.emit_const(MAKE_BOOLEAN, (node.tok.value, node.pos_start, node.pos_end))
+
+    def emit_ArrayNode(self, node: Any) -> None:
+        for element_node in node.value_list:
+            self.emit_node(element_node)
+        self.emit_const(
+            MAKE_ARRAY, (len(node.value_list), node.pos_start, node.pos_end)
+        )
+
+    def emit_AssociativeArrayNode(self, node: Any) -> None:
+        for key_node, value_node in node.value_dict.items():
+            self.emit_node(key_node)
+            self.emit_node(value_node)
+        self.emit_const(
+            MAKE_ASSOCIATIVE_ARRAY,
+            (len(node.value_dict), node.pos_start, node.pos_end),
+        )
+
+    def emit_VarAccessNode(self, node: Any) -> None:
+        positions: tuple[Any, Any] = (node.pos_start, node.pos_end)
+        if node.slot is not None:
+            self.emit_const(LOAD_FAST, (node.slot, node.var_name_tok.value) + positions)
+        else:
+            self.emit_const(LOAD_NAME, (node.var_name_tok.value,) + positions)
+
+    def emit_VarAssignNode(self, node: Any) -> None:
+        positions: tuple[Any, Any] = (node.pos_start, node.pos_end)
+        self.emit_node(node.value_node)
+        if node.slot is not None:
+            self.emit_const(STORE_FAST, (node.slot, node.var_name.value) + positions)
+        else:
+            self.emit_const(STORE_NAME, (node.var_name.value,) + positions)
+
+    def emit_BinOpNode(self, node: Any) -> None:
+        positions: tuple[Any, Any] = (node.pos_start, node.pos_end)
+        if node.op_tok.type in ARITHMETIC_OPERATIONS:
+            # The left operand must be a Number before the right one is run,
+            # literals and other arithmetic always are.
+            self.emit_node(node.left_node)
+            if not yields_number(node.left_node):
+                self.emit_const(CHECK_NUMBER, positions)
+            self.emit_node(node.right_node)
+            self.emit_const(
+                BINARY_ARITHMETIC,
+                (ARITHMETIC_OPERATIONS[node.op_tok.type],) + positions,
+            )
+        elif node.op_tok.type == T_DOT:
+            # ACCESS_DOT finishes associative array lookups itself and jumps
+            # past the concatenation, strings fall through to it.
+            self.emit_node(node.left_node)
+            const: list[Any] = [node.right_node, positions[0], positions[1], -1]
+            self.emit_const(ACCESS_DOT, const)
+            self.emit_concat_operand(node.right_node)
+            self.emit_const(CONCATENATE, positions)
+            const[3] = len(self.code.ops)
+        elif node.op_tok.type == T_LSQUARE:
+            self.emit_walk(node)
+        else:
+            operator: str = "and" if node.op_tok.matches(T_KEYWORD, "and") else "or"
+            self.emit_node(node.left_node)
+            self.emit_node(node.right_node)
+            self.emit_const(BINARY_LOGICAL, (operator,) + positions)
+
+    def emit_concat_operand(self, key: Any) -> None:
+        if isinstance(key, ObjectKeyNode):
+            if isinstance(key.node, Token):
+                self.emit_node(VarAccessNode(key.node, key.slot))
+            else:
+                self.emit_node(key.node)
+        else:
+            self.emit_node(key)
+
+    def emit_ObjectAccessNode(self, node: Any) -> None:
+        key: Any = node.key
+        if node.access_method != T_DOT or not isinstance(key, ObjectKeyNode):
+            self.emit_walk(node)
+            return
+        # Like ACCESS_DOT, ACCESS_OBJECT only falls through to the key when the
+        # accessed value is a String.
+        self.emit_node(node.access_node)
+        const: list[Any] = [key, node.pos_start, node.pos_end, -1]
+        self.emit_const(ACCESS_OBJECT, const)
+        if isinstance(key.node, Token) and key.node.type == T_IDENTIFIER:
+            self.emit_node(VarAccessNode(key.node, key.slot))
+        elif isinstance(key.node, Token) and key.node.type == T_STRING:
+            self.emit_node(StringNode(key.node))
+        elif isinstance(key.node, Token) and key.node.type in (
+            T_DECIMAL,
+            T_HEXADECIMAL,
+        ):
+            self.emit_node(NumberNode(key.node))
+        else:
+            self.emit_node(key.node)
+        self.emit_const(CONCATENATE_KEY, (node.pos_start, node.pos_end))
+        const[3] = len(self.code.ops)
+
+    def emit_UnaryOpNode(self, node: Any) -> None:
+        self.emit_node(node.node)
+        if node.op_tok.matches(T_KEYWORD, "not"):
+            op: int = UNARY_NOT
+        elif node.op_tok.type == T_MINUS:
+            op: int = UNARY_NEGATIVE
+        else:
+            op: int = UNARY_POSITIVE
+        self.emit_const(op, (node.pos_start, node.pos_end))
+
+    def emit_TernaryOpNode(self, node: Any) -> None:
+        self.emit_node(node.condition_node)
+        false_jump: int = self.emit_jump(POP_JUMP_IF_FALSE)
+        self.emit_node(node.true_node)
+        end_jump: int = self.emit_jump(JUMP)
+        self.patch_jump(false_jump)
+        self.emit_node(node.false_node)
+        self.patch_jump(end_jump)
+
+    def emit_IfNode(self, node: Any) -> None:
+        self.emit_node(node.condition_node)
+        false_jump: int = self.emit_jump(POP_JUMP_IF_FALSE)
+        self.emit_statements(node.if_body)
+        end_jump: int = self.emit_jump(JUMP)
+        self.patch_jump(false_jump)
+        self.emit(PUSH_NONE, 0)
+        self.patch_jump(end_jump)
+
+    def emit_IfElseNode(self, node: Any) -> None:
+        self.emit_node(node.condition_node)
+        false_jump: int = self.emit_jump(POP_JUMP_IF_FALSE)
+        self.emit_statements(node.if_body)
+        end_jump: int = self.emit_jump(JUMP)
+        self.patch_jump(false_jump)
+        self.emit_statements(node.else_body)
+        self.patch_jump(end_jump)
+
+    def emit_FunctionCallNode(self, node: Any) -> None:
+        positions: tuple[Any, Any] = (node.pos_start, node.pos_end)
+        self.emit_const(
+            PREPARE_CALL, (node.name.value, len(node.parameters)) + positions
+        )
+        for idx, parameter in enumerate(node.parameters):
+            self.emit_node(parameter)
+            self.emit_const(BIND_ARGUMENT, (idx,) + positions)
+        self.emit(CALL_FUNCTION, 0)
+
+    def emit_ReturnNode(self, node: Any) -> None:
+        if node.node is None:
+            self.emit(MAKE_EMPTY_STRING, 0)
+            return
+        self.emit_const(CHECK_RETURN, (node.pos_start, node.pos_end))
+        self.emit_node(node.node)
+
+
+def format_const(const: Any) -> str:
+    if isinstance(const, (tuple, list)):
+        # Positions are noise in a listing, show the values around them.
+        return ", ".join(
+            format_const(item)
+            for item in const
+            if not hasattr(item, "idx") and item is not None
+        )
+    if callable(const) and hasattr(const, "__name__"):
+        return const.__name__
+    return repr(const)
+
+
+def disassemble(code: CodeObject) -> str:
+    lines: list[str] = ["Disassembly of {}:".format(code.name)]
+    for offset in range(0, len(code.ops), 2):
+        op, arg = code.ops[offset], code.ops[offset + 1]
+        line: str = "{:>6} {:<24} {:>4}".format(offset, OPNAMES[op], arg)
+        if op not in NUMERIC_ARGUMENTS and op != CALL_FUNCTION:
+            line += " ({})".format(format_const(code.consts[arg]))
+        lines.append(line.rstrip())
+    return "\n".join(lines)
@@ -0,0 +1,692 @@
+from typing import Any, Callable
+
+from base_classes.context import Context
+from base_classes.nodes import *
+from base_classes.tokens import Token
+from constants import *
+from data_types.array import Array
+from data_types.associative_array import AssociativeArray
+from data_types.boolean import FALSE, TRUE, Boolean, evaluate_logical
+from data_types.number import Number
+from data_types.string import String
+from error_classes.runtime_error import RunTimeError
+from interpreter.interpreter import Interpreter
+from interpreter.runtime_result import RuntimeResult
+from interpreter.trace import ASSIGN, TraceEvent, TraceSink
+
+# A compiled node: takes the context it runs in and returns what the matching
+# Interpreter.visit_* handler would.
+Code = Callable[[Context], RuntimeResult]
+
+ARITHMETIC_OPERATIONS: dict[str, Callable] = {
+    T_PLUS: Number.added_to,
+    T_MINUS: Number.subtracted_by,
+    T_MULTIPLY: Number.multiplied_by,
+    T_DIVIDE: Number.divided_by,
+}
+
+
+class ClosureCompiler(Interpreter):
+    """
+    Execution engine that compiles nodes into Python closures and runs the
+    closures instead of walking the tree. Node and token types are inspected at
+    compile time only, so e.g. a BinOpNode with T_PLUS becomes a closure that
+    evaluates both operands and calls Number.added_to directly.
+
+    Scripts have no loops, so code outside of functions runs exactly once and
+    is walked as usual, compiling it would only add work. Nodes visited inside
+    a function are compiled on the first call and their closures are cached
+    per node, that code runs again on every call.
+
+    Node types without a compile_* method (declarations, commands, unquoted
+    strings, ...) run the inherited visit_* handler. The wrapper nodes the
+    tree-walking handlers build on every evaluation are built once here
+    instead, so the cache only ever holds nodes of the AST.
+    """
+
+    def __init__(self, trace: TraceSink | None = None) -> None:
+        super().__init__(trace)
+        self.compiled: dict[Any, Code] = {}
+        self.compilers: dict[type, Any] = {
+            node_class: getattr(self, "compile_{}".format(node_class.__name__))
+            for node_class in NODE_CLASSES
+            if hasattr(self, "compile_{}".format(node_class.__name__))
+        }
+
+    def visit(self, node: Any, context: Context) -> RuntimeResult:
+        code: Code | None = self.compiled.get(node)
+        if code is None:
+            if context.parent is None:
+                return self.dispatch.get(type(node), self.no_visit_method)(
+                    node, context
+                )
+            code = self.compile(node)
+        return code(context)
+
+    def compile(self, node: Any) -> Code:
+        code: Code | None = self.compiled.get(node)
+        if code is None:
+            compiler: Any = self.compilers.get(type(node), self.compile_generic)
+            code = compiler(node)
+            self.compiled[node] = code
+        return code
+
+    def compile_generic(self, node: Any) -> Code:
+        method: Any = self.dispatch.get(type(node), self.no_visit_method)
+
+        def run(context: Context) -> RuntimeResult:
+            return method(node, context)
+
+        return run
+
+    def compile_body(self, statements: list[Any]) -> list[Code]:
+        return [self.compile(statement) for statement in statements]
+
+    def compile_concat_operand(self, key: Any) -> Code:
+        # Right hand side of a string concatenation written as 'a.b' or 'a[b]'.
+        if isinstance(key, ObjectKeyNode):
+            if isinstance(key.node, Token):
+                return self.compile(VarAccessNode(key.node, key.slot))
+            return self.compile(key.node)
+        return self.compile(key)
+
+    def compile_inner_key(self, key: Any) -> Code | None:
+        # The expression wrapped by an ObjectKeyNode, when it is a node.
+        inner: Any = getattr(key, "node", None)
+        if inner is None or isinstance(inner, Token):
+            return None
+        return self.compile(inner)
+
+    def compile_NumberNode(self, node: Any) -> Code:
+        value: Any = node.tok.value
+        type_: str = node.tok.type
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            number: Number = (
+                Number(value, type_).set_context(context).set_pos(pos_start, pos_end)
+            )
+            return RuntimeResult().success(number)
+
+        return run
+
+    def compile_StringNode(self, node: Any) -> Code:
+        if not node.quoted:
+            # The resolver gives '%var%' names no slots, they are looked up by name
+            # while the template renders, reuse the handler doing that.
+            return self.compile_generic(node)
+        value: str = node.tok.value
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            string: String = (
+                String(value).set_context(context).set_pos(pos_start, pos_end)
+            )
+            return RuntimeResult().success(string)
+
+        return run
+
+    def compile_BooleanNode(self, node: Any) -> Code:
+        boolean: Boolean = TRUE if node.tok.value == "true" else FALSE
+
+        def run(context: Context) -> RuntimeResult:
+            return RuntimeResult().success(boolean)
+
+        return run
+
+    def compile_ArrayNode(self, node: Any) -> Code:
+        element_codes: list[Code] = self.compile_body(node.value_list)
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            elements: list[Any] = []
+            for element_code in element_codes:
+                elements.append(res.register(element_code(context)))
+                if res.error:
+                    return res
+            arr: Array = (
+                Array.from_elements(elements)
+                .set_context(context)
+                .set_pos(pos_start, pos_end)
+            )
+            return res.success(arr)
+
+        return run
+
+    def compile_AssociativeArrayNode(self, node: Any) -> Code:
+        pair_codes: list[tuple[Code, Code]] = [
+            (self.compile(key_node), self.compile(value_node))
+            for key_node, value_node in node.value_dict.items()
+        ]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            items: list[tuple[Any, Any]] = []
+            for key_code, value_code in pair_codes:
+                compiled_key: Any = res.register(key_code(context))
+                if res.error:
+                    return res
+                compiled_value: Any = res.register(value_code(context))
+                if res.error:
+                    return res
+                items.append((compiled_key, compiled_value))
+            obj: AssociativeArray = (
+                AssociativeArray.from_items(items)
+                .set_context(context)
+                .set_pos(pos_start, pos_end)
+            )
+            return res.success(obj)
+
+        return run
+
+    def compile_VarAccessNode(self, node: Any) -> Code:
+        var_name: str = node.var_name_tok.value
+        slot: int | None = node.slot
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            if slot is not None:
+                var_value: Any = context.frame[slot]
+            elif context.symbol_table.global_from_child(var_name):
+                var_value: Any = context.symbol_table.get(var_name)
+            else:
+                var_value: Any = None
+            if not var_value:
+                return res.failure(
+                    RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "'{}' is not defined.".format(var_name),
+                        context,
+                    )
+                )
+            return res.success(
+                var_value.set_context(context).set_pos(pos_start, pos_end)
+            )
+
+        return run
+
+    def compile_VarAssignNode(self, node: Any) -> Code:
+        var_name: str = node.var_name.value
+        value_code: Code = self.compile(node.value_node)
+        slot: int | None = node.slot
+        pos_start, pos_end = node.pos_start, node.pos_end
+        trace: TraceSink = self.trace
+        traced: bool = trace.enabled
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = value_code(context)
+            if res.error:
+                return res
+            value: Any = res.value
+            if isinstance(value, list):
+                value = value[-1]
+            if slot is not None:
+                context.frame[slot] = value
+            else:
+                context.symbol_table.set(var_name, (value, True))
+            value.set_context(context).set_pos(pos_start, pos_end)
+            if traced:
+                trace.emit(
+                    TraceEvent(
+                        ASSIGN,
+                        context.display_name,
+                        pos_start,
+                        pos_end,
+                        name=var_name,
+                        value=value,
+                    )
+                )
+            return res.success(None)
+
+        return run
+
+    def compile_BinOpNode(self, node: Any) -> Code:
+        if node.op_tok.type in ARITHMETIC_OPERATIONS:
+            return self.compile_arithmetic(node)
+        if node.op_tok.type == T_DOT:
+            return self.compile_dot(node)
+        if node.op_tok.type == T_LSQUARE:
+            return self.compile_subscript(node)
+        return self.compile_logical(node)
+
+    def compile_arithmetic(self, node: Any) -> Code:
+        operation: Callable = ARITHMETIC_OPERATIONS[node.op_tok.type]
+        left_code: Code = self.compile(node.left_node)
+        right_code: Code = self.compile(node.right_node)
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = left_code(context)
+            if res.error:
+                return res
+            left: Any = res.value
+            if not isinstance(left, Number):
+                return RuntimeResult().failure(
+                    RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "{} is not a Number.".format(left),
+                        context,
+                    )
+                )
+            res = right_code(context)
+            if res.error:
+                return res
+            result, error = operation(left, res.value)
+            if error or result is None:
+                return RuntimeResult().failure(error)
+            result.set_context(context).set_pos(pos_start, pos_end)
+            return RuntimeResult().success(result)
+
+        return run
+
+    def compile_logical(self, node: Any) -> Code:
+        operator: str = "and" if node.op_tok.matches(T_KEYWORD, "and") else "or"
+        left_code: Code = self.compile(node.left_node)
+        right_code: Code = self.compile(node.right_node)
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = left_code(context)
+            if res.error:
+                return res
+            left: Any = res.value
+            res = right_code(context)
+            if res.error:
+                return res
+            return RuntimeResult().success(evaluate_logical(left, res.value, operator))
+
+        return run
+
+    def compile_dot(self, node: Any) -> Code:
+        left_code: Code = self.compile(node.left_node)
+        concat_code: Code = self.compile_concat_operand(node.right_node)
+        right_node: Any = node.right_node
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            left: Any = res.register(left_code(context))
+            if res.error:
+                return res
+            if isinstance(left, String):
+                right: Any = res.register(concat_code(context))
+                if res.error:
+                    return res
+                result, error = left.concatenated_to(right)
+            elif isinstance(left, AssociativeArray):
+                if isinstance(right_node.node, StringNode):
+                    return res.failure(
+                        RunTimeError(
+                            pos_start,
+                            pos_end,
+                            "{} is not a String.".format(left),
+                            context,
+                        )
+                    )
+                result, error = left.get(right_node.name)
+            else:
+                return res.failure(
+                    RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "The object accessed is not a string or an Associative Array.",
+                        context,
+                    )
+                )
+            if error or result is None:
+                return res.failure(error)
+            result.set_context(context).set_pos(pos_start, pos_end)
+            return res.success(result)
+
+        return run
+
+    def compile_subscript(self, node: Any) -> Code:
+        left_code: Code = self.compile(node.left_node)
+        concat_code: Code = self.compile_concat_operand(node.right_node)
+        inner_code: Code | None = self.compile_inner_key(node.right_node)
+        right_node: Any = node.right_node
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            left: Any = res.register(left_code(context))
+            if res.error:
+                return res
+            if isinstance(left, Array):
+                if isinstance(right_node.node, (UnaryOpNode, BinOpNode)):
+                    key: Any = res.register(inner_code(context))
+                    if res.error:
+                        return res
+                    if not isinstance(key, Number) and not isinstance(key.value, int):
+                        return res.failure(
+                            RunTimeError(
+                                pos_start,
+                                pos_end,
+                                "Array indices can only be integers.",
+                                context,
+                            )
+                        )
+                    result, error = left.get(key.value)
+                elif isinstance(right_node.name, int):
+                    result, error = left.get(right_node.name)
+                else:
+                    return res.failure(
+                        RunTimeError(
+                            pos_start,
+                            pos_end,
+                            "Array indices can only be integers.",
+                            context,
+                        )
+                    )
+            elif isinstance(left, String):
+                right: Any = res.register(concat_code(context))
+                if res.error:
+                    return res
+                result, error = left.concatenated_to(right)
+            elif isinstance(left, AssociativeArray):
+                if isinstance(right_node.node, VarAccessNode):
+                    right: Any = res.register(inner_code(context))
+                    if res.error:
+                        return res
+                    result, error = left.get(right.value)
+                else:
+                    result, error = left.get(right_node.name)
+            else:
+                return res.failure(
+                    RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "The object accessed is not a string, an Array or an Associative Array.",
+                        context,
+                    )
+                )
+            if error or result is None:
+                return res.failure(error)
+            result.set_context(context).set_pos(pos_start, pos_end)
+            return res.success(result)
+
+        return run
+
+    def compile_UnaryOpNode(self, node: Any) -> Code:
+        operand_code: Code = self.compile(node.node)
+        is_not: bool = node.op_tok.matches(T_KEYWORD, "not")
+        is_minus: bool = node.op_tok.type == T_MINUS
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            number: Any = res.register(operand_code(context))
+            if res.error:
+                return res
+            if is_not:
+                return res.success(FALSE if number.boolean else TRUE)
+            if is_minus:
+                if number.type == T_HEXADECIMAL:
+                    number, error = number.multiplied_by(Number(-1, T_HEXADECIMAL))
+                else:
+                    number, error = number.multiplied_by(Number(-1, T_DECIMAL))
+                if error:
+                    return res.failure(error)
+            number.set_pos(pos_start, pos_end)
+            return res.success(number)
+
+        return run
+
+    def compile_TernaryOpNode(self, node: Any) -> Code:
+        condition_code: Code = self.compile(node.condition_node)
+        true_code: Code = self.compile(node.true_node)
+        false_code: Code = self.compile(node.false_node)
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = condition_code(context)
+            if res.error:
+                return res
+            return true_code(context) if res.value.boolean else false_code(context)
+
+        return run
+
+    def compile_ObjectAccessNode(self, node: Any) -> Code:
+        access_code: Code = self.compile(node.access_node)
+        key: Any = node.key
+        key_code: Code | None = None
+        if isinstance(key, ObjectKeyNode) and isinstance(key.node, Token):
+            if key.node.type == T_IDENTIFIER:
+                key_code = self.compile(VarAccessNode(key.node, key.slot))
+            elif key.node.type == T_STRING:
+                key_code = self.compile(StringNode(key.node))
+            elif key.node.type == T_DECIMAL or key.node.type == T_HEXADECIMAL:
+                key_code = self.compile(NumberNode(key.node))
+            else:
+                key_code = self.compile(key.node)
+        inner_code: Code | None = self.compile_inner_key(key)
+        is_subscript: bool = node.access_method == T_LSQUARE
+        is_dot: bool = node.access_method == T_DOT
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            compiled_access_node: Any = res.register(access_code(context))
+            if res.error:
+                return res
+
+            if isinstance(compiled_access_node, AssociativeArray):
+                if is_subscript:
+                    if isinstance(key.node, (VarAccessNode, UnaryOpNode, BinOpNode)):
+                        right: Any = res.register(inner_code(context))
+                        if res.error:
+                            return res
+                        value, error = compiled_access_node.get(right.value)
+                        if error or value is None:
+                            return res.failure(error)
+                        value.set_context(context).set_pos(pos_start, pos_end)
+                        return res.success(value)
+                    if isinstance(key.node, StringNode):
+                        value, error = compiled_access_node.get(key.node.tok.value)
+                        if error or value is None:
+                            return res.failure(error)
+                        value.set_context(context).set_pos(pos_start, pos_end)
+                        return res.success(value)
+                if isinstance(key.node, StringNode):
+                    return res.failure(
+                        RunTimeError(
+                            pos_start,
+                            pos_end,
+                            "{} is not a String.".format(compiled_access_node),
+                            context,
+                        )
+                    )
+                value, error = compiled_access_node.get(key.name)
+                if error or value is None:
+                    return res.failure(error)
+                value.set_context(context).set_pos(pos_start, pos_end)
+                return res.success(value)
+
+            if isinstance(compiled_access_node, String):
+                if key_code is not None:
+                    right: Any = res.register(key_code(context))
+                elif inner_code is not None:
+                    right: Any = res.register(inner_code(context))
+                else:
+                    right: Any = res.register(self.visit(key.node, context))
+                if res.error:
+                    return res
+                result, error = compiled_access_node.concatenated_to(right)
+                if error or result is None:
+                    return res.failure(error)
+                result.set_pos(pos_start, pos_end)
+                return res.success(result)
+
+            if isinstance(compiled_access_node, Array):
+                if is_dot:
+                    return res.failure(
+                        RunTimeError(
+                            pos_start,
+                            pos_end,
+                            "Cannot use '.' for this operation.",
+                            context,
+                        )
+                    )
+                if isinstance(key.node, (UnaryOpNode, BinOpNode)):
+                    index: Any = res.register(inner_code(context))
+                    if res.error:
+                        return res
+                    if not isinstance(index, Number) and not isinstance(
+                        index.value, int
+                    ):
+                        return res.failure(
+                            RunTimeError(
+                                pos_start,
+                                pos_end,
+                                "Array indices can only be integers.",
+                                context,
+                            )
+                        )
+                    value, error = compiled_access_node.get(index.value)
+                elif isinstance(key.name, int):
+                    value, error = compiled_access_node.get(key.name)
+                else:
+                    return res.failure(
+                        RunTimeError(
+                            pos_start,
+                            pos_end,
+                            "Array indices can only be integers.",
+                            context,
+                        )
+                    )
+                if error or value is None:
+                    return res.failure(error)
+                value.set_pos(pos_start, pos_end)
+                return res.success(value)
+
+            return res.failure(
+                RunTimeError(
+                    pos_start,
+                    pos_end,
+                    "The object accessed is not a String, an Array or an Associative Array.",
+                    context,
+                )
+            )
+
+        return run
+
+    def compile_IfNode(self, node: Any) -> Code:
+        condition_code: Code = self.compile(node.condition_node)
+        if_body: list[Any] = node.if_body
+        if_codes: list[Code] = self.compile_body(if_body)
+        run_block: Callable = self.run_block
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            condition: Any = res.register(condition_code(context))
+            if res.error:
+                return res
+            if not condition.boolean:
+                return res.success(None)
+            return run_block(if_body, if_codes, context)
+
+        return run
+
+    def compile_IfElseNode(self, node: Any) -> Code:
+        condition_code: Code = self.compile(node.condition_node)
+        if_body, else_body = node.if_body, node.else_body
+        if_codes: list[Code] = self.compile_body(if_body)
+        else_codes: list[Code] = self.compile_body(else_body)
+        run_block: Callable = self.run_block
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            condition: Any = res.register(condition_code(context))
+            if res.error:
+                return res
+            if condition.boolean:
+                return run_block(if_body, if_codes, context)
+            return run_block(else_body, else_codes, context)
+
+        return run
+
+    def run_block(
+        self, statements: list[Any], codes: list[Code], context: Context
+    ) -> RuntimeResult:
+        res: RuntimeResult = RuntimeResult()
+        for statement, statement_code in zip(statements, codes):
+            result: Any = res.register(statement_code(context))
+            if res.error:
+                return res
+            if result is not None and self.trace.enabled:
+                self.trace_result(result, statement, context)
+        return res.success(None)
+
+    def compile_FunctionCallNode(self, node: Any) -> Code:
+        name: str = node.name.value
+        parameter_codes: list[Code] = self.compile_body(node.parameters)
+        pos_start, pos_end = node.pos_start, node.pos_end
+        enter_call: Callable = self.enter_call
+        leave_call: Callable = self.leave_call
+        trace: TraceSink = self.trace
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            func: Any = context.symbol_table.get(name)
+            if len(parameter_codes) != len(func.parameters):
+                return res.failure(
+                    RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "Parameter mismatch. Function call misses one or more required parameters.",
+                        context,
+                    )
+                )
+            function_context: Context = enter_call(name, func, context, pos_start)
+            frame: list[Any] = function_context.frame
+            for parameter, parameter_code in zip(func.parameters, parameter_codes):
+                param_value: Any = res.register(parameter_code(context))
+                if res.error:
+                    return res
+                param_value.set_pos(pos_start, pos_end).set_context(function_context)
+                frame[parameter.slot] = param_value
+
+            # The body belongs to whichever function the name resolves to at
+            # call time, it is compiled on the first call through the cache.
+            for statement in func.body:
+                result: Any = res.register(self.visit(statement, function_context))
+                if res.error:
+                    return res
+                if isinstance(statement, ReturnNode):
+                    break
+                if result is not None and trace.enabled:
+                    self.trace_result(result, statement, function_context)
+            else:
+                result: Any = String("")
+            leave_call(function_context, result)
+            return res.success([result])
+
+        return run
+
+    def compile_ReturnNode(self, node: Any) -> Code:
+        value_code: Code | None = (
+            self.compile(node.node) if node.node is not None else None
+        )
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def run(context: Context) -> RuntimeResult:
+            res: RuntimeResult = RuntimeResult()
+            if context.display_name == "<module>":
+                if value_code is None:
+                    return res.success(String(""))
+                return res.failure(
+                    RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "Return statement cannot be used here.",
+                        context,
+                    )
+                )
+            if value_code is None:
+                return res.success(String(""))
+            return value_code(context)
+
+        return run
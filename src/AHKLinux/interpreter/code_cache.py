@@ -0,0 +1,87 @@
+import hashlib
+import importlib.util
+import marshal
+import os
+from types import CodeType
+from typing import Any
+
+from constants import VERSION
+from parser.ast_cache import ASTCache
+
+# Bump whenever the code the Transpiler generates changes shape.
+CODE_CACHE_FORMAT: int = 6
+CODE_CACHE_SUFFIX: str = ".code"
+
+
+class CodeCache(ASTCache):
+    """
+    On-disk cache of transpiled function bodies as marshalled code objects,
+    sharing the directory and eviction of the ASTCache.
+
+    A body is identified by the script it was parsed from, the file name
+    compiled into its code and the offset of its first statement. The same
+    script always parses to the same tree, so that is enough to know the
+    transpiled code matches, the CPython magic number guards the marshal format.
+    """
+
+    suffix: str = CODE_CACHE_SUFFIX
+
+    def __init__(
+        self, cache_dir: str | None = None, max_bytes: int = 64 * 1024 * 1024
+    ) -> None:
+        super().__init__(cache_dir, max_bytes)
+        # Script text -> digest, every body of a script hashes its text once.
+        self.digests: dict[str, bytes] = {}
+
+    def get_code_path(
+        self, contents: str, filename: str, idx: int, traced: bool = False
+    ) -> str:
+        script_digest: bytes | None = self.digests.get(contents)
+        if script_digest is None:
+            script_digest = hashlib.sha256(
+                contents.encode("utf-8", "surrogatepass")
+            ).digest()
+            self.digests[contents] = script_digest
+        digest: Any = hashlib.sha256()
+        digest.update(
+            "{}\0{}\0{}\0{}\0{}\0".format(
+                VERSION, CODE_CACHE_FORMAT, filename, idx, traced
+            ).encode()
+        )
+        digest.update(importlib.util.MAGIC_NUMBER)
+        digest.update(script_digest)
+        return os.path.join(self.cache_dir, digest.hexdigest() + self.suffix)
+
+    def load_code(
+        self, contents: str, filename: str, idx: int, traced: bool = False
+    ) -> CodeType | None:
+        # Bodies are transpiled differently when the run is traced.
+        path: str = self.get_code_path(contents, filename, idx, traced)
+        try:
+            with open(path, "rb") as file:
+                code: Any = marshal.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self.remove(path)
+            return None
+        if not isinstance(code, CodeType):
+            self.remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return code
+
+    def store_code(
+        self,
+        contents: str,
+        filename: str,
+        idx: int,
+        code: CodeType,
+        traced: bool = False,
+    ) -> None:
+        self.write(
+            self.get_code_path(contents, filename, idx, traced), marshal.dumps(code)
+        )
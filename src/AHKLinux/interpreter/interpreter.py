@@ -1,31 +1,98 @@
-import re
 from typing import Any
 
 from base_classes.context import Context
 from base_classes.nodes import *
-from base_classes.symbol_table import SymbolTable
 from base_classes.tokens import Token
 from constants import *
 from data_types.array import Array
 from data_types.associative_array import AssociativeArray
-from data_types.boolean import Boolean
+from data_types.boolean import FALSE, TRUE, evaluate_logical
 from data_types.function import Function
 from data_types.number import Number
 from data_types.string import String
 from error_classes.runtime_error import RunTimeError
+from interpreter.resolver import resolve_function
 from interpreter.runtime_result import RuntimeResult
+from interpreter.trace import *
 from window import msgbox
 
 
 class Interpreter:
+    """
+    Tree-walking execution engine, visits the nodes of a script one by one.
+
+    What the statements do is reported to the `trace` sink, see
+    interpreter.trace. Events are only built when the sink is enabled.
+    """
+
+    def __init__(self, trace: TraceSink | None = None) -> None:
+        self.trace: TraceSink = trace if trace is not None else TraceSink()
+        # Node class -> bound visit method, resolved once instead of formatting
+        # and looking up the method name for every node.
+        self.dispatch: dict[type, Any] = {
+            node_class: getattr(self, "visit_{}".format(node_class.__name__))
+            for node_class in NODE_CLASSES
+            if hasattr(self, "visit_{}".format(node_class.__name__))
+        }
+        # Contexts of calls that returned, reused by the next calls.
+        self.free_contexts: list[Context] = []
+
     def visit(self, node: Any, context: Context):
-        method_name: str = "visit_{}".format(type(node).__name__)
-        method: Any = getattr(self, method_name, self.no_visit_method)
+        method: Any = self.dispatch.get(type(node), self.no_visit_method)
         return method(node, context)
 
     def no_visit_method(self, node: Any, context: Context) -> Exception:
         raise Exception("No visit_{} method defined.".format(type(node).__name__))
 
+    def enter_call(
+        self, name: str, func: Function, context: Context, pos_start: Any
+    ) -> Context:
+        """
+        The context a call to `func` from `context` runs in. Only the list
+        holding the locals is allocated, the Context itself comes from a call
+        that has returned whenever there is one.
+        """
+        if self.free_contexts:
+            function_context: Context = self.free_contexts.pop()
+            function_context.display_name = name
+            function_context.parent = context
+            function_context.parent_entry_pos = pos_start
+        else:
+            function_context: Context = Context(name, context, pos_start)
+        # Names that are not locals resolve to the globals and functions.
+        function_context.symbol_table = context.symbol_table
+        function_context.frame = [None] * len(func.slots)
+        function_context.slots = func.slots
+        if self.trace.enabled:
+            self.trace.emit(
+                TraceEvent(CALL, context.display_name, pos_start, None, name=name)
+            )
+        return function_context
+
+    def leave_call(self, function_context: Context, value: Any) -> None:
+        # Only calls that returned normally are recycled, a failed call's
+        # context stays part of the traceback of its error.
+        if self.trace.enabled:
+            self.trace.emit(
+                TraceEvent(
+                    RETURN,
+                    function_context.display_name,
+                    function_context.parent_entry_pos,
+                    None,
+                    value=value,
+                )
+            )
+        function_context.frame = None
+        self.free_contexts.append(function_context)
+
+    def trace_result(self, value: Any, node: Any, context: Context) -> None:
+        # A statement that is a plain expression reports its value.
+        self.trace.emit(
+            TraceEvent(
+                RESULT, context.display_name, node.pos_start, node.pos_end, value=value
+            )
+        )
+
     def visit_NumberNode(self, node: Any, context: Context) -> RuntimeResult:
         number: Number = (
             Number(node.tok.value, node.tok.type)
@@ -35,13 +102,17 @@ class Interpreter:
         return RuntimeResult().success(number)
 
     def visit_StringNode(self, node: Any, context: Context) -> RuntimeResult:
-        if not node.quoted:
-            var_names: list[str] = re.findall(
-                "%\s*[a-zA-Z0-9_@#$]*\s*%", node.tok.value
-            )
-            for var_name in var_names:
-                var_name = var_name.replace("%", "").strip()
-                var_value: Any | None = context.symbol_table.get(var_name)
+        text: str = node.tok.value
+        if not node.quoted and node.template.names:
+            values: list[str] = []
+            for var_name in node.template.names:
+                if context.frame is None:
+                    var_value: Any | None = context.symbol_table.get(var_name)
+                else:
+                    slot: int | None = context.slots.get(var_name.casefold())
+                    var_value: Any | None = (
+                        context.frame[slot] if slot is not None else None
+                    )
                 if var_value is None:
                     return RuntimeResult().failure(
                         RunTimeError(
@@ -60,27 +131,17 @@ class Interpreter:
                             context,
                         )
                     )
-                node.tok.value = re.sub(
-                    "%\s*[a-zA-Z0-9_@#$]*\s*%",
-                    str(var_value),
-                    node.tok.value,
-                    count=1,
-                )
+                values.append(str(var_value))
+            # The node is left untouched, the next evaluation substitutes again.
+            text = node.template.render(values)
 
         string: String = (
-            String(node.tok.value)
-            .set_context(context)
-            .set_pos(node.pos_start, node.pos_end)
+            String(text).set_context(context).set_pos(node.pos_start, node.pos_end)
         )
         return RuntimeResult().success(string)
 
     def visit_BooleanNode(self, node: Any, context: Context) -> RuntimeResult:
-        boolean: Boolean = (
-            Boolean(node.tok.value)
-            .set_context(context)
-            .set_pos(node.pos_start, node.pos_end)
-        )
-        return RuntimeResult().success(boolean)
+        return RuntimeResult().success(TRUE if node.tok.value == "true" else FALSE)
 
     def visit_ArrayNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
@@ -91,13 +152,15 @@ class Interpreter:
             if res.error:
                 return res
         arr: Array = (
-            Array(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
+            Array.from_elements(elements)
+            .set_context(context)
+            .set_pos(node.pos_start, node.pos_end)
         )
         return res.success(arr)
 
     def visit_AssociativeArrayNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
-        compiled_arr: dict[Any, Any] = {}
+        items: list[tuple[Any, Any]] = []
 
         for key_node, value_node in node.value_dict.items():
             compiled_key: Any = res.register(self.visit(key_node, context))
@@ -106,9 +169,9 @@ class Interpreter:
             compiled_value: Any = res.register(self.visit(value_node, context))
             if res.error:
                 return res
-            compiled_arr[compiled_key] = compiled_value
+            items.append((compiled_key, compiled_value))
         obj: AssociativeArray = (
-            AssociativeArray(compiled_arr)
+            AssociativeArray.from_items(items)
             .set_context(context)
             .set_pos(node.pos_start, node.pos_end)
         )
@@ -117,12 +180,12 @@ class Interpreter:
     def visit_VarAccessNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
         var_name: str = node.var_name_tok.value
-        var_value: Any = context.symbol_table.get(var_name)
-        if (
-            context.parent is not None
-            and context.parent.symbol_table.global_from_child(var_name)
-        ):
-            var_value = context.parent.symbol_table.get(var_name)
+        if node.slot is not None:
+            var_value: Any = context.frame[node.slot]
+        elif context.frame is None or context.symbol_table.global_from_child(var_name):
+            var_value: Any = context.symbol_table.get(var_name)
+        else:
+            var_value: Any = None
 
         if not var_value:
             return res.failure(
@@ -148,45 +211,67 @@ class Interpreter:
             value: Any = var_value[-1]
         else:
             value: Any = var_value
-        if node.scope == "global" and context.parent is not None:
-            context.parent.symbol_table.set(var_name, (value, True))
+        if node.slot is not None:
+            context.frame[node.slot] = value
         else:
-            if (
-                context.parent is not None
-                and context.parent.symbol_table.global_from_child(var_name)
-            ):
-                context.parent.symbol_table.set(var_name, (value, True))
-            else:
-                context.symbol_table.set(var_name, (value, False))
-        debug_msg: str = "'{}' inside '{}' has been assigned the value '{}'.".format(
-            var_name, context.display_name, value
-        )
+            # A name a function declares global, or any name outside functions.
+            context.symbol_table.set(var_name, (value, context.frame is not None))
         value.set_context(context).set_pos(node.pos_start, node.pos_end)
-        if isinstance(var_value, list):
-            var_value.pop()
-            var_value.append(debug_msg)
-            return res.success(var_value)
-        return res.success(debug_msg)
+        if self.trace.enabled:
+            self.trace.emit(
+                TraceEvent(
+                    ASSIGN,
+                    context.display_name,
+                    node.pos_start,
+                    node.pos_end,
+                    name=var_name,
+                    value=value,
+                )
+            )
+        return res.success(None)
+
+    def trace_assign(
+        self, kind: str, key: Any, value: Any, node: Any, context: Context
+    ) -> None:
+        # An element of an array or an associative array was assigned.
+        if self.trace.enabled:
+            self.trace.emit(
+                TraceEvent(
+                    kind,
+                    context.display_name,
+                    node.pos_start,
+                    node.pos_end,
+                    name=key,
+                    value=value,
+                )
+            )
 
     def visit_L_VarAssignNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
         var_name: str = node.var_name.value
-        var_values: list[Any] = []
         for var_node in node.var_nodes:
-            var_value: Any = res.register(self.visit(var_node, context))
+            res.register(self.visit(var_node, context))
             if res.error:
                 return res
-            var_values.append(var_value)
-        node.string_node.tok.value.format(*var_values)
         value: Any = res.register(self.visit(node.string_node, context))
         if res.error:
             return res
-        context.symbol_table.set(var_name, (value, False))
-        return res.success(
-            "'{}' inside '{}' has been assigned the value {}.".format(
-                var_name, context.display_name, value
+        if node.slot is not None:
+            context.frame[node.slot] = value
+        else:
+            context.symbol_table.set(var_name, (value, context.frame is not None))
+        if self.trace.enabled:
+            self.trace.emit(
+                TraceEvent(
+                    LEGACY_ASSIGN,
+                    context.display_name,
+                    node.pos_start,
+                    node.pos_end,
+                    name=var_name,
+                    value=value,
+                )
             )
-        )
+        return res.success(None)
 
     def visit_BinOpNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
@@ -274,7 +359,12 @@ class Interpreter:
                 if isinstance(node.right_node, ObjectKeyNode):
                     if isinstance(node.right_node.node, Token):
                         right: Any = res.register(
-                            self.visit(VarAccessNode(node.right_node.node), context)
+                            self.visit(
+                                VarAccessNode(
+                                    node.right_node.node, node.right_node.slot
+                                ),
+                                context,
+                            )
                         )
                     else:
                         right: Any = res.register(
@@ -352,7 +442,12 @@ class Interpreter:
                 if isinstance(node.right_node, ObjectKeyNode):
                     if isinstance(node.right_node.node, Token):
                         right: Any = res.register(
-                            self.visit(VarAccessNode(node.right_node.node), context)
+                            self.visit(
+                                VarAccessNode(
+                                    node.right_node.node, node.right_node.slot
+                                ),
+                                context,
+                            )
                         )
                     else:
                         right: Any = res.register(
@@ -397,9 +492,7 @@ class Interpreter:
             if res.error:
                 return res
             operator: str = "and" if node.op_tok.matches(T_KEYWORD, "and") else "or"
-            result: Any = left.repr_boolean.compare(right.repr_boolean, operator)
-            result.set_context(context).set_pos(node.pos_start, node.pos_end)
-            return res.success(result)
+            return res.success(evaluate_logical(left, right, operator))
 
     def visit_UnaryOpNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
@@ -408,23 +501,11 @@ class Interpreter:
             return res
 
         if node.op_tok.matches(T_KEYWORD, "not"):
-            if number.boolean:
-                boolean = (
-                    Boolean("false")
-                    .set_context(context)
-                    .set_pos(node.pos_start, node.pos_end)
-                )
-                return res.success(boolean)
-            boolean: Boolean = (
-                Boolean("true")
-                .set_context(context)
-                .set_pos(node.pos_start, node.pos_end)
-            )
-            return res.success(boolean)
+            return res.success(FALSE if number.boolean else TRUE)
 
         if node.op_tok.type == T_MINUS:
             if number.type == T_HEXADECIMAL:
-                number, error = number.multiplied_by(Number("-0x1", T_HEXADECIMAL))
+                number, error = number.multiplied_by(Number(-1, T_HEXADECIMAL))
                 if error:
                     return res.failure(error)
             else:
@@ -470,18 +551,14 @@ class Interpreter:
                     compiled_value.set_context(context).set_pos(
                         node.pos_start, node.pos_end
                     )
-                    return res.success(
-                        "Key '{}' was assigned the value {}.".format(
-                            node.key.name, compiled_value
-                        )
+                    self.trace_assign(
+                        KEY_ASSIGN, node.key.name, compiled_value, node, context
                     )
+                    return res.success(None)
             compiled_access_node.set(node.key.name, compiled_value)
             compiled_value.set_context(context).set_pos(node.pos_start, node.pos_end)
-            return res.success(
-                "Key '{}' was assigned the value {}.".format(
-                    node.key.name, compiled_value
-                )
-            )
+            self.trace_assign(KEY_ASSIGN, node.key.name, compiled_value, node, context)
+            return res.success(None)
         if isinstance(compiled_access_node, Array):
             if node.access_method == T_DOT:
                 return res.failure(
@@ -513,11 +590,10 @@ class Interpreter:
                 compiled_value.set_context(context).set_pos(
                     node.pos_start, node.pos_end
                 )
-                return res.success(
-                    "Index {} was assigned the value {}.".format(
-                        key.value, compiled_value
-                    )
+                self.trace_assign(
+                    INDEX_ASSIGN, key.value, compiled_value, node, context
                 )
+                return res.success(None)
             elif isinstance(node.key.name, int):
                 ret_code, error = compiled_access_node.set(
                     node.key.name, compiled_value
@@ -527,11 +603,10 @@ class Interpreter:
                 compiled_value.set_context(context).set_pos(
                     node.pos_start, node.pos_end
                 )
-                return res.success(
-                    "Index {} was assigned the value {}.".format(
-                        node.key.name, compiled_value
-                    )
+                self.trace_assign(
+                    INDEX_ASSIGN, node.key.name, compiled_value, node, context
                 )
+                return res.success(None)
             return res.failure(
                 RunTimeError(
                     node.pos_start,
@@ -602,7 +677,7 @@ class Interpreter:
             if isinstance(node.key.node, Token):
                 if node.key.node.type == T_IDENTIFIER:
                     right: Any = res.register(
-                        self.visit(VarAccessNode(node.key.node), context)
+                        self.visit(VarAccessNode(node.key.node, node.key.slot), context)
                     )
                 elif node.key.node.type == T_STRING:
                     right: Any = res.register(
@@ -688,14 +763,8 @@ class Interpreter:
         if res.error:
             return res
         if condition.boolean:
-            outputs: list[Any] = []
-            for statement in node.if_body:
-                result: Any = res.register(self.visit(statement, context))
-                if res.error:
-                    return res
-                outputs.append(result)
-            return res.success(outputs)
-        return res.success([])
+            return self.visit_block(node.if_body, context)
+        return res.success(None)
 
     def visit_IfElseNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
@@ -703,20 +772,18 @@ class Interpreter:
         if res.error:
             return res
         if condition.boolean:
-            outputs: list[Any] = []
-            for statement in node.if_body:
-                result: Any = res.register(self.visit(statement, context))
-                if res.error:
-                    return res
-                outputs.append(result)
-            return res.success(outputs)
-        outputs: list[Any] = []
-        for statement in node.else_body:
+            return self.visit_block(node.if_body, context)
+        return self.visit_block(node.else_body, context)
+
+    def visit_block(self, statements: list[Any], context: Context) -> RuntimeResult:
+        res: RuntimeResult = RuntimeResult()
+        for statement in statements:
             result: Any = res.register(self.visit(statement, context))
             if res.error:
                 return res
-            outputs.append(result)
-        return res.success(outputs)
+            if result is not None and self.trace.enabled:
+                self.trace_result(result, statement, context)
+        return res.success(None)
 
     def visit_FunctionDeclareNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
@@ -730,15 +797,26 @@ class Interpreter:
                         context,
                     )
                 )
+        if node.slots is None:
+            # Declared in a tree that did not go through resolve().
+            resolve_function(node)
         result: Function = (
-            Function(node.name.value, node.parameters, node.body)
+            Function(node.name.value, node.parameters, node.body, node.slots)
             .set_pos(node.pos_start, node.pos_end)
             .set_context(context)
         )
         context.symbol_table.set(node.name.value, (result, False))
-        return res.success(
-            "Function with name '{}' has been declared.".format(node.name.value)
-        )
+        if self.trace.enabled:
+            self.trace.emit(
+                TraceEvent(
+                    DECLARE,
+                    context.display_name,
+                    node.pos_start,
+                    node.pos_end,
+                    name=node.name.value,
+                )
+            )
+        return res.success(None)
 
     def visit_FunctionCallNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
@@ -752,36 +830,33 @@ class Interpreter:
                     context,
                 )
             )
-        function_context: Context = Context(node.name.value)
-        function_context.parent = context
-        function_context.parent_entry_pos = node.pos_start
-        function_context.symbol_table = SymbolTable({})
-        function_context.symbol_table.parent = context.symbol_table
-        idx: int = 0
-        for parameter in func.parameters:
-            param_value: Any = res.register(self.visit(node.parameters[idx], context))
+        function_context: Context = self.enter_call(
+            node.name.value, func, context, node.pos_start
+        )
+        frame: list[Any] = function_context.frame
+        for parameter, parameter_node in zip(func.parameters, node.parameters):
+            param_value: Any = res.register(self.visit(parameter_node, context))
             if res.error:
                 return res
             param_value.set_pos(node.pos_start, node.pos_end).set_context(
                 function_context
             )
-            function_context.symbol_table.set(
-                parameter.var_name_tok.value, (param_value, False)
-            )
-            idx += 1
+            frame[parameter.slot] = param_value
 
-        results: list[Any] = []
+        # A call evaluates to a list holding its return value, the body runs
+        # up to the first return statement outside of an if block.
         for statement in func.body:
             result: Any = res.register(self.visit(statement, function_context))
             if res.error:
                 return res
             if isinstance(statement, ReturnNode):
-                results.append(result)
                 break
-            results.append(result)
+            if result is not None and self.trace.enabled:
+                self.trace_result(result, statement, function_context)
         else:
-            results.append(String(""))
-        return res.success(results)
+            result: Any = String("")
+        self.leave_call(function_context, result)
+        return res.success([result])
 
     def visit_ReturnNode(self, node: Any, context: Context) -> RuntimeResult:
         res: RuntimeResult = RuntimeResult()
@@ -861,11 +936,19 @@ class Interpreter:
                     if timeout.value > 2147483:
                         timeout: Number = Number(2147483, T_DECIMAL)
             msgbox.make_msgbox(title, text, option.value, timeout.value)
-            return res.success(
-                "MsgBox with title: '{}' and text: '{}' is being displayed.".format(
-                    title, text
+            if self.trace.enabled:
+                self.trace.emit(
+                    TraceEvent(
+                        COMMAND,
+                        context.display_name,
+                        node.pos_start,
+                        node.pos_end,
+                        name=node.name.value,
+                        title=title,
+                        text=text,
+                    )
                 )
-            )
+            return res.success(None)
         else:
             return res.failure(
                 RunTimeError(
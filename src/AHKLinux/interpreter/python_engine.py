@@ -0,0 +1,83 @@
+from typing import Any, Callable
+
+from base_classes.context import Context
+from interpreter import python_runtime
+from interpreter.code_cache import CodeCache
+from interpreter.interpreter import Interpreter
+from interpreter.python_runtime import ScriptError
+from interpreter.runtime_result import RuntimeResult
+from interpreter.trace import TraceSink
+from interpreter.transpiler import BODY_NAME, Transpiler, flatten
+
+
+class PythonEngine(Interpreter):
+    """
+    Execution engine that transpiles function bodies into Python code objects
+    on their first call, so CPython's own interpreter runs them. Code outside of
+    functions runs once and is walked as usual.
+
+    With a CodeCache the compiled bodies are marshalled to disk and loaded on
+    the next run of the same script instead of being transpiled again.
+    """
+
+    def __init__(
+        self, code_cache: CodeCache | None = None, trace: TraceSink | None = None
+    ) -> None:
+        super().__init__(trace)
+        self.code_cache: CodeCache | None = code_cache
+        # id(body) -> (body, function, table), the body is kept so the id stays
+        # unique.
+        self.bodies: dict[int, tuple[list[Any], Callable, list[Any]]] = {}
+
+    def run_body(self, func: Any, function_context: Context) -> list[Any]:
+        entry: tuple[list[Any], Callable, list[Any]] | None = self.bodies.get(
+            id(func.body)
+        )
+        if entry is None:
+            entry = self.load_body(func.body)
+            self.bodies[id(func.body)] = entry
+        return entry[1](python_runtime, self, function_context, entry[2])
+
+    def load_body(self, body: list[Any]) -> tuple[list[Any], Callable, list[Any]]:
+        table: list[Any] = flatten(body)
+        first: Any = next(
+            (item for item in table if getattr(item, "pos_start", None) is not None),
+            None,
+        )
+        filename: str = first.pos_start.filename if first is not None else "<unknown>"
+        code: Any = None
+        if self.code_cache is not None and first is not None:
+            code = self.code_cache.load_code(
+                first.pos_start.source.text,
+                filename,
+                first.pos_start.idx,
+                self.trace.enabled,
+            )
+        if code is None:
+            code = Transpiler(table, self.trace.enabled).compile_body(body, filename)
+            if self.code_cache is not None and first is not None:
+                self.code_cache.store_code(
+                    first.pos_start.source.text,
+                    filename,
+                    first.pos_start.idx,
+                    code,
+                    self.trace.enabled,
+                )
+        namespace: dict[str, Any] = {}
+        exec(code, namespace)
+        return body, namespace[BODY_NAME], table
+
+    def visit_FunctionCallNode(self, node: Any, context: Context) -> RuntimeResult:
+        res: RuntimeResult = RuntimeResult()
+        try:
+            prepared: tuple[Any, Context] = python_runtime.prepare_call(
+                self, context, node, node.name.value, len(node.parameters)
+            )
+            for idx, parameter in enumerate(node.parameters):
+                param_value: Any = res.register(self.visit(parameter, context))
+                if res.error:
+                    return res
+                python_runtime.bind(prepared, node, idx, param_value)
+            return res.success(python_runtime.call(self, prepared))
+        except ScriptError as error:
+            return res.failure(error.error)
@@ -0,0 +1,264 @@
+"""
+Support functions called by the Python code the Transpiler generates. Each one
+does what the matching Interpreter.visit_* handler does for one node, with the
+positions taken from the node or token passed in. Errors are raised as a
+ScriptError instead of being returned in a RuntimeResult.
+"""
+
+from typing import Any, NoReturn
+
+from base_classes.context import Context
+from base_classes.nodes import StringNode
+from constants import *
+from data_types.array import Array
+from data_types.associative_array import AssociativeArray
+from data_types.boolean import FALSE, TRUE, Boolean, evaluate_logical
+from data_types.number import Number
+from data_types.string import String
+from error_classes.runtime_error import RunTimeError
+from interpreter.trace import ASSIGN, TraceEvent
+
+
+class ScriptError(Exception):
+    def __init__(self, error: Any) -> None:
+        super().__init__(error)
+        self.error: Any = error
+
+
+def fail(node: Any, message: str, context: Context) -> NoReturn:
+    raise ScriptError(RunTimeError(node.pos_start, node.pos_end, message, context))
+
+
+def finish(context: Context, node: Any, result: Any, error: Any) -> Any:
+    if error:
+        raise ScriptError(error)
+    if result is not None:
+        result.set_context(context).set_pos(node.pos_start, node.pos_end)
+    return result
+
+
+def number(context: Context, value: Any, type_: str, node: Any) -> Number:
+    return (
+        Number(value, type_).set_context(context).set_pos(node.pos_start, node.pos_end)
+    )
+
+
+def string(context: Context, value: str, node: Any) -> String:
+    return String(value).set_context(context).set_pos(node.pos_start, node.pos_end)
+
+
+def boolean(context: Context, value: str, node: Any) -> Boolean:
+    return TRUE if value == "true" else FALSE
+
+
+def empty_string() -> String:
+    return String("")
+
+
+def array(context: Context, node: Any, elements: list[Any]) -> Array:
+    return (
+        Array.from_elements(elements)
+        .set_context(context)
+        .set_pos(node.pos_start, node.pos_end)
+    )
+
+
+def associative_array(
+    context: Context, node: Any, items: list[Any]
+) -> AssociativeArray:
+    # items holds the evaluated keys and values in turn.
+    return (
+        AssociativeArray.from_items(zip(items[::2], items[1::2]))
+        .set_context(context)
+        .set_pos(node.pos_start, node.pos_end)
+    )
+
+
+def load(context: Context, var_name: str, node: Any) -> Any:
+    # A name the function declares global or only reads.
+    var_value: Any = None
+    if context.symbol_table.global_from_child(var_name):
+        var_value = context.symbol_table.get(var_name)
+    if not var_value:
+        fail(node, "'{}' is not defined.".format(var_name), context)
+    return var_value.set_context(context).set_pos(node.pos_start, node.pos_end)
+
+
+def load_fast(context: Context, slot: int, var_name: str, node: Any) -> Any:
+    var_value: Any = context.frame[slot]
+    if not var_value:
+        fail(node, "'{}' is not defined.".format(var_name), context)
+    return var_value.set_context(context).set_pos(node.pos_start, node.pos_end)
+
+
+def store(
+    engine: Any, context: Context, var_name: str, node: Any, var_value: Any
+) -> None:
+    value: Any = var_value[-1] if isinstance(var_value, list) else var_value
+    context.symbol_table.set(var_name, (value, True))
+    assigned(engine, context, var_name, node, value)
+
+
+def store_fast(
+    engine: Any, context: Context, slot: int, var_name: str, node: Any, var_value: Any
+) -> None:
+    value: Any = var_value[-1] if isinstance(var_value, list) else var_value
+    context.frame[slot] = value
+    assigned(engine, context, var_name, node, value)
+
+
+def assigned(
+    engine: Any, context: Context, var_name: str, node: Any, value: Any
+) -> None:
+    value.set_context(context).set_pos(node.pos_start, node.pos_end)
+    if engine.trace.enabled:
+        engine.trace.emit(
+            TraceEvent(
+                ASSIGN,
+                context.display_name,
+                node.pos_start,
+                node.pos_end,
+                name=var_name,
+                value=value,
+            )
+        )
+
+
+def result(engine: Any, context: Context, node: Any, value: Any) -> None:
+    # Only called when tracing, for statements that are plain expressions.
+    if value is not None:
+        engine.trace_result(value, node, context)
+
+
+def check_number(context: Context, node: Any, left: Any) -> Number:
+    if not isinstance(left, Number):
+        fail(node, "{} is not a Number.".format(left), context)
+    return left
+
+
+def added_to(context: Context, node: Any, left: Number, right: Any) -> Number:
+    result, error = left.added_to(right)
+    return finish(context, node, result, error)
+
+
+def subtracted_by(context: Context, node: Any, left: Number, right: Any) -> Number:
+    result, error = left.subtracted_by(right)
+    return finish(context, node, result, error)
+
+
+def multiplied_by(context: Context, node: Any, left: Number, right: Any) -> Number:
+    result, error = left.multiplied_by(right)
+    return finish(context, node, result, error)
+
+
+def divided_by(context: Context, node: Any, left: Number, right: Any) -> Number:
+    result, error = left.divided_by(right)
+    return finish(context, node, result, error)
+
+
+def logical(context: Context, node: Any, operator: str, left: Any, right: Any) -> Any:
+    return evaluate_logical(left, right, operator)
+
+
+def is_string(value: Any) -> bool:
+    return isinstance(value, String)
+
+
+def concatenate(context: Context, node: Any, left: String, right: Any) -> Any:
+    result, error = left.concatenated_to(right)
+    return finish(context, node, result, error)
+
+
+def dot(context: Context, key: Any, node: Any, left: Any) -> Any:
+    # 'a.b' on anything but a String.
+    if not isinstance(left, AssociativeArray):
+        fail(
+            node,
+            "The object accessed is not a string or an Associative Array.",
+            context,
+        )
+    if isinstance(key.node, StringNode):
+        fail(node, "{} is not a String.".format(left), context)
+    result, error = left.get(key.name)
+    return finish(context, node, result, error)
+
+
+def concatenate_key(node: Any, left: String, right: Any) -> Any:
+    result, error = left.concatenated_to(right)
+    if error:
+        raise ScriptError(error)
+    if result is not None:
+        result.set_pos(node.pos_start, node.pos_end)
+    return result
+
+
+def object_get(context: Context, key: Any, node: Any, value: Any) -> Any:
+    # 'a.b' written as an object access, on anything but a String.
+    if isinstance(value, AssociativeArray):
+        if isinstance(key.node, StringNode):
+            fail(node, "{} is not a String.".format(value), context)
+        result, error = value.get(key.name)
+        return finish(context, node, result, error)
+    if isinstance(value, Array):
+        fail(node, "Cannot use '.' for this operation.", context)
+    fail(
+        node,
+        "The object accessed is not a String, an Array or an Associative Array.",
+        context,
+    )
+
+
+def not_(context: Context, node: Any, value: Any) -> Boolean:
+    return FALSE if value.boolean else TRUE
+
+
+def negative(node: Any, number: Any) -> Any:
+    if number.type == T_HEXADECIMAL:
+        number, error = number.multiplied_by(Number(-1, T_HEXADECIMAL))
+    else:
+        number, error = number.multiplied_by(Number(-1, T_DECIMAL))
+    if error:
+        raise ScriptError(error)
+    return number.set_pos(node.pos_start, node.pos_end)
+
+
+def positive(node: Any, number: Any) -> Any:
+    return number.set_pos(node.pos_start, node.pos_end)
+
+
+def prepare_call(
+    engine: Any, context: Context, node: Any, name: str, count: int
+) -> tuple[Any, Context]:
+    func: Any = context.symbol_table.get(name)
+    if count != len(func.parameters):
+        fail(
+            node,
+            "Parameter mismatch. Function call misses one or more required parameters.",
+            context,
+        )
+    return func, engine.enter_call(name, func, context, node.pos_start)
+
+
+def bind(prepared: tuple[Any, Context], node: Any, idx: int, param_value: Any) -> None:
+    func, function_context = prepared
+    param_value.set_pos(node.pos_start, node.pos_end).set_context(function_context)
+    function_context.frame[func.parameters[idx].slot] = param_value
+
+
+def call(engine: Any, prepared: tuple[Any, Context], *bound: None) -> list[Any]:
+    # The arguments were bound while the call expression was evaluated.
+    results: list[Any] = engine.run_body(*prepared)
+    engine.leave_call(prepared[1], results[0])
+    return results
+
+
+def check_return(context: Context, node: Any) -> None:
+    if context.display_name == "<module>":
+        fail(node, "Return statement cannot be used here.", context)
+
+
+def walk(engine: Any, context: Context, node: Any) -> Any:
+    res: Any = engine.dispatch.get(type(node), engine.no_visit_method)(node, context)
+    if res.error:
+        raise ScriptError(res.error)
+    return res.value
@@ -0,0 +1,85 @@
+from typing import Any, Iterator
+
+from base_classes.nodes import *
+from base_classes.tokens import Token
+
+
+def walk(nodes: list[Any]) -> Iterator[Any]:
+    """
+    Every node under `nodes`, without entering the bodies of the functions
+    declared there, those are resolved on their own.
+    """
+    stack: list[Any] = list(reversed(nodes))
+    while stack:
+        item: Any = stack.pop()
+        if isinstance(item, list):
+            stack.extend(reversed(item))
+            continue
+        if isinstance(item, dict):
+            for key, value in reversed(list(item.items())):
+                stack.append(value)
+                stack.append(key)
+            continue
+        if not isinstance(item, NODE_CLASSES):
+            continue
+        yield item
+        if isinstance(item, FunctionDeclareNode):
+            continue
+        for slot in reversed(type(item).__slots__):
+            stack.append(getattr(item, slot, None))
+
+
+def resolve(nodes: list[Any]) -> None:
+    """
+    Resolves the variables of every function declared in a script to slots of
+    its call frame. Run once on the nodes of a script, after parsing.
+    """
+    for node in walk(nodes):
+        if isinstance(node, FunctionDeclareNode):
+            resolve_function(node)
+
+
+def resolve_function(node: Any) -> None:
+    """
+    A name is local to a function when it is one of its parameters or it is
+    assigned in the body without the global keyword. Locals get the index of
+    their slot in the frame in order of appearance, parameters first. Names the
+    function declares global or only reads keep slot None and are looked up
+    among the globals by name, as are all names outside of functions.
+    """
+    body_nodes: list[Any] = list(walk(node.body))
+    declared_global: set[str] = set()
+    assigned: list[str] = []
+    for item in body_nodes:
+        if isinstance(item, VarAssignNode) and item.scope == "global":
+            declared_global.add(item.var_name.value.casefold())
+        elif isinstance(item, (VarAssignNode, L_VarAssignNode)):
+            assigned.append(item.var_name.value.casefold())
+
+    slots: dict[str, int] = {}
+    for parameter in node.parameters:
+        if isinstance(parameter, VarAccessNode):
+            key: str = parameter.var_name_tok.value.casefold()
+            parameter.slot = slots.setdefault(key, len(slots))
+    for key in assigned:
+        if key not in declared_global:
+            slots.setdefault(key, len(slots))
+
+    def lookup(name: Any) -> int | None:
+        if not isinstance(name, str) or name.casefold() in declared_global:
+            return None
+        return slots.get(name.casefold())
+
+    for item in body_nodes:
+        if isinstance(item, VarAccessNode):
+            item.slot = lookup(item.var_name_tok.value)
+        elif isinstance(item, (VarAssignNode, L_VarAssignNode)):
+            item.slot = lookup(item.var_name.value)
+        elif isinstance(item, ObjectKeyNode):
+            # A token key is read as a variable when it is concatenated.
+            item.slot = (
+                lookup(item.node.value) if isinstance(item.node, Token) else None
+            )
+        elif isinstance(item, FunctionDeclareNode):
+            resolve_function(item)
+    node.slots = slots
@@ -0,0 +1,148 @@
+"""
+Events the engines emit while a script runs, and the sinks that receive them.
+
+Statements do not evaluate to messages: an assignment, a declaration or a
+command reports what it did as a TraceEvent to the engine's sink, the
+statement itself evaluates to None. Statements that are plain expressions
+evaluate to their value, which is reported as a RESULT event by whatever runs
+them, and a function call evaluates to a list holding its return value.
+"""
+
+import json
+from typing import Any, IO
+
+from base_classes.position import Position
+
+ASSIGN: str = "assign"
+LEGACY_ASSIGN: str = "legacy_assign"
+KEY_ASSIGN: str = "key_assign"
+INDEX_ASSIGN: str = "index_assign"
+DECLARE: str = "declare"
+CALL: str = "call"
+RETURN: str = "return"
+COMMAND: str = "command"
+RESULT: str = "result"
+
+# kind -> the line the -d option prints, events of other kinds print nothing.
+TEXT_FORMATS: dict[str, str] = {
+    ASSIGN: "'{name}' inside '{scope}' has been assigned the value '{value}'.",
+    LEGACY_ASSIGN: "'{name}' inside '{scope}' has been assigned the value {value}.",
+    KEY_ASSIGN: "Key '{name}' was assigned the value {value}.",
+    INDEX_ASSIGN: "Index {name} was assigned the value {value}.",
+    DECLARE: "Function with name '{name}' has been declared.",
+    COMMAND: "{name} with title: '{title}' and text: '{text}' is being displayed.",
+}
+
+
+class TraceEvent:
+    __slots__ = ("kind", "scope", "pos_start", "pos_end", "fields")
+
+    def __init__(
+        self,
+        kind: str,
+        scope: str,
+        pos_start: Position | None,
+        pos_end: Position | None,
+        **fields: Any,
+    ) -> None:
+        self.kind: str = kind
+        # Display name of the context the event happened in.
+        self.scope: str = scope
+        self.pos_start: Position | None = pos_start
+        self.pos_end: Position | None = pos_end
+        self.fields: dict[str, Any] = fields
+
+    def __repr__(self) -> str:
+        return "TraceEvent({}, {}, {})".format(self.kind, self.scope, self.fields)
+
+
+def flatten_result(value: Any) -> list[Any]:
+    # A call's value nests the values of the calls it returned.
+    if not isinstance(value, list):
+        return [value]
+    return [item for element in value for item in flatten_result(element)]
+
+
+class TraceSink:
+    """
+    Receives the events of a run. This one drops them, it is the sink of a run
+    without -d: engines check `enabled` before building an event, so nothing is
+    formatted or kept.
+
+    `flush` is called after every top level statement that succeeded,
+    `discard` when one failed.
+    """
+
+    enabled: bool = False
+
+    def emit(self, event: TraceEvent) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def discard(self) -> None:
+        pass
+
+
+class TextSink(TraceSink):
+    """
+    Prints the -d output. The lines of a top level statement are held until it
+    finishes, a statement that fails prints only its error.
+    """
+
+    enabled: bool = True
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def emit(self, event: TraceEvent) -> None:
+        if event.kind == RESULT:
+            self.lines.extend(
+                str(item) for item in flatten_result(event.fields["value"])
+            )
+            return
+        text_format: str | None = TEXT_FORMATS.get(event.kind)
+        if text_format is not None:
+            self.lines.append(text_format.format(scope=event.scope, **event.fields))
+
+    def flush(self) -> None:
+        for line in self.lines:
+            print(line)
+        self.lines.clear()
+
+    def discard(self) -> None:
+        self.lines.clear()
+
+
+class JsonLinesSink(TraceSink):
+    """
+    Writes every event as one JSON object per line, with the file and line it
+    happened at. Values are written as the text the script would display.
+    Events are written as they happen, those of a failing statement included.
+    """
+
+    enabled: bool = True
+
+    def __init__(self, file: IO[str]) -> None:
+        self.file: IO[str] = file
+
+    def emit(self, event: TraceEvent) -> None:
+        record: dict[str, Any] = {"event": event.kind, "scope": event.scope}
+        if event.pos_start is not None:
+            record["file"] = event.pos_start.filename
+            record["line"] = event.pos_start.line
+        for name, value in event.fields.items():
+            record[name] = to_json(value)
+        self.file.write(json.dumps(record) + "\n")
+
+    def flush(self) -> None:
+        self.file.flush()
+
+
+def to_json(value: Any) -> Any:
+    if isinstance(value, list):
+        return [to_json(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return str(value)
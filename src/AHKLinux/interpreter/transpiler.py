@@ -0,0 +1,438 @@
+import ast
+from types import CodeType
+from typing import Any
+
+from base_classes.nodes import *
+from base_classes.tokens import Token
+from constants import *
+from interpreter.bytecode import yields_number
+
+# Name of the function every transpiled body defines. It is called as
+# BODY_NAME(rt, engine, context, N) where rt is the python_runtime module and N
+# the table built by flatten() for the same body.
+BODY_NAME: str = "__ahk_body__"
+
+ARITHMETIC_HELPERS: dict[str, str] = {
+    T_PLUS: "added_to",
+    T_MINUS: "subtracted_by",
+    T_MULTIPLY: "multiplied_by",
+    T_DIVIDE: "divided_by",
+}
+
+
+def flatten(body: list[Any]) -> list[Any]:
+    """
+    Every node and token under `body`, in a fixed order. Generated code refers
+    to them by their index in this table, so a code object loaded from the
+    cache only needs the table rebuilt for it.
+    """
+    table: list[Any] = []
+    seen: set[int] = set()
+    stack: list[Any] = list(reversed(body))
+    while stack:
+        item: Any = stack.pop()
+        if isinstance(item, list):
+            stack.extend(reversed(item))
+            continue
+        if isinstance(item, dict):
+            for key, value in reversed(list(item.items())):
+                stack.append(value)
+                stack.append(key)
+            continue
+        if not isinstance(item, (Token,) + NODE_CLASSES) or id(item) in seen:
+            continue
+        seen.add(id(item))
+        table.append(item)
+        if isinstance(item, Token):
+            continue
+        for slot in reversed(type(item).__slots__):
+            stack.append(getattr(item, slot, None))
+    return table
+
+
+class Transpiler:
+    """
+    Translates a function body into a Python module whose only statement
+    defines BODY_NAME, one statement per statement of the body followed by the
+    return of the list of results. Every AHK node becomes a call into python_runtime, the
+    generated code carries the line numbers of the script so Python tracebacks
+    point at the .ahk source. Only the value of the return statement is kept,
+    the list returned holds just that.
+
+    Node types without a transpile_* method run the tree-walking visit_*
+    handler through python_runtime.walk.
+    """
+
+    def __init__(self, table: list[Any], traced: bool = False) -> None:
+        self.traced: bool = traced
+        self.index: dict[int, int] = {id(item): idx for idx, item in enumerate(table)}
+        self.temporaries: int = 0
+        self.line: int = 1
+        self.transpilers: dict[type, Any] = {
+            node_class: getattr(self, "transpile_{}".format(node_class.__name__))
+            for node_class in NODE_CLASSES
+            if hasattr(self, "transpile_{}".format(node_class.__name__))
+        }
+
+    def compile_body(self, body: list[Any], filename: str) -> CodeType:
+        statements: list[ast.stmt] = []
+        results: list[ast.expr] = []
+        for statement in body:
+            value: ast.expr = self.transpile_statement(statement)
+            if not isinstance(statement, ReturnNode):
+                statements.append(self.located(ast.Expr(value)))
+                continue
+            name: str = "_r{}".format(len(results))
+            statements.append(
+                self.located(
+                    ast.Assign(
+                        targets=[ast.Name(name, ast.Store())],
+                        value=value,
+                    )
+                )
+            )
+            results.append(ast.Name(name, ast.Load()))
+            break
+        else:
+            results.append(self.helper("empty_string"))
+        statements.append(self.located(ast.Return(ast.List(results, ast.Load()))))
+        function: ast.FunctionDef = ast.FunctionDef(
+            name=BODY_NAME,
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(name) for name in ("rt", "engine", "context", "N")],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
+            ),
+            body=statements,
+            decorator_list=[],
+        )
+        function.lineno = function.end_lineno = 1
+        function.col_offset = function.end_col_offset = 0
+        module: ast.Module = ast.Module(body=[function], type_ignores=[])
+        return compile(ast.fix_missing_locations(module), filename, "exec")
+
+    def located(self, py_node: Any) -> Any:
+        py_node.lineno = py_node.end_lineno = self.line
+        py_node.col_offset = py_node.end_col_offset = 0
+        return py_node
+
+    def transpile(self, node: Any) -> ast.expr:
+        pos_start: Any = getattr(node, "pos_start", None)
+        line: int = pos_start.line if pos_start is not None else self.line
+        self.line = line
+        py_node: ast.expr = self.transpilers.get(type(node), self.transpile_walk)(node)
+        # The operands may sit on later lines, the expression starts on this one.
+        self.line = line
+        return self.located(py_node)
+
+    def helper(self, name: str, *args: ast.expr) -> ast.Call:
+        return self.located(
+            ast.Call(
+                func=ast.Attribute(ast.Name("rt", ast.Load()), name, ast.Load()),
+                args=list(args),
+                keywords=[],
+            )
+        )
+
+    def ref(self, item: Any) -> ast.expr:
+        # The node or token as an entry of the table.
+        if item is None:
+            return ast.Constant(None)
+        return ast.Subscript(
+            ast.Name("N", ast.Load()), ast.Constant(self.index[id(item)]), ast.Load()
+        )
+
+    def name(self, name: str) -> ast.Name:
+        return ast.Name(name, ast.Load())
+
+    def temporary(self) -> str:
+        self.temporaries += 1
+        return "_t{}".format(self.temporaries)
+
+    def transpile_walk(self, node: Any) -> ast.expr:
+        return self.helper(
+            "walk", self.name("engine"), self.name("context"), self.ref(node)
+        )
+
+    def transpile_list(self, statements: list[Any]) -> ast.expr:
+        return ast.List(
+            [self.transpile(statement) for statement in statements], ast.Load()
+        )
+
+    def transpile_statement(self, statement: Any) -> ast.expr:
+        value: ast.expr = self.transpile(statement)
+        if not self.traced or isinstance(statement, (ReturnNode, IfNode, IfElseNode)):
+            return value
+        # Reports the value of a statement that is a plain expression, if
+        # blocks evaluate to the tuple of theirs and report them themselves.
+        return self.helper(
+            "result",
+            self.name("engine"),
+            self.name("context"),
+            self.ref(statement),
+            value,
+        )
+
+    def transpile_block(self, statements: list[Any]) -> ast.expr:
+        # A tuple evaluates the statements in turn without keeping a list.
+        return ast.Tuple(
+            [self.transpile_statement(statement) for statement in statements],
+            ast.Load(),
+        )
+
+    def transpile_NumberNode(self, node: Any) -> ast.expr:
+        return self.helper(
+            "number",
+            self.name("context"),
+            ast.Constant(node.tok.value),
+            ast.Constant(node.tok.type),
+            self.ref(node),
+        )
+
+    def transpile_StringNode(self, node: Any) -> ast.expr:
+        if not node.quoted:
+            # The resolver gives '%var%' names no slots, they are looked up by name
+            # while the template renders, reuse the handler doing that.
+            return self.transpile_walk(node)
+        return self.helper(
+            "string", self.name("context"), ast.Constant(node.tok.value), self.ref(node)
+        )
+
+    def transpile_BooleanNode(self, node: Any) -> ast.expr:
+        return self.helper(
+            "boolean",
+            self.name("context"),
+            ast.Constant(node.tok.value),
+            self.ref(node),
+        )
+
+    def transpile_ArrayNode(self, node: Any) -> ast.expr:
+        return self.helper(
+            "array",
+            self.name("context"),
+            self.ref(node),
+            self.transpile_list(node.value_list),
+        )
+
+    def transpile_AssociativeArrayNode(self, node: Any) -> ast.expr:
+        items: list[ast.expr] = []
+        for key_node, value_node in node.value_dict.items():
+            items.append(self.transpile(key_node))
+            items.append(self.transpile(value_node))
+        return self.helper(
+            "associative_array",
+            self.name("context"),
+            self.ref(node),
+            ast.List(items, ast.Load()),
+        )
+
+    def transpile_VarAccessNode(self, node: Any) -> ast.expr:
+        return self.load(node.var_name_tok, node.slot, node)
+
+    def load(self, tok: Token, slot: int | None, node: Any) -> ast.expr:
+        if slot is not None:
+            return self.helper(
+                "load_fast",
+                self.name("context"),
+                ast.Constant(slot),
+                ast.Constant(tok.value),
+                self.ref(node),
+            )
+        return self.helper(
+            "load", self.name("context"), ast.Constant(tok.value), self.ref(node)
+        )
+
+    def transpile_VarAssignNode(self, node: Any) -> ast.expr:
+        if node.slot is not None:
+            return self.helper(
+                "store_fast",
+                self.name("engine"),
+                self.name("context"),
+                ast.Constant(node.slot),
+                ast.Constant(node.var_name.value),
+                self.ref(node),
+                self.transpile(node.value_node),
+            )
+        return self.helper(
+            "store",
+            self.name("engine"),
+            self.name("context"),
+            ast.Constant(node.var_name.value),
+            self.ref(node),
+            self.transpile(node.value_node),
+        )
+
+    def transpile_BinOpNode(self, node: Any) -> ast.expr:
+        if node.op_tok.type in ARITHMETIC_HELPERS:
+            left: ast.expr = self.transpile(node.left_node)
+            if not yields_number(node.left_node):
+                # Checked before the right operand is evaluated.
+                left = self.helper(
+                    "check_number", self.name("context"), self.ref(node), left
+                )
+            return self.helper(
+                ARITHMETIC_HELPERS[node.op_tok.type],
+                self.name("context"),
+                self.ref(node),
+                left,
+                self.transpile(node.right_node),
+            )
+        if node.op_tok.type == T_DOT:
+            # Only a String left operand evaluates the right one.
+            left_name: str = self.temporary()
+            left: ast.expr = self.transpile(node.left_node)
+            return ast.IfExp(
+                test=self.helper(
+                    "is_string", ast.NamedExpr(ast.Name(left_name, ast.Store()), left)
+                ),
+                body=self.helper(
+                    "concatenate",
+                    self.name("context"),
+                    self.ref(node),
+                    self.name(left_name),
+                    self.transpile_concat_operand(node.right_node),
+                ),
+                orelse=self.helper(
+                    "dot",
+                    self.name("context"),
+                    self.ref(node.right_node),
+                    self.ref(node),
+                    self.name(left_name),
+                ),
+            )
+        if node.op_tok.type == T_LSQUARE:
+            return self.transpile_walk(node)
+        operator: str = "and" if node.op_tok.matches(T_KEYWORD, "and") else "or"
+        return self.helper(
+            "logical",
+            self.name("context"),
+            self.ref(node),
+            ast.Constant(operator),
+            self.transpile(node.left_node),
+            self.transpile(node.right_node),
+        )
+
+    def transpile_concat_operand(self, key: Any) -> ast.expr:
+        if isinstance(key, ObjectKeyNode):
+            if isinstance(key.node, Token):
+                return self.load(key.node, key.slot, key.node)
+            return self.transpile(key.node)
+        return self.transpile(key)
+
+    def transpile_ObjectAccessNode(self, node: Any) -> ast.expr:
+        key: Any = node.key
+        if node.access_method != T_DOT or not isinstance(key, ObjectKeyNode):
+            return self.transpile_walk(node)
+        if isinstance(key.node, Token) and key.node.type == T_IDENTIFIER:
+            right: ast.expr = self.load(key.node, key.slot, key.node)
+        elif isinstance(key.node, Token) and key.node.type == T_STRING:
+            right: ast.expr = self.helper(
+                "string",
+                self.name("context"),
+                ast.Constant(key.node.value),
+                self.ref(key.node),
+            )
+        elif isinstance(key.node, Token) and key.node.type in (
+            T_DECIMAL,
+            T_HEXADECIMAL,
+        ):
+            right: ast.expr = self.helper(
+                "number",
+                self.name("context"),
+                ast.Constant(key.node.value),
+                ast.Constant(key.node.type),
+                self.ref(key.node),
+            )
+        else:
+            right: ast.expr = self.transpile(key.node)
+        value_name: str = self.temporary()
+        value: ast.expr = self.transpile(node.access_node)
+        return ast.IfExp(
+            test=self.helper(
+                "is_string", ast.NamedExpr(ast.Name(value_name, ast.Store()), value)
+            ),
+            body=self.helper(
+                "concatenate_key", self.ref(node), self.name(value_name), right
+            ),
+            orelse=self.helper(
+                "object_get",
+                self.name("context"),
+                self.ref(key),
+                self.ref(node),
+                self.name(value_name),
+            ),
+        )
+
+    def transpile_UnaryOpNode(self, node: Any) -> ast.expr:
+        operand: ast.expr = self.transpile(node.node)
+        if node.op_tok.matches(T_KEYWORD, "not"):
+            return self.helper("not_", self.name("context"), self.ref(node), operand)
+        if node.op_tok.type == T_MINUS:
+            return self.helper("negative", self.ref(node), operand)
+        return self.helper("positive", self.ref(node), operand)
+
+    def truth(self, condition_node: Any) -> ast.expr:
+        return ast.Attribute(self.transpile(condition_node), "boolean", ast.Load())
+
+    def transpile_TernaryOpNode(self, node: Any) -> ast.expr:
+        return ast.IfExp(
+            test=self.truth(node.condition_node),
+            body=self.transpile(node.true_node),
+            orelse=self.transpile(node.false_node),
+        )
+
+    def transpile_IfNode(self, node: Any) -> ast.expr:
+        return ast.IfExp(
+            test=self.truth(node.condition_node),
+            body=self.transpile_block(node.if_body),
+            orelse=self.transpile_block([]),
+        )
+
+    def transpile_IfElseNode(self, node: Any) -> ast.expr:
+        return ast.IfExp(
+            test=self.truth(node.condition_node),
+            body=self.transpile_block(node.if_body),
+            orelse=self.transpile_block(node.else_body),
+        )
+
+    def transpile_FunctionCallNode(self, node: Any) -> ast.expr:
+        # The function is looked up and checked before any argument is
+        # evaluated, each argument is bound right after it is evaluated.
+        call_name: str = self.temporary()
+        prepared: ast.expr = self.helper(
+            "prepare_call",
+            self.name("engine"),
+            self.name("context"),
+            self.ref(node),
+            ast.Constant(node.name.value),
+            ast.Constant(len(node.parameters)),
+        )
+        arguments: list[ast.expr] = [
+            self.name("engine"),
+            ast.NamedExpr(ast.Name(call_name, ast.Store()), prepared),
+        ]
+        for idx, parameter in enumerate(node.parameters):
+            arguments.append(
+                self.helper(
+                    "bind",
+                    self.name(call_name),
+                    self.ref(node),
+                    ast.Constant(idx),
+                    self.transpile(parameter),
+                )
+            )
+        return self.helper("call", *arguments)
+
+    def transpile_ReturnNode(self, node: Any) -> ast.expr:
+        if node.node is None:
+            return self.helper("empty_string")
+        check: ast.expr = self.helper(
+            "check_return", self.name("context"), self.ref(node)
+        )
+        return ast.Subscript(
+            ast.Tuple([check, self.transpile(node.node)], ast.Load()),
+            ast.Constant(1),
+            ast.Load(),
+        )
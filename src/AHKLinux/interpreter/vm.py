@@ -0,0 +1,370 @@
+from typing import Any
+
+from base_classes.context import Context
+from base_classes.nodes import *
+from constants import *
+from data_types.array import Array
+from data_types.associative_array import AssociativeArray
+from data_types.boolean import FALSE, TRUE, evaluate_logical
+from data_types.number import Number
+from data_types.string import String
+from error_classes.runtime_error import RunTimeError
+from interpreter.bytecode import *
+from interpreter.interpreter import Interpreter
+from interpreter.runtime_result import RuntimeResult
+from interpreter.trace import ASSIGN, RESULT, TraceEvent, TraceSink
+
+
+class VirtualMachine(Interpreter):
+    """
+    Execution engine that lowers nodes to bytecode with the bytecode.Compiler
+    and runs the instructions on a value stack.
+
+    As with the ClosureCompiler, code outside of functions runs exactly once
+    and is walked as usual, except for function calls which run the compiled
+    body. Function bodies are compiled on the first call, nodes the tree
+    handlers visit inside a function on the first visit, and both are kept for
+    the calls after it.
+    """
+
+    def __init__(self, trace: TraceSink | None = None) -> None:
+        super().__init__(trace)
+        self.compiler: Compiler = Compiler()
+        self.compiled: dict[Any, CodeObject] = {}
+        # id(body) -> (body, code), the body is kept so the id stays unique.
+        self.bodies: dict[int, tuple[list[Any], CodeObject]] = {}
+
+    def visit(self, node: Any, context: Context) -> RuntimeResult:
+        if context.parent is None:
+            if type(node) is not FunctionCallNode:
+                return self.dispatch.get(type(node), self.no_visit_method)(
+                    node, context
+                )
+            return self.run(self.compiler.compile_statement(node), context)
+        code: CodeObject | None = self.compiled.get(node)
+        if code is None:
+            code = self.compiler.compile_statement(node)
+            self.compiled[node] = code
+        return self.run(code, context)
+
+    def body_code(self, func: Any) -> CodeObject:
+        entry: tuple[list[Any], CodeObject] | None = self.bodies.get(id(func.body))
+        if entry is None:
+            entry = (func.body, self.compiler.compile_body(func.body, func.name))
+            self.bodies[id(func.body)] = entry
+        return entry[1]
+
+    def run(self, code: CodeObject, context: Context) -> RuntimeResult:
+        ops: list[int] = code.ops
+        consts: list[Any] = code.consts
+        stack: list[Any] = []
+        push = stack.append
+        pop = stack.pop
+        trace: TraceSink = self.trace
+        error: Any = None
+        pc: int = 0
+        end: int = len(ops)
+        while pc < end:
+            op: int = ops[pc]
+            arg: int = ops[pc + 1]
+            pc += 2
+
+            if op == LOAD_FAST:
+                slot, var_name, pos_start, pos_end = consts[arg]
+                var_value: Any = context.frame[slot]
+                if not var_value:
+                    error = RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "'{}' is not defined.".format(var_name),
+                        context,
+                    )
+                    break
+                push(var_value.set_context(context).set_pos(pos_start, pos_end))
+
+            elif op == LOAD_NAME:
+                var_name, pos_start, pos_end = consts[arg]
+                if context.frame is None or context.symbol_table.global_from_child(
+                    var_name
+                ):
+                    var_value: Any = context.symbol_table.get(var_name)
+                else:
+                    var_value: Any = None
+                if not var_value:
+                    error = RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "'{}' is not defined.".format(var_name),
+                        context,
+                    )
+                    break
+                push(var_value.set_context(context).set_pos(pos_start, pos_end))
+
+            elif op == MAKE_NUMBER:
+                value, type_, pos_start, pos_end = consts[arg]
+                push(
+                    Number(value, type_)
+                    .set_context(context)
+                    .set_pos(pos_start, pos_end)
+                )
+
+            elif op == CHECK_NUMBER:
+                if not isinstance(stack[-1], Number):
+                    pos_start, pos_end = consts[arg]
+                    error = RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "{} is not a Number.".format(stack[-1]),
+                        context,
+                    )
+                    break
+
+            elif op == BINARY_ARITHMETIC:
+                operation, pos_start, pos_end = consts[arg]
+                right: Any = pop()
+                result, error = operation(pop(), right)
+                if error:
+                    break
+                if result is not None:
+                    result.set_context(context).set_pos(pos_start, pos_end)
+                push(result)
+
+            elif op == STORE_FAST or op == STORE_NAME:
+                var_value: Any = pop()
+                value: Any = var_value[-1] if isinstance(var_value, list) else var_value
+                if op == STORE_FAST:
+                    slot, var_name, pos_start, pos_end = consts[arg]
+                    context.frame[slot] = value
+                else:
+                    var_name, pos_start, pos_end = consts[arg]
+                    context.symbol_table.set(
+                        var_name, (value, context.frame is not None)
+                    )
+                value.set_context(context).set_pos(pos_start, pos_end)
+                if trace.enabled:
+                    trace.emit(
+                        TraceEvent(
+                            ASSIGN,
+                            context.display_name,
+                            pos_start,
+                            pos_end,
+                            name=var_name,
+                            value=value,
+                        )
+                    )
+                push(None)
+
+            elif op == MAKE_STRING:
+                value, pos_start, pos_end = consts[arg]
+                push(String(value).set_context(context).set_pos(pos_start, pos_end))
+
+            elif op == POP_JUMP_IF_FALSE:
+                if not pop().boolean:
+                    pc = arg
+
+            elif op == JUMP:
+                pc = arg
+
+            elif op == PUSH_NONE:
+                push(None)
+
+            elif op == POP_RESULT:
+                value: Any = pop()
+                if value is not None and trace.enabled:
+                    pos_start, pos_end = consts[arg]
+                    trace.emit(
+                        TraceEvent(
+                            RESULT,
+                            context.display_name,
+                            pos_start,
+                            pos_end,
+                            value=value,
+                        )
+                    )
+
+            elif op == PREPARE_CALL:
+                name, count, pos_start, pos_end = consts[arg]
+                func: Any = context.symbol_table.get(name)
+                if count != len(func.parameters):
+                    error = RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "Parameter mismatch. Function call misses one or more required parameters.",
+                        context,
+                    )
+                    break
+                push(func)
+                push(self.enter_call(name, func, context, pos_start))
+
+            elif op == BIND_ARGUMENT:
+                idx, pos_start, pos_end = consts[arg]
+                param_value: Any = pop()
+                function_context: Context = stack[-1]
+                param_value.set_pos(pos_start, pos_end).set_context(function_context)
+                function_context.frame[stack[-2].parameters[idx].slot] = param_value
+
+            elif op == CALL_FUNCTION:
+                function_context: Context = pop()
+                res: RuntimeResult = self.run(self.body_code(pop()), function_context)
+                if res.error:
+                    return res
+                self.leave_call(function_context, res.value[0])
+                push(res.value)
+
+            elif op == RETURN_VALUE:
+                return RuntimeResult().success([pop()])
+
+            elif op == CHECK_RETURN:
+                if context.display_name == "<module>":
+                    pos_start, pos_end = consts[arg]
+                    error = RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "Return statement cannot be used here.",
+                        context,
+                    )
+                    break
+
+            elif op == MAKE_EMPTY_STRING:
+                push(String(""))
+
+            elif op == ACCESS_DOT:
+                right_node, pos_start, pos_end, target = consts[arg]
+                left: Any = stack[-1]
+                if isinstance(left, String):
+                    continue
+                if not isinstance(left, AssociativeArray):
+                    error = RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "The object accessed is not a string or an Associative Array.",
+                        context,
+                    )
+                    break
+                if isinstance(right_node.node, StringNode):
+                    error = RunTimeError(
+                        pos_start,
+                        pos_end,
+                        "{} is not a String.".format(left),
+                        context,
+                    )
+                    break
+                result, error = left.get(right_node.name)
+                if error:
+                    break
+                if result is not None:
+                    result.set_context(context).set_pos(pos_start, pos_end)
+                stack[-1] = result
+                pc = target
+
+            elif op == CONCATENATE:
+                pos_start, pos_end = consts[arg]
+                right: Any = pop()
+                result, error = pop().concatenated_to(right)
+                if error:
+                    break
+                if result is not None:
+                    result.set_context(context).set_pos(pos_start, pos_end)
+                push(result)
+
+            elif op == ACCESS_OBJECT:
+                key, pos_start, pos_end, target = consts[arg]
+                compiled_access_node: Any = stack[-1]
+                if isinstance(compiled_access_node, String):
+                    continue
+                if isinstance(compiled_access_node, AssociativeArray):
+                    if isinstance(key.node, StringNode):
+                        error = RunTimeError(
+                            pos_start,
+                            pos_end,
+                            "{} is not a String.".format(compiled_access_node),
+                            context,
+                        )
+                        break
+                    value, error = compiled_access_node.get(key.name)
+                    if error:
+                        break
+                    if value is not None:
+                        value.set_context(context).set_pos(pos_start, pos_end)
+                    stack[-1] = value
+                    pc = target
+                    continue
+                if isinstance(compiled_access_node, Array):
+                    message: str = "Cannot use '.' for this operation."
+                else:
+                    message: str = (
+                        "The object accessed is not a String, an Array or an Associative Array."
+                    )
+                error = RunTimeError(pos_start, pos_end, message, context)
+                break
+
+            elif op == CONCATENATE_KEY:
+                pos_start, pos_end = consts[arg]
+                right: Any = pop()
+                result, error = pop().concatenated_to(right)
+                if error:
+                    break
+                if result is not None:
+                    result.set_pos(pos_start, pos_end)
+                push(result)
+
+            elif op == BINARY_LOGICAL:
+                operator, pos_start, pos_end = consts[arg]
+                right: Any = pop()
+                push(evaluate_logical(pop(), right, operator))
+
+            elif op == MAKE_BOOLEAN:
+                push(TRUE if consts[arg][0] == "true" else FALSE)
+
+            elif op == UNARY_NOT:
+                push(FALSE if pop().boolean else TRUE)
+
+            elif op == UNARY_NEGATIVE:
+                pos_start, pos_end = consts[arg]
+                number: Any = pop()
+                if number.type == T_HEXADECIMAL:
+                    number, error = number.multiplied_by(Number(-1, T_HEXADECIMAL))
+                else:
+                    number, error = number.multiplied_by(Number(-1, T_DECIMAL))
+                if error:
+                    break
+                push(number.set_pos(pos_start, pos_end))
+
+            elif op == UNARY_POSITIVE:
+                pos_start, pos_end = consts[arg]
+                push(pop().set_pos(pos_start, pos_end))
+
+            elif op == MAKE_ARRAY:
+                count, pos_start, pos_end = consts[arg]
+                elements: list[Any] = stack[len(stack) - count :]
+                del stack[len(stack) - count :]
+                push(
+                    Array.from_elements(elements)
+                    .set_context(context)
+                    .set_pos(pos_start, pos_end)
+                )
+
+            elif op == MAKE_ASSOCIATIVE_ARRAY:
+                count, pos_start, pos_end = consts[arg]
+                items: list[Any] = stack[len(stack) - 2 * count :]
+                del stack[len(stack) - 2 * count :]
+                obj: AssociativeArray = AssociativeArray.from_items(
+                    zip(items[::2], items[1::2])
+                )
+                push(obj.set_context(context).set_pos(pos_start, pos_end))
+
+            elif op == WALK:
+                node: Any = consts[arg]
+                res: RuntimeResult = self.dispatch.get(
+                    type(node), self.no_visit_method
+                )(node, context)
+                if res.error:
+                    return res
+                push(res.value)
+
+            else:
+                raise Exception("Unknown opcode {}.".format(op))
+
+        if error:
+            return RuntimeResult().failure(error)
+        return RuntimeResult().success(stack.pop())
@@ -1,14 +1,44 @@
+import re
+from typing import Generator
+
 from base_classes.context import Context
-from base_classes.position import Position
+from base_classes.position import Position, Source
 from base_classes.tokens import Token
 from constants import *
 from error_classes.illegal_char_error import IllegalCharError
+from lexer.token_buffer import TokenBuffer
+
+NUMBER_REGEX: re.Pattern = re.compile(r"[0-9.xa-fA-F]*")
+IDENTIFIER_REGEX: re.Pattern = re.compile(r"[A-Za-z0-9_#@$]*")
+# Escape sequences are resolved in one pass when the literal is lexed, strings
+# built at runtime are never scanned for them.
+ESCAPE_REGEX: re.Pattern = re.compile(
+    "|".join(re.escape(sequence) for sequence in ESCAPE_CHARS)
+)
+
+
+def escaped_char(match: re.Match) -> str:
+    return ESCAPE_CHARS[match.group()]
+
+
+def unescape_u_string(text: str) -> str:
+    if "`" not in text:
+        return text
+    return ESCAPE_REGEX.sub(escaped_char, text)
+
+
+def unescape_string(text: str) -> str:
+    # A doubled quote is an escaped quote, it can not be part of a sequence.
+    return unescape_u_string(text.replace('""', '"'))
 
 
 class Lexer:
-    def __init__(self, text: str, filename: str, context: Context) -> None:
+    def __init__(
+        self, text: str, filename: str, context: Context, first_line: int = 1
+    ) -> None:
         self.text: str = text
-        self.pos: Position = Position(filename, 0, 1, text)
+        self.source: Source = Source(filename, text, first_line)
+        self.pos: Position = Position(self.source, 0)
         self.context: Context = context
         if self.text == "":
             self.current_char: str | None = None
@@ -21,16 +51,33 @@ class Lexer:
             self.text[self.pos.idx] if self.pos.idx < len(self.text) else None
         )
 
+    def seek(self, idx: int) -> None:
+        self.pos.idx = idx
+        self.current_char: str | None = self.text[idx] if idx < len(self.text) else None
+
     def get_previous_char(self, idx: int) -> str | None:
         return self.text[idx - 1] if idx - 1 >= 0 else None
 
     def get_next_char(self, idx: int) -> str | None:
         return self.text[idx + 1] if idx + 1 < len(self.text) else None
 
-    def tokenize(self) -> tuple[list[Token], IllegalCharError | None]:
-        tokens: list[Token] = [Token(T_SOF, pos_start=self.pos)]
+    def tokenize(
+        self, compact: bool = False
+    ) -> tuple[list[Token] | TokenBuffer, IllegalCharError | None]:
+        tokens: list[Token] | TokenBuffer = TokenBuffer(self.source) if compact else []
+        token_iter: Generator[Token, None, IllegalCharError | None] = self.iter_tokens()
+        while True:
+            try:
+                tokens.append(next(token_iter))
+            except StopIteration as stop:
+                if stop.value is not None:
+                    return [], stop.value
+                return tokens, None
+
+    def iter_tokens(self) -> Generator[Token, None, IllegalCharError | None]:
         if self.text == "":
-            return [], None
+            return None
+        yield Token(T_SOF, pos_start=self.pos.copy())
 
         while self.current_char is not None:
             if self.current_char in " \t":
@@ -38,49 +85,49 @@ class Lexer:
                 continue
 
             elif self.current_char == ";":
-                self.advance()
-                while self.current_char != "\n":
-                    self.advance()
+                end: int = self.text.find("\n", self.pos.idx)
+                self.seek(len(self.text) if end == -1 else end)
                 continue
 
             elif self.current_char == "=":
-                tokens.append(Token(T_L_ASSIGNMENT, "=", pos_start=self.pos))
+                yield Token(T_L_ASSIGNMENT, "=", pos_start=self.pos.copy())
                 self.advance()
                 string_tok: Token = self.make_u_string()
-                tokens.append(string_tok)
+                yield string_tok
                 continue
 
             elif self.current_char == "?":
-                tokens.append(Token(T_QUESTION_MARK, "?", pos_start=self.pos))
+                yield Token(T_QUESTION_MARK, "?", pos_start=self.pos.copy())
 
             elif self.current_char == "%":
-                tokens.append(Token(T_PERCENT, "%", pos_start=self.pos))
+                yield Token(T_PERCENT, "%", pos_start=self.pos.copy())
 
             elif self.current_char == "\n":
-                tokens.append(Token(T_EOL, pos_start=self.pos))
+                yield Token(T_EOL, pos_start=self.pos.copy())
 
             elif self.current_char == ".":
-                tokens.append(Token(T_DOT, ".", pos_start=self.pos))
+                yield Token(T_DOT, ".", pos_start=self.pos.copy())
 
             elif self.current_char == "+":
-                tokens.append(Token(T_PLUS, "+", pos_start=self.pos))
+                yield Token(T_PLUS, "+", pos_start=self.pos.copy())
 
             elif self.current_char == "-":
-                tokens.append(Token(T_MINUS, "-", pos_start=self.pos))
+                yield Token(T_MINUS, "-", pos_start=self.pos.copy())
 
             elif self.current_char == "*":
                 pos_start: Position = self.pos.copy()
                 self.advance()
                 if self.current_char == "/":
                     self.advance()
-                    tokens.append(
-                        Token(
-                            T_BCOMMENT_END, "*/", pos_start=pos_start, pos_end=self.pos
-                        )
+                    yield Token(
+                        T_BCOMMENT_END,
+                        "*/",
+                        pos_start=pos_start,
+                        pos_end=self.pos.copy(),
                     )
                     continue
                 else:
-                    tokens.append(Token(T_MULTIPLY, "*", pos_start=self.pos))
+                    yield Token(T_MULTIPLY, "*", pos_start=pos_start)
                     continue
 
             elif self.current_char == "/":
@@ -88,62 +135,60 @@ class Lexer:
                 self.advance()
                 if self.current_char == "*":
                     self.advance()
-                    tokens.append(
-                        Token(
-                            T_BCOMMENT_START,
-                            "/*",
-                            pos_start=pos_start,
-                            pos_end=self.pos,
-                        )
+                    yield Token(
+                        T_BCOMMENT_START,
+                        "/*",
+                        pos_start=pos_start,
+                        pos_end=self.pos.copy(),
                     )
                     continue
                 else:
-                    tokens.append(Token(T_DIVIDE, "/", pos_start=pos_start))
+                    yield Token(T_DIVIDE, "/", pos_start=pos_start)
                     continue
 
             elif self.current_char in LETTERS + "@#_$":
-                tokens.append(self.make_identifier())
+                yield self.make_identifier()
                 continue
 
             elif self.current_char == ":":
                 next_char: str | None = self.get_next_char(self.pos.idx)
                 if next_char is not None and next_char == "=":
+                    yield Token(T_ASSIGNMENT, ":=", pos_start=self.pos.copy())
                     self.advance()
-                    tokens.append(Token(T_ASSIGNMENT, ":=", pos_start=self.pos))
                 elif next_char is not None and next_char == ":":
-                    tokens.append(Token(T_COLON, ":", pos_start=self.pos))
+                    yield Token(T_COLON, ":", pos_start=self.pos.copy())
                 else:
                     char: str | None = self.current_char
-                    return [], IllegalCharError(
-                        self.pos, self.pos, "'{}'".format(char), self.context
+                    return IllegalCharError(
+                        self.pos.copy(), self.pos, "'{}'".format(char), self.context
                     )
 
             elif self.current_char == "(":
-                tokens.append(Token(T_LPAREN, "(", pos_start=self.pos))
+                yield Token(T_LPAREN, "(", pos_start=self.pos.copy())
 
             elif self.current_char == ")":
-                tokens.append(Token(T_RPAREN, ")", pos_start=self.pos))
+                yield Token(T_RPAREN, ")", pos_start=self.pos.copy())
 
             elif self.current_char == "[":
-                tokens.append(Token(T_LSQUARE, "]", pos_start=self.pos))
+                yield Token(T_LSQUARE, "]", pos_start=self.pos.copy())
 
             elif self.current_char == "]":
-                tokens.append(Token(T_RSQUARE, "]", pos_start=self.pos))
+                yield Token(T_RSQUARE, "]", pos_start=self.pos.copy())
 
             elif self.current_char == "{":
-                tokens.append(Token(T_LCURVE, "{", pos_start=self.pos))
+                yield Token(T_LCURVE, "{", pos_start=self.pos.copy())
 
             elif self.current_char == "}":
-                tokens.append(Token(T_RCURVE, "}", pos_start=self.pos))
+                yield Token(T_RCURVE, "}", pos_start=self.pos.copy())
 
             elif self.current_char == ",":
-                tokens.append(Token(T_COMMA, ",", pos_start=self.pos))
+                yield Token(T_COMMA, ",", pos_start=self.pos.copy())
 
             elif self.current_char in DIGITS:
                 result, error = self.make_number()
                 if error or result is None:
-                    return [], error
-                tokens.append(result)
+                    return error
+                yield result
                 continue
 
             elif self.current_char == '"':
@@ -151,50 +196,50 @@ class Lexer:
                 pos_start: Position = self.pos.copy()
                 tok: Token = self.make_string()
                 if self.current_char != '"':
-                    return [], IllegalCharError(
+                    return IllegalCharError(
                         pos_start, self.pos, "Expected '{}'".format('"'), self.context
                     )
-                tokens.append(tok)
+                yield tok
 
             else:
-                tokens.append(Token(T_UNKNOWN, self.current_char, pos_start=self.pos))
+                yield Token(T_UNKNOWN, self.current_char, pos_start=self.pos.copy())
             self.advance()
-        tokens.append(Token(T_EOF, pos_start=self.pos))
-        return tokens, None
+        yield Token(T_EOF, pos_start=self.pos.copy())
+        return None
 
     def make_number(self):
-        number_str: str = ""
+        text: str = self.text
+        start: int = self.pos.idx
+        end: int = NUMBER_REGEX.match(text, start).end()
+        number_str: str = text[start:end]
+        if number_str.isdigit():
+            self.seek(end)
+            return (
+                Token(
+                    T_DECIMAL,
+                    int(number_str),
+                    Position(self.source, start),
+                    self.pos.copy(),
+                ),
+                None,
+            )
+
         dot_count: int = 0
         x_count: int = 0
         char_count: int = 0
-        pos_start: Position = self.pos
-
-        while (
-            self.current_char is not None
-            and self.current_char != "\n"
-            and self.current_char in DIGITS + ".xabcdefABCDEF"
-        ):
-            if self.current_char == ".":
-                next_char: str | None = self.get_next_char(self.pos.idx)
+        for idx in range(start, end):
+            char: str = text[idx]
+            next_char: str | None = self.get_next_char(idx)
+            if char == ".":
                 if dot_count == 1 or next_char is None or next_char not in DIGITS:
-                    char: str | None = self.current_char
-                    return None, IllegalCharError(
-                        self.pos.copy(), self.pos, "'{}'".format(char), self.context
-                    )
+                    return None, self.number_error(idx)
                 dot_count += 1
-                number_str += "."
-            elif self.current_char == "x":
-                previous_char: str | None = self.get_previous_char(self.pos.idx)
-                previous_previous_char: str | None = self.get_previous_char(
-                    self.pos.idx - 1
-                )
+            elif char == "x":
+                previous_char: str | None = self.get_previous_char(idx)
+                previous_previous_char: str | None = self.get_previous_char(idx - 1)
                 if previous_previous_char is not None:
                     if previous_previous_char in DIGITS + LETTERS:
-                        char: str | None = self.current_char
-                        return None, IllegalCharError(
-                            self.pos.copy(), self.pos, "'{}'".format(char), self.context
-                        )
-                next_char: str | None = self.get_next_char(self.pos.idx)
+                        return None, self.number_error(idx)
                 if (
                     x_count == 1
                     or previous_char != "0"
@@ -202,41 +247,38 @@ class Lexer:
                     or next_char is None
                     or next_char not in DIGITS + "abcdefABCDEF"
                 ):
-                    char: str | None = self.current_char
-                    return None, IllegalCharError(
-                        self.pos.copy(), self.pos, "'{}'".format(char), self.context
-                    )
+                    return None, self.number_error(idx)
                 x_count += 1
-                number_str += "x"
-            elif self.current_char in "abcdefABCDEF":
+            elif char in "abcdefABCDEF":
                 char_count += 1
-                number_str += self.current_char
-            else:
-                number_str += self.current_char
-            self.advance()
 
-        if dot_count == 0 and x_count == 0 and char_count == 0:
-            return Token(T_DECIMAL, int(number_str), pos_start, self.pos), None
-        elif dot_count == 1 and x_count == 0 and char_count == 0:
-            return Token(T_FLOAT, float(number_str), pos_start, self.pos), None
+        pos_start: Position = Position(self.source, start)
+        self.seek(end)
+        if dot_count == 1 and x_count == 0 and char_count == 0:
+            return Token(T_FLOAT, float(number_str), pos_start, self.pos.copy()), None
         elif dot_count == 0 and x_count == 1:
-            return Token(T_HEXADECIMAL, number_str, pos_start, self.pos), None
-        else:
-            char: str | None = self.current_char
-            return None, IllegalCharError(
-                self.pos.copy(), self.pos, "'{}'".format(char), self.context
+            return (
+                Token(
+                    T_HEXADECIMAL, int(number_str, base=16), pos_start, self.pos.copy()
+                ),
+                None,
             )
+        else:
+            return None, self.number_error(end)
+
+    def number_error(self, idx: int) -> IllegalCharError:
+        self.seek(idx)
+        char: str | None = self.current_char
+        return IllegalCharError(
+            self.pos.copy(), self.pos, "'{}'".format(char), self.context
+        )
 
     def make_identifier(self):
-        identifier_str: str = ""
+        start: int = self.pos.idx
         pos_start: Position = self.pos.copy()
-
-        while (
-            self.current_char is not None
-            and self.current_char in LETTERS + DIGITS + "_#@$"
-        ):
-            identifier_str += self.current_char
-            self.advance()
+        end: int = IDENTIFIER_REGEX.match(self.text, start).end()
+        identifier_str: str = self.text[start:end]
+        self.seek(end)
 
         tok_type: str = ""
         if identifier_str in KEYWORDS:
@@ -250,30 +292,29 @@ class Lexer:
         return Token(tok_type, identifier_str, pos_start)
 
     def make_string(self):
-        string_value: str = ""
+        text: str = self.text
+        start: int = self.pos.idx
         pos_start: Position = self.pos.copy()
+        idx: int = start
         while True:
-            if self.current_char is None:
+            quote_idx: int = text.find('"', idx)
+            if quote_idx == -1:
+                end: int = len(text)
                 break
-            elif self.current_char == '"':
-                next_char: str | None = self.get_next_char(self.pos.idx)
-                if next_char == '"':
-                    self.advance()
-                    self.advance()
-                    string_value += '"'
-                else:
-                    break
-            else:
-                string_value += self.current_char
-                self.advance()
-        return Token(T_STRING, string_value, pos_start)
+            if text.startswith('"', quote_idx + 1):
+                # A doubled quote is an escaped quote, keep scanning after it.
+                idx = quote_idx + 2
+                continue
+            end: int = quote_idx
+            break
+        self.seek(end)
+        return Token(T_STRING, unescape_string(text[start:end]), pos_start)
 
     def make_u_string(self):
-        string_value: str = ""
+        start: int = self.pos.idx
         pos_start: Position = self.pos.copy()
-        while True:
-            if self.current_char is None or self.current_char == "\n":
-                break
-            string_value += self.current_char
-            self.advance()
-        return Token(T_U_STRING, string_value, pos_start)
+        end: int = self.text.find("\n", start)
+        if end == -1:
+            end = len(self.text)
+        self.seek(end)
+        return Token(T_U_STRING, unescape_u_string(self.text[start:end]), pos_start)
@@ -0,0 +1,227 @@
+import re
+from typing import Generator
+
+from base_classes.context import Context
+from base_classes.position import Position, Source
+from base_classes.tokens import Token
+from constants import *
+from error_classes.illegal_char_error import IllegalCharError
+from lexer.lexer import unescape_string, unescape_u_string
+from lexer.token_buffer import TokenBuffer
+
+# One alternation for the whole token grammar. Alternatives are ordered the same
+# way the character dispatch in Lexer.tokenize is, so both engines agree on
+# every overlapping prefix ("*/" before "*", ":=" before ":", ...).
+TOKEN_REGEX: re.Pattern = re.compile(
+    r"""
+    (?P<SKIP>[ \t]+|;[^\n]*)
+    |(?P<L_ASSIGNMENT>=)(?P<U_STRING>[^\n]*)
+    |(?P<EOL>\n)
+    |(?P<BCOMMENT_END>\*/)
+    |(?P<BCOMMENT_START>/\*)
+    |(?P<ASSIGNMENT>:=)
+    |(?P<COLON>:(?=:))
+    |(?P<ILLEGAL>:)
+    |(?P<NUMBER>[0-9][0-9.xa-fA-F]*)
+    |(?P<IDENTIFIER>[A-Za-z@\#_$][A-Za-z0-9_\#@$]*)
+    |"(?P<STRING>(?:[^"]|"")*+)(?P<STRING_END>"?)
+    |(?P<OPERATOR>[?%.+\-*/()\[\]{},])
+    |(?P<UNKNOWN>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+OPERATORS: dict[str, tuple[str, str]] = {
+    "?": (T_QUESTION_MARK, "?"),
+    "%": (T_PERCENT, "%"),
+    ".": (T_DOT, "."),
+    "+": (T_PLUS, "+"),
+    "-": (T_MINUS, "-"),
+    "*": (T_MULTIPLY, "*"),
+    "/": (T_DIVIDE, "/"),
+    "(": (T_LPAREN, "("),
+    ")": (T_RPAREN, ")"),
+    "[": (T_LSQUARE, "]"),
+    "]": (T_RSQUARE, "]"),
+    "{": (T_LCURVE, "{"),
+    "}": (T_RCURVE, "}"),
+    ",": (T_COMMA, ","),
+}
+HEX_CHARS: str = "abcdefABCDEF"
+
+
+class RegexLexer:
+    """
+    Tokenizer built on a single compiled alternation (TOKEN_REGEX) scanned with
+    finditer over the whole buffer. Produces the same token stream as Lexer,
+    which is kept as the reference implementation.
+    """
+
+    def __init__(
+        self, text: str, filename: str, context: Context, first_line: int = 1
+    ) -> None:
+        self.text: str = text
+        self.source: Source = Source(filename, text, first_line)
+        self.context: Context = context
+
+    def tokenize(
+        self, compact: bool = False
+    ) -> tuple[list[Token] | TokenBuffer, IllegalCharError | None]:
+        tokens: list[Token] | TokenBuffer = TokenBuffer(self.source) if compact else []
+        token_iter: Generator[Token, None, IllegalCharError | None] = self.iter_tokens()
+        while True:
+            try:
+                tokens.append(next(token_iter))
+            except StopIteration as stop:
+                if stop.value is not None:
+                    return [], stop.value
+                return tokens, None
+
+    def iter_tokens(self) -> Generator[Token, None, IllegalCharError | None]:
+        if self.text == "":
+            return None
+        text: str = self.text
+        source: Source = self.source
+        yield Token(T_SOF, pos_start=Position(source, 0))
+
+        for match in TOKEN_REGEX.finditer(text):
+            kind: str | None = match.lastgroup
+            idx: int = match.start()
+
+            if kind == "SKIP":
+                continue
+
+            elif kind == "IDENTIFIER":
+                value: str = match.group()
+                if value in KEYWORDS:
+                    tok_type: str = T_KEYWORD
+                elif value in COMMANDS:
+                    tok_type: str = T_COMMAND
+                elif value in BOOLEANS:
+                    tok_type: str = T_BOOLEAN
+                else:
+                    tok_type: str = T_IDENTIFIER
+                yield Token(tok_type, value, Position(source, idx))
+
+            elif kind == "OPERATOR":
+                tok_type, value = OPERATORS[match.group()]
+                yield Token(tok_type, value, Position(source, idx))
+
+            elif kind == "EOL":
+                yield Token(T_EOL, pos_start=Position(source, idx))
+
+            elif kind == "NUMBER":
+                tok, error = self.make_number(idx, match.end())
+                if error or tok is None:
+                    return error
+                yield tok
+
+            elif kind == "STRING_END":
+                pos_start: Position = Position(source, idx + 1)
+                value: str = match.group("STRING")
+                if match.group("STRING_END") == "":
+                    return IllegalCharError(
+                        pos_start,
+                        Position(source, match.end()),
+                        "Expected '{}'".format('"'),
+                        self.context,
+                    )
+                yield Token(T_STRING, unescape_string(value), pos_start)
+
+            elif kind == "U_STRING":
+                yield Token(T_L_ASSIGNMENT, "=", Position(source, idx))
+                yield Token(
+                    T_U_STRING,
+                    unescape_u_string(match.group("U_STRING")),
+                    Position(source, idx + 1),
+                )
+
+            elif kind == "ASSIGNMENT":
+                yield Token(T_ASSIGNMENT, ":=", Position(source, idx))
+
+            elif kind == "COLON":
+                yield Token(T_COLON, ":", Position(source, idx))
+
+            elif kind == "BCOMMENT_START" or kind == "BCOMMENT_END":
+                tok_type: str = (
+                    T_BCOMMENT_START if kind == "BCOMMENT_START" else T_BCOMMENT_END
+                )
+                yield Token(
+                    tok_type,
+                    match.group(),
+                    Position(source, idx),
+                    Position(source, idx + 2),
+                )
+
+            elif kind == "ILLEGAL":
+                pos: Position = Position(source, idx)
+                return IllegalCharError(pos, pos, "':'", self.context)
+
+            else:
+                yield Token(T_UNKNOWN, match.group(), Position(source, idx))
+
+        yield Token(T_EOF, pos_start=Position(source, len(text)))
+        return None
+
+    def make_number(
+        self, start: int, end: int
+    ) -> tuple[Token | None, IllegalCharError | None]:
+        text: str = self.text
+        number_str: str = text[start:end]
+        if number_str.isdigit():
+            return (
+                Token(
+                    T_DECIMAL,
+                    int(number_str),
+                    Position(self.source, start),
+                    Position(self.source, end),
+                ),
+                None,
+            )
+
+        # Slow path: apply the same per-character checks as Lexer.make_number.
+        dot_count: int = 0
+        x_count: int = 0
+        char_count: int = 0
+        for idx in range(start, end):
+            char: str = text[idx]
+            next_char: str | None = text[idx + 1] if idx + 1 < len(text) else None
+            if char == ".":
+                if dot_count == 1 or next_char is None or next_char not in DIGITS:
+                    return None, self.number_error(idx)
+                dot_count += 1
+            elif char == "x":
+                previous_char: str | None = text[idx - 1] if idx - 1 >= 0 else None
+                previous_previous_char: str | None = (
+                    text[idx - 2] if idx - 2 >= 0 else None
+                )
+                if (
+                    previous_previous_char is not None
+                    and previous_previous_char in DIGITS + LETTERS
+                ):
+                    return None, self.number_error(idx)
+                if (
+                    x_count == 1
+                    or previous_char != "0"
+                    or next_char is None
+                    or next_char not in DIGITS + HEX_CHARS
+                ):
+                    return None, self.number_error(idx)
+                x_count += 1
+            elif char in HEX_CHARS:
+                char_count += 1
+
+        pos_start: Position = Position(self.source, start)
+        pos_end: Position = Position(self.source, end)
+        if dot_count == 1 and x_count == 0 and char_count == 0:
+            return Token(T_FLOAT, float(number_str), pos_start, pos_end), None
+        elif dot_count == 0 and x_count == 1:
+            return (
+                Token(T_HEXADECIMAL, int(number_str, base=16), pos_start, pos_end),
+                None,
+            )
+        return None, self.number_error(end)
+
+    def number_error(self, idx: int) -> IllegalCharError:
+        char: str | None = self.text[idx] if idx < len(self.text) else None
+        pos: Position = Position(self.source, idx)
+        return IllegalCharError(pos, pos, "'{}'".format(char), self.context)
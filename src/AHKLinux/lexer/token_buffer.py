@@ -0,0 +1,100 @@
+from array import array
+from typing import Any, Iterator
+
+from base_classes.position import Position, Source
+from base_classes.tokens import Token
+from constants import *
+
+TOKEN_TYPES: list[str] = [
+    T_SOF,
+    T_EOF,
+    T_EOL,
+    T_IDENTIFIER,
+    T_KEYWORD,
+    T_COMMAND,
+    T_BOOLEAN,
+    T_ASSIGNMENT,
+    T_L_ASSIGNMENT,
+    T_DECIMAL,
+    T_HEXADECIMAL,
+    T_FLOAT,
+    T_STRING,
+    T_U_STRING,
+    T_PLUS,
+    T_MINUS,
+    T_MULTIPLY,
+    T_DIVIDE,
+    T_LPAREN,
+    T_RPAREN,
+    T_DOT,
+    T_PERCENT,
+    T_QUESTION_MARK,
+    T_LSQUARE,
+    T_RSQUARE,
+    T_LCURVE,
+    T_RCURVE,
+    T_COMMA,
+    T_COLON,
+    T_SEMICOLON,
+    T_LCOMMENT,
+    T_BCOMMENT_START,
+    T_BCOMMENT_END,
+    T_UNKNOWN,
+]
+TOKEN_TYPE_IDS: dict[str, int] = {
+    tok_type: type_id for type_id, tok_type in enumerate(TOKEN_TYPES)
+}
+
+
+class TokenBuffer:
+    """
+    Struct-of-arrays token storage. Every token is one slot in four parallel
+    arrays (type id, start offset, end offset, value id); values are interned so
+    repeated identifiers and operators are stored once. Token objects are only
+    built when the parser indexes into the buffer, which keeps the whole stream
+    of a large script at a few bytes per token.
+    """
+
+    def __init__(self, source: Source) -> None:
+        self.source: Source = source
+        self.types: array = array("B")
+        self.starts: array = array("q")
+        self.ends: array = array("q")
+        self.value_ids: array = array("l")
+        self.values: list[Any] = [None]
+        # Keyed on the value's class as well so that 1, 1.0 and True stay apart.
+        self.value_index: dict[tuple[type, Any], int] = {(type(None), None): 0}
+
+    def add(self, type_: str, value: Any, start: int, end: int) -> None:
+        key: tuple[type, Any] = (value.__class__, value)
+        value_id: int | None = self.value_index.get(key)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self.value_index[key] = value_id
+        self.types.append(TOKEN_TYPE_IDS[type_])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.value_ids.append(value_id)
+
+    def append(self, token: Token) -> None:
+        self.add(token.type, token.value, token.pos_start.idx, token.pos_end.idx)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, idx: int) -> Token:
+        start: int = self.starts[idx]
+        end: int = self.ends[idx]
+        pos_start: Position = Position(self.source, start)
+        pos_end: Position = pos_start if end == start else Position(self.source, end)
+        return Token(
+            TOKEN_TYPES[self.types[idx]],
+            self.values[self.value_ids[idx]],
+            pos_start,
+            pos_end,
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        for idx in range(len(self.types)):
+            yield self[idx]
@@ -0,0 +1,63 @@
+from typing import Generator
+
+from base_classes.tokens import Token
+from constants import *
+from error_classes.illegal_char_error import IllegalCharError
+
+
+class TokenStream:
+    """
+    Feeds the parser from a lexer's iter_tokens() generator, pulling tokens only
+    as the parser reaches them. Only the last `window` tokens are kept in a ring
+    buffer, which is plenty for the parser's one-token recede().
+
+    A lexer error ends the stream with a synthetic EOF token so the parser winds
+    down normally; the error is kept in `error` and must be checked before the
+    parsed tree is used.
+    """
+
+    def __init__(
+        self,
+        token_iter: Generator[Token, None, IllegalCharError | None],
+        window: int = 8,
+    ) -> None:
+        self.token_iter: Generator[Token, None, IllegalCharError | None] = token_iter
+        self.window: int = window
+        self.ring: list[Token | None] = [None] * window
+        self.count: int = 0
+        self.exhausted: bool = False
+        self.error: IllegalCharError | None = None
+
+    def push(self, tok: Token) -> None:
+        self.ring[self.count % self.window] = tok
+        self.count += 1
+
+    def pull(self) -> None:
+        try:
+            tok: Token = next(self.token_iter)
+        except StopIteration as stop:
+            self.exhausted = True
+            self.error = stop.value
+            if self.error is not None:
+                self.push(Token(T_EOF, pos_start=self.error.pos_start))
+            return
+        self.push(tok)
+        if tok.type == T_EOF:
+            # EOF is always the lexer's last token, stop here so __len__ is exact.
+            self.exhausted = True
+            self.token_iter.close()
+
+    def __len__(self) -> int:
+        # Until the stream is exhausted there is always at least one more token.
+        return self.count if self.exhausted else self.count + 1
+
+    def __getitem__(self, idx: int) -> Token:
+        while idx >= self.count and not self.exhausted:
+            self.pull()
+        if idx < 0 or idx >= self.count:
+            raise IndexError("token index out of range")
+        if idx < self.count - self.window:
+            raise IndexError(
+                "token {} is no longer in the lookbehind window".format(idx)
+            )
+        return self.ring[idx % self.window]
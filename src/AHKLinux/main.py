@@ -3,27 +3,48 @@ import sys
 from typing import Any
 
 from base_classes.context import Context
+from base_classes.nodes import FunctionDeclareNode
 from base_classes.symbol_table import SymbolTable
+from base_classes.tokens import Token
+from interpreter.bytecode import CodeObject, Compiler, disassemble
+from interpreter.closure_compiler import ClosureCompiler
+from interpreter.code_cache import CodeCache
 from interpreter.interpreter import Interpreter
+from interpreter.python_engine import PythonEngine
+from interpreter.resolver import resolve
+from interpreter.trace import JsonLinesSink, TextSink, TraceSink
+from interpreter.vm import VirtualMachine
 from lexer.lexer import Lexer
+from lexer.regex_lexer import RegexLexer
+from lexer.token_buffer import TokenBuffer
+from lexer.token_stream import TokenStream
+from parser.ast_cache import ASTCache
 from parser.parser import Parser
 
-
-def print_result_list(results: list[list] | list[Any], debug_mode: bool) -> None:
-    if not isinstance(results, list):
-        if debug_mode:
-            print(results)
-        return
-    for result in results:
-        print_result_list(result, debug_mode)
-    return
+LEXERS: dict[str, Any] = {"classic": Lexer, "regex": RegexLexer}
+ENGINES: dict[str, Any] = {
+    "tree": Interpreter,
+    "closure": ClosureCompiler,
+    "vm": VirtualMachine,
+    "python": PythonEngine,
+}
 
 
 def print_error(*args: str, **kwargs: dict) -> None:
     print(*args, file=sys.stderr, **kwargs)
 
 
-def main(input_file: str, debug_mode: bool) -> int:
+def main(
+    input_file: str,
+    debug_mode: bool,
+    lexer_name: str = "classic",
+    compact_tokens: bool = False,
+    streaming: bool = True,
+    use_cache: bool = True,
+    engine_name: str = "tree",
+    show_bytecode: bool = False,
+    trace_file: str | None = None,
+) -> int:
     if "~" in input_file:
         input_file = os.path.expanduser(input_file)
     if not os.path.isfile(input_file):
@@ -37,26 +58,70 @@ def main(input_file: str, debug_mode: bool) -> int:
     global_symbol_table: SymbolTable = SymbolTable()
     context: Context = Context("<module>")
     context.symbol_table = global_symbol_table
-    lexer = Lexer(contents, input_file, context)
-    tokens, error = lexer.tokenize()
-    if error:
-        print_error(error.as_string())
-        return 1
-    parser = Parser(tokens, context)
-    ast, error = parser.parse()
-    if error:
-        print_error(error.as_string())
-        return 1
+    cache: ASTCache | None = ASTCache() if use_cache else None
+    nodes: list[Any] | None = None
+    if cache is not None:
+        nodes = cache.load(contents, input_file, context)
+    if nodes is None:
+        lexer = LEXERS[lexer_name](contents, input_file, context)
+        if streaming and not compact_tokens:
+            tokens: TokenStream | list[Token] | TokenBuffer = TokenStream(
+                lexer.iter_tokens()
+            )
+        else:
+            tokens, error = lexer.tokenize(compact_tokens)
+            if error:
+                print_error(error.as_string())
+                return 1
+        parser = Parser(tokens, context)
+        ast, error = parser.parse()
+        if isinstance(tokens, TokenStream) and tokens.error:
+            print_error(tokens.error.as_string())
+            return 1
+        if error:
+            print_error(error.as_string())
+            return 1
+        nodes = [res.node for res in ast]
+        if cache is not None:
+            # Stored before interpreting, the interpreter mutates some nodes.
+            cache.store(contents, lexer.source, context, nodes)
+    resolve(nodes)
+
+    if show_bytecode:
+        compiler: Compiler = Compiler()
+        for node in nodes:
+            if isinstance(node, FunctionDeclareNode):
+                code: CodeObject = compiler.compile_body(node.body, node.name.value)
+            else:
+                code: CodeObject = compiler.compile_statement(node)
+            print(disassemble(code))
+        return 0
+
+    if trace_file is not None:
+        with open(trace_file, "w") as file:
+            return run(nodes, context, engine_name, cache, JsonLinesSink(file))
+    return run(
+        nodes, context, engine_name, cache, TextSink() if debug_mode else TraceSink()
+    )
 
-    interpreter = Interpreter()
-    for node in ast:
-        result = interpreter.visit(node.node, context)
+
+def run(
+    nodes: list[Any],
+    context: Context,
+    engine_name: str,
+    cache: ASTCache | None,
+    trace: TraceSink,
+) -> int:
+    interpreter = ENGINES[engine_name](trace=trace)
+    if cache is not None and isinstance(interpreter, PythonEngine):
+        interpreter.code_cache = CodeCache(cache.cache_dir, cache.max_bytes)
+    for node in nodes:
+        result = interpreter.visit(node, context)
         if result.error:
+            trace.discard()
             print_error(result.error.as_string())
             return 1
-        if isinstance(result.value, list):
-            print_result_list(result.value, debug_mode)
-        else:
-            if debug_mode:
-                print(result.value)
+        if result.value is not None and trace.enabled:
+            interpreter.trace_result(result.value, node, context)
+        trace.flush()
     return 0
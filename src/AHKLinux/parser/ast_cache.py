@@ -0,0 +1,123 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any
+
+from base_classes.context import Context
+from base_classes.position import Source
+from constants import VERSION
+
+# Bump whenever the pickled layout of nodes, tokens or positions changes so stale
+# entries written by an older tree are never loaded.
+AST_CACHE_FORMAT: int = 7
+CACHE_SUFFIX: str = ".ast"
+TMP_SUFFIX: str = ".tmp"
+
+
+def get_default_cache_dir() -> str:
+    cache_home: str = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "ahklinux")
+
+
+class ASTCache:
+    """
+    On-disk cache of parsed scripts. Entries are keyed by the SHA-256 of the
+    script contents together with the interpreter version and AST_CACHE_FORMAT,
+    written atomically, and evicted least recently used first once the cache
+    directory grows past `max_bytes`.
+
+    The cache is best effort: any I/O or unpickling problem is treated as a miss.
+    """
+
+    suffix: str = CACHE_SUFFIX
+
+    def __init__(
+        self, cache_dir: str | None = None, max_bytes: int = 64 * 1024 * 1024
+    ) -> None:
+        self.cache_dir: str = cache_dir or get_default_cache_dir()
+        self.max_bytes: int = max_bytes
+
+    def get_path(self, contents: str) -> str:
+        digest: Any = hashlib.sha256()
+        digest.update("{}\0{}\0".format(VERSION, AST_CACHE_FORMAT).encode())
+        digest.update(contents.encode("utf-8", "surrogatepass"))
+        return os.path.join(self.cache_dir, digest.hexdigest() + self.suffix)
+
+    def load(self, contents: str, filename: str, context: Context) -> list[Any] | None:
+        path: str = self.get_path(contents)
+        try:
+            with open(path, "rb") as file:
+                source, display_name, nodes = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or stale entry, drop it and parse again.
+            self.remove(path)
+            return None
+        if not isinstance(source, Source) or source.text != contents:
+            self.remove(path)
+            return None
+        # The same script may live at several paths, errors must name this one.
+        source.filename = filename
+        context.display_name = display_name
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return nodes
+
+    def store(
+        self, contents: str, source: Source, context: Context, nodes: list[Any]
+    ) -> None:
+        path: str = self.get_path(contents)
+        try:
+            data: bytes = pickle.dumps(
+                (source, context.display_name, nodes), pickle.HIGHEST_PROTOCOL
+            )
+        except (pickle.PicklingError, RecursionError):
+            return
+        self.write(path, data)
+
+    def write(self, path: str, data: bytes) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=TMP_SUFFIX)
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    file.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                self.remove(tmp_path)
+                raise
+            self.evict()
+        except OSError:
+            return
+
+    def evict(self) -> None:
+        # Every kind of entry in the directory counts towards the one limit,
+        # only files still being written are left alone.
+        entries: list[tuple[float, int, str]] = []
+        total: int = 0
+        with os.scandir(self.cache_dir) as scanner:
+            for entry in scanner:
+                if entry.name.endswith(TMP_SUFFIX) or not entry.is_file():
+                    continue
+                try:
+                    stat: os.stat_result = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= size
+
+    def remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
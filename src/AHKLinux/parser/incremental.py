@@ -0,0 +1,249 @@
+from bisect import bisect_right
+from typing import Any
+
+from base_classes.context import Context
+from base_classes.position import Source
+from error_classes.illegal_char_error import IllegalCharError
+from lexer.regex_lexer import TOKEN_REGEX, RegexLexer
+from parser.parser import Parser
+
+
+def find_boundaries(text: str) -> list[int]:
+    """
+    Returns the offsets, just past an end of line, at which a top-level statement
+    may end. A line break is not a boundary inside braces, inside a block
+    comment or string, or when the next line opens with '{' or 'else' (the
+    parser lets both follow a line break).
+    """
+    boundaries: list[int] = []
+    depth: int = 0
+    in_comment: bool = False
+    pending: int | None = None
+    for match in TOKEN_REGEX.finditer(text):
+        kind: str | None = match.lastgroup
+        if kind == "SKIP":
+            continue
+        if pending is not None:
+            if not continues_statement(match):
+                boundaries.append(pending)
+            pending = None
+        if kind == "EOL":
+            if depth == 0 and not in_comment:
+                pending = match.end()
+        elif kind == "OPERATOR" and not in_comment:
+            if match.group() == "{":
+                depth += 1
+            elif match.group() == "}" and depth > 0:
+                depth -= 1
+        elif kind == "BCOMMENT_START":
+            in_comment = True
+        elif kind == "BCOMMENT_END":
+            in_comment = False
+        elif kind == "STRING_END" and match.group("STRING_END") == "":
+            # An unterminated string runs to the end of text.
+            return boundaries
+    if pending is not None:
+        boundaries.append(pending)
+    return boundaries
+
+
+def continues_statement(match: Any) -> bool:
+    kind: str | None = match.lastgroup
+    return (kind == "OPERATOR" and match.group() == "{") or (
+        kind == "IDENTIFIER" and match.group() == "else"
+    )
+
+
+def starts_with_continuation(text: str) -> bool:
+    for match in TOKEN_REGEX.finditer(text):
+        if match.lastgroup != "SKIP":
+            return continues_statement(match)
+    return False
+
+
+class Chunk:
+    def __init__(
+        self,
+        document: "IncrementalDocument",
+        source: Source,
+        nodes: list[Any],
+        error: IllegalCharError | None,
+    ) -> None:
+        self.document: IncrementalDocument | None = document
+        self.source: Source = source
+        self.nodes: list[Any] = nodes
+        self.error: IllegalCharError | None = error
+        self.line_count: int = source.text.count("\n")
+        # Position in document.chunks, only meaningful below document.valid.
+        self.index: int = -1
+        source.line_origin = self
+
+    @property
+    def first_line(self) -> int:
+        # A chunk an edit replaced keeps the line it was lexed at.
+        if self.document is None:
+            return self.source.first_line
+        return self.document.get_first_line(self)
+
+
+class IncrementalDocument:
+    """
+    A script kept as a list of chunks, one per top-level statement (a function
+    declaration or if/else block with its whole body is a single statement).
+    Every chunk is lexed and parsed on its own, its Source asks the document
+    for the line it starts at, so positions inside untouched chunks never need
+    rewriting.
+
+    edit() re-lexes and re-parses only the chunks overlapping the edit plus the
+    one before it (an edit can turn the start of a chunk into an 'else' that
+    belongs to the previous statement). The re-scanned region grows forward
+    while it ends inside an unclosed brace, comment or string. All other chunks
+    and their nodes are reused as they are.
+
+    Token positions are chunk-relative offsets, their line numbers are absolute.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        filename: str,
+        context: Context,
+        lexer_class: Any = RegexLexer,
+    ) -> None:
+        self.filename: str = filename
+        self.context: Context = context
+        self.lexer_class: Any = lexer_class
+        self.chunks: list[Chunk] = self.make_chunks(text, find_boundaries(text), 1)
+        # Chunk start offsets and first lines, only the first `valid` entries are
+        # up to date. Edits invalidate the tail and lookups recompute it as far
+        # as they need.
+        self.starts: list[int] = [0] * len(self.chunks)
+        self.first_lines: list[int] = [1] * len(self.chunks)
+        self.valid: int = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(chunk.source.text for chunk in self.chunks)
+
+    @property
+    def nodes(self) -> list[Any]:
+        return [node for chunk in self.chunks for node in chunk.nodes]
+
+    @property
+    def errors(self) -> list[IllegalCharError]:
+        return [chunk.error for chunk in self.chunks if chunk.error is not None]
+
+    def make_chunk(self, text: str, first_line: int) -> Chunk:
+        lexer: Any = self.lexer_class(text, self.filename, self.context, first_line)
+        tokens, error = lexer.tokenize()
+        nodes: list[Any] = []
+        if error is None:
+            ast, _ = Parser(tokens, self.context).parse()
+            nodes = [res.node for res in ast]
+        return Chunk(self, lexer.source, nodes, error)
+
+    def make_chunks(
+        self, text: str, boundaries: list[int], first_line: int
+    ) -> list[Chunk]:
+        chunks: list[Chunk] = []
+        start: int = 0
+        for end in boundaries + [len(text)]:
+            if end == start:
+                continue
+            chunk: Chunk = self.make_chunk(text[start:end], first_line)
+            chunks.append(chunk)
+            first_line += chunk.line_count
+            start = end
+        return chunks
+
+    def extend_valid(self) -> Chunk:
+        # Brings the entries of the first invalid chunk up to date.
+        valid: int = self.valid
+        chunk: Chunk = self.chunks[valid]
+        if valid > 0:
+            previous: Chunk = self.chunks[valid - 1]
+            self.starts[valid] = self.starts[valid - 1] + len(previous.source.text)
+            self.first_lines[valid] = self.first_lines[valid - 1] + previous.line_count
+        else:
+            self.starts[0] = 0
+            self.first_lines[0] = 1
+        chunk.index = valid
+        self.valid = valid + 1
+        return chunk
+
+    def find_chunk(self, offset: int) -> int:
+        chunks: list[Chunk] = self.chunks
+        starts: list[int] = self.starts
+        valid: int = self.valid
+        if valid > 0 and offset < starts[valid - 1] + len(
+            chunks[valid - 1].source.text
+        ):
+            return bisect_right(starts, offset, 0, valid) - 1
+        while self.valid < len(chunks):
+            chunk: Chunk = self.extend_valid()
+            if offset < starts[chunk.index] + len(chunk.source.text):
+                break
+        return self.valid - 1
+
+    def get_first_line(self, chunk: Chunk) -> int:
+        index: int = chunk.index
+        if not (0 <= index < self.valid and self.chunks[index] is chunk):
+            while self.extend_valid() is not chunk:
+                pass
+            index = chunk.index
+        return self.first_lines[index]
+
+    def edit(self, start: int, end: int, new_text: str) -> list[Chunk]:
+        """
+        Replaces text[start:end] with new_text and returns the chunks that were
+        rebuilt.
+        """
+        if start < 0 or end < start:
+            raise ValueError("Invalid edit range {}:{}.".format(start, end))
+        chunks: list[Chunk] = self.chunks
+        if not chunks:
+            if start != 0 or end != 0:
+                raise ValueError("Invalid edit range {}:{}.".format(start, end))
+            first, last = 0, -1
+            region_text: str = new_text
+            first_line: int = 1
+        else:
+            index: int = self.find_chunk(start)
+            first: int = max(index - 1, 0)
+            last: int = self.find_chunk(end - 1) if end > start else index
+            region_end: int = self.starts[last] + len(chunks[last].source.text)
+            if end > region_end:
+                raise ValueError("Invalid edit range {}:{}.".format(start, end))
+            region_start: int = self.starts[first]
+            region_text: str = "".join(
+                chunk.source.text for chunk in chunks[first : last + 1]
+            )
+            region_text = (
+                region_text[: start - region_start]
+                + new_text
+                + region_text[end - region_start :]
+            )
+            first_line: int = self.first_lines[first]
+
+        # Grow the region until its end is a statement boundary that the next
+        # chunk does not continue from.
+        boundaries: list[int] = find_boundaries(region_text)
+        while last + 1 < len(chunks) and (
+            not boundaries
+            or boundaries[-1] != len(region_text)
+            or starts_with_continuation(chunks[last + 1].source.text)
+        ):
+            last += 1
+            region_text += chunks[last].source.text
+            boundaries = find_boundaries(region_text)
+
+        new_chunks: list[Chunk] = self.make_chunks(region_text, boundaries, first_line)
+        for chunk in chunks[first : last + 1]:
+            chunk.document = None
+        chunks[first : last + 1] = new_chunks
+        self.starts[first : last + 1] = [0] * len(new_chunks)
+        self.first_lines[first : last + 1] = [1] * len(new_chunks)
+        # The chunks after the region keep their offsets relative to each other,
+        # their starts and lines are recomputed once something looks them up.
+        self.valid = min(self.valid, first)
+        return new_chunks
@@ -34,12 +34,27 @@ from base_classes.nodes import *
 from base_classes.tokens import Token
 from constants import *
 from error_classes.invalid_syntax_error import InvalidSyntaxError
+from lexer.token_buffer import TokenBuffer
+from lexer.token_stream import TokenStream
 from parser.parse_result import ParseResult
 
+# Binding power of the binary operators, higher binds tighter. Any keyword in
+# operator position (and, or, ...) binds like '*'.
+BINARY_PRECEDENCE: dict[str, int] = {
+    T_PLUS: 1,
+    T_MINUS: 1,
+    T_MULTIPLY: 2,
+    T_DIVIDE: 2,
+    T_DOT: 2,
+    T_KEYWORD: 2,
+}
+
 
 class Parser:
-    def __init__(self, tokens: list[Token], context: Context) -> None:
-        self.tokens: list[Token] = tokens
+    def __init__(
+        self, tokens: list[Token] | TokenBuffer | TokenStream, context: Context
+    ) -> None:
+        self.tokens: list[Token] | TokenBuffer | TokenStream = tokens
         self.tok_idx: int = 0
         self.context: Context = context
         self.current_tok: Token = self.tokens[self.tok_idx]
@@ -47,12 +62,13 @@ class Parser:
     def parse(self) -> tuple[list[ParseResult], None]:
         ast: list[ParseResult] = []
         while self.tok_idx < len(self.tokens):
+            tok_idx: int = self.tok_idx
             res: ParseResult = self.statement()
-            if res is None or res.error:
-                continue
-            if res.error:
-                return [], res.error
-            if res.node is None:
+            if res is None or res.error or res.node is None:
+                # Skip the offending token when a statement fails without
+                # consuming anything, retrying it would loop forever.
+                if self.tok_idx == tok_idx:
+                    self.advance()
                 continue
             ast.append(res)
             if self.current_tok.type == T_EOF:
@@ -64,6 +80,11 @@ class Parser:
         if self.tok_idx < len(self.tokens):
             self.current_tok = self.tokens[self.tok_idx]
 
+    def peek(self) -> Token:
+        if self.tok_idx + 1 < len(self.tokens):
+            return self.tokens[self.tok_idx + 1]
+        return self.current_tok
+
     def recede(self) -> None:
         if self.tok_idx - 1 >= 0:
             self.tok_idx -= 1
@@ -168,7 +189,7 @@ class Parser:
 
     def ignore_block_comment(self) -> ParseResult:
         res: ParseResult = ParseResult()
-        while self.current_tok.type != T_BCOMMENT_END:
+        while self.current_tok.type not in (T_BCOMMENT_END, T_EOF):
             self.advance()
         self.recede()
         previous_tok: Token = self.current_tok
@@ -182,22 +203,36 @@ class Parser:
         else:
             return self.ignore_block_comment()
 
-    def bin_op(self, func: Any, ops: list[str]):
-        res = ParseResult()
-        left: Any = res.register(func())
+    def binary_expression(self) -> ParseResult:
+        """
+        Parses a chain of binary operators in one operator-precedence loop.
+        Operands are parsed by factor(); an operator first folds every pending
+        operator that binds at least as tightly, so equal precedence nests to the
+        left exactly like the old expression -> term -> factor descent did.
+        """
+        res: ParseResult = ParseResult()
+        operand: Any = res.register(self.factor())
         if res.error:
             return res
-
-        while self.current_tok.type in ops:
+        operands: list[Any] = [operand]
+        operators: list[Token] = []
+        while self.current_tok.type in BINARY_PRECEDENCE:
             op_tok: Token = self.current_tok
+            precedence: int = BINARY_PRECEDENCE[op_tok.type]
+            while operators and BINARY_PRECEDENCE[operators[-1].type] >= precedence:
+                right: Any = operands.pop()
+                operands[-1] = BinOpNode(operands[-1], operators.pop(), right)
+            operators.append(op_tok)
             res.register_advancement()
             self.advance()
-            right: Any = res.register(func())
+            operand: Any = res.register(self.factor())
             if res.error:
                 return res
-            left: Any = BinOpNode(left, op_tok, right)
-
-        return res.success(left)
+            operands.append(operand)
+        while operators:
+            right: Any = operands.pop()
+            operands[-1] = BinOpNode(operands[-1], operators.pop(), right)
+        return res.success(operands[0])
 
     def get_condition(self) -> ParseResult:
         res: ParseResult = ParseResult()
@@ -675,13 +710,13 @@ class Parser:
 
         return self.atom()
 
-    def term(self) -> ParseResult:
-        return self.bin_op(self.factor, [T_MULTIPLY, T_DIVIDE, T_DOT, T_KEYWORD])
-
     def expression(self) -> ParseResult:
         res: Any = ParseResult()
 
-        if self.current_tok.type == T_IDENTIFIER:
+        if self.current_tok.type == T_IDENTIFIER and self.peek().type in (
+            T_LSQUARE,
+            T_DOT,
+        ):
             var_name: Token = self.current_tok
             res.register_advancement()
             self.advance()
@@ -732,12 +767,7 @@ class Parser:
                 )
                 return res
 
-            res.register_recession()
-            self.recede()
-
-        node: Any = res.register(
-            self.bin_op(self.term, [T_PLUS, T_MINUS, T_DOT, T_KEYWORD])
-        )
+        node: Any = res.register(self.binary_expression())
         if res.error or node is None:
             return res
         if self.current_tok.type == T_QUESTION_MARK:
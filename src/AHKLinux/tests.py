@@ -1,11 +1,42 @@
+import glob
+import io
+import json
 import os
 import subprocess
+import tempfile
 import unittest
+from typing import Any
 
 import main
-
+from base_classes.context import Context
+from base_classes.nodes import FunctionDeclareNode
+from base_classes.symbol_table import SymbolTable
+from constants import T_DECIMAL, T_HEXADECIMAL, T_STRING, T_U_STRING
+from data_types.array import Array
+from data_types.associative_array import AssociativeArray
+from data_types.boolean import FALSE, TRUE
+from data_types.number import Number
+from data_types.string import String
+from interpreter.bytecode import Compiler, disassemble
+from interpreter.closure_compiler import ClosureCompiler
+from interpreter.code_cache import CodeCache
+from interpreter.python_engine import PythonEngine
+from interpreter.resolver import resolve
+from interpreter.trace import DECLARE, RESULT, JsonLinesSink, TextSink, TraceEvent
+from interpreter.transpiler import Transpiler, flatten
+from interpreter.vm import VirtualMachine
+from lexer.lexer import Lexer
+from lexer.regex_lexer import RegexLexer
+from lexer.token_stream import TokenStream
+from parser.ast_cache import ASTCache
+from parser.incremental import IncrementalDocument
+from parser.parser import Parser
 
 os.chdir(os.path.dirname(__file__))
+# Every run of the interpreter, in this process or a child one, caches parsed
+# scripts into a throwaway directory instead of the user's cache.
+CACHE_HOME: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+os.environ["XDG_CACHE_HOME"] = CACHE_HOME.name
 BASE_DEBUG_CMD: str = "python3 cli.py --input {} -d"
 BASE_CMD: str = "python3 cli.py --input {}"
 MSGBOX_OUTPUT_FORMAT: str = (
@@ -17,6 +48,21 @@ FUNC_DECLARE_OUTPUT_FORMAT: str = "Function with name '{}' has been declared.\n"
 ERROR_FORMAT: str = (
     "Traceback (most recent call last):\n File: '{}', line {}, in {}\n   {}\n{}\n"
 )
+LEXER_EDGE_CASES: list[str] = [
+    'a := "say ""hi""" . "multi\nline"\n',
+    "a = unquoted %b% text\nb := 0x1f + 1.5 * 2\n",
+    "/* block */\nx::y := 10/*c*/\n",
+    "MsgBox, 0, Title, Text ; comment\n",
+    'x := "unterminated\n',
+    "x := 1.5.5\n",
+    "x := 10x5\n",
+    "x : y\n",
+    "x := 1 ; comment without newline",
+    'x := "ends on a doubled quote""',
+    'x := "a""""b"\ny = trailing',
+    "x := 0x1fg + 12ab\n",
+    'x := "a`tb""`n``n"\ny = c`rd %x% ``t\n',
+]
 TEST_FORMAT: str = "Testing unit '{}'. Press Enter whenever the message box appears"
 
 
@@ -70,6 +116,29 @@ class TestArithmetic(unittest.TestCase):
         file: str = "tests/arithmetic/divide.ahk"
         self.assertEqual(main.main(file, False), 0)
 
+    def test_debug_hexadecimal(self) -> None:
+        file: str = "tests/arithmetic/hexadecimal.ahk"
+        result, expected_result = exec_msgbox_debug_cmd(file, "0x1f")
+        self.assertEqual(result, expected_result)
+
+    def test_debug_mixed_hexadecimal(self) -> None:
+        file: str = "tests/arithmetic/mixed_hexadecimal.ahk"
+        result, expected_result = exec_msgbox_debug_cmd(file, 33)
+        self.assertEqual(result, expected_result)
+
+    def test_debug_large_hexadecimal_divide(self) -> None:
+        file: str = "tests/arithmetic/large_hexadecimal_divide.ahk"
+        result, expected_result = exec_msgbox_debug_cmd(file, "0x7fffffffffffffff")
+        self.assertEqual(result, expected_result)
+
+    def test_hexadecimal_divide_truncates_towards_zero(self) -> None:
+        for left, right, quotient in ((-7, 2, -3), (7, -2, -3), (-7, -2, 3)):
+            with self.subTest(left=left, right=right):
+                result, _ = Number(left, T_HEXADECIMAL).divided_by(
+                    Number(right, T_HEXADECIMAL)
+                )
+                self.assertEqual(result.value, quotient)
+
 
 class TestBoolean(unittest.TestCase):
     def test_debug_and_op(self) -> None:
@@ -108,6 +177,23 @@ class TestBoolean(unittest.TestCase):
         file: str = "tests/boolean/ternary.ahk"
         self.assertEqual(main.main(file, False), 0)
 
+    def test_shared_booleans(self) -> None:
+        text: str = (
+            "f(x) {\n    y := x and true or 0\n    return y\n}\na := f(1)\nb := not a\n"
+        )
+        for name, engine_class in main.ENGINES.items():
+            with self.subTest(engine=name):
+                context: Context = Context("<module>")
+                context.symbol_table = SymbolTable({})
+                _, nodes = parse_nodes(text, "<test>", context)
+                resolve(nodes)
+                engine: Any = engine_class()
+                for node in nodes:
+                    self.assertIsNone(engine.visit(node, context).error)
+                self.assertIs(context.symbol_table.get("a"), TRUE)
+                self.assertIs(context.symbol_table.get("b"), FALSE)
+                self.assertIsNone(TRUE.pos_start)
+
 
 class TestStrings(unittest.TestCase):
     def test_debug_declaration(self) -> None:
@@ -137,6 +223,18 @@ class TestStrings(unittest.TestCase):
         file: str = "tests/string/multi_concat.ahk"
         self.assertEqual(main.main(file, False), 0)
 
+    def test_concatenation_appends_in_place(self) -> None:
+        ab, _ = String("a").concatenated_to(String("b"))
+        abc, _ = ab.concatenated_to(String("c"))
+        # 'ab' no longer owns the end of the shared pieces, it copies them.
+        abd, _ = ab.concatenated_to(String("d"))
+        self.assertIs(abc.pieces, ab.pieces)
+        self.assertIsNot(abd.pieces, ab.pieces)
+        self.assertEqual(
+            [ab.value, abc.value, abd.value, abc.copy().value],
+            ["ab", "abc", "abd", "abc"],
+        )
+
 
 class TestArrays(unittest.TestCase):
     def test_debug_declaration(self) -> None:
@@ -166,6 +264,22 @@ class TestArrays(unittest.TestCase):
         file: str = "tests/array/nested_access.ahk"
         self.assertEqual(main.main(file, False), 0)
 
+    def test_numbers_packed_until_mixed(self) -> None:
+        arr: Array = Array.from_elements(
+            [Number(value, T_HEXADECIMAL) for value in (1, 16, 255)]
+        )
+        shared: Array = arr.copy()
+        self.assertIsNotNone(arr.value.numbers)
+        self.assertEqual(repr(arr.get(2)[0]), "0x10")
+        arr.set(1, Number(2, T_HEXADECIMAL))
+        self.assertIsNotNone(arr.value.numbers)
+        # A value of another type unpacks the buffer every copy shares.
+        arr.set(3, String("end"))
+        self.assertIsNone(arr.value.numbers)
+        self.assertEqual(repr(shared), "[0x2,0x10,end]")
+        mixed: list[Any] = [Number(1, T_DECIMAL), Number(1.5, T_DECIMAL)]
+        self.assertIs(Array.from_elements(mixed).value, mixed)
+
 
 class TestAssociativeArrays(unittest.TestCase):
     def test_debug_declaration(self) -> None:
@@ -252,6 +366,24 @@ class TestAssociativeArrays(unittest.TestCase):
         file: str = "tests/associative_array/assign.ahk"
         self.assertEqual(main.main(file, False), 0)
 
+    def test_debug_case_insensitive_keys(self) -> None:
+        # Keys differing only in case are one key, displayed as first written.
+        file: str = "tests/associative_array/case_insensitive_keys.ahk"
+        result, expected_result = exec_msgbox_debug_cmd(file, "{Name:3,size:2}")
+        self.assertEqual(result.splitlines()[-1] + "\n", expected_result)
+
+    def test_keys_keep_insertion_order(self) -> None:
+        obj: AssociativeArray = AssociativeArray.from_items(
+            [(String("b"), Number(1, T_DECIMAL)), (Number(10, T_DECIMAL), String("x"))]
+        )
+        obj.set("A", Number(2, T_DECIMAL))
+        obj.set("B", Number(3, T_DECIMAL))
+        obj.set(2, Number(4, T_DECIMAL))
+        self.assertEqual(repr(obj), "{b:3,10:x,A:2,2:4}")
+        self.assertEqual(obj.get("a")[0].value, 2)
+        self.assertEqual(obj.get(10)[0].value, "x")
+        self.assertIsNotNone(obj.get("10")[1])
+
 
 class TestVariable(unittest.TestCase):
     def test_debug_assignment(self) -> None:
@@ -333,6 +465,24 @@ class TestVariable(unittest.TestCase):
         file: str = "tests/variable/embed.ahk"
         self.assertEqual(main.main(file, False), 0)
 
+    def test_debug_embed_repeated(self) -> None:
+        # The second call substitutes its own argument, not the first one's.
+        file: str = "tests/variable/embed_repeated.ahk"
+        result, expected_result = exec_msgbox_debug_cmd(file, " value 2")
+        self.assertEqual(result.splitlines()[-1] + "\n", expected_result)
+
+    def test_symbol_table_case_insensitive(self) -> None:
+        symbol_table: SymbolTable = SymbolTable()
+        symbol_table.set("MyVar", (1, False))
+        symbol_table.set("myvar", (2, True))
+        self.assertEqual(symbol_table.get("MYVAR"), 2)
+        self.assertTrue(symbol_table.global_from_child("myVar"))
+        self.assertFalse(symbol_table.global_from_child("other"))
+        self.assertEqual(list(symbol_table.names.values()), ["MyVar"])
+        symbol_table.remove("MYVAR")
+        self.assertIsNone(symbol_table.get("MyVar"))
+        self.assertIsNone(SymbolTable().get("MyVar"))
+
 
 class TestExpressions(unittest.TestCase):
     def test_debug_arith_expression(self) -> None:
@@ -429,6 +579,49 @@ class TestFunctions(unittest.TestCase):
         file: str = "tests/functions/scope.ahk"
         self.assertEqual(main.main(file, False), 0)
 
+    def test_debug_recursion(self) -> None:
+        file: str = "tests/functions/recursion.ahk"
+        cmd: list[str] = BASE_DEBUG_CMD.format(file).split()
+        proc: subprocess.Popen[bytes] = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        stdout, stderr = proc.communicate()
+        expected_result: str = ASSIGN_OUTPUT_FORMAT.format(
+            "x", "<module>", 55
+        ) + MSGBOX_OUTPUT_FORMAT.format(file, 55)
+        self.assertEqual(stderr.decode("UTF-8"), "")
+        self.assertTrue(stdout.decode("UTF-8").endswith(expected_result))
+
+    def test_resolve_slots(self) -> None:
+        text: str = "f(x, y) {\n    global g := x\n    z := y\n    return z . w\n}\n"
+        _, nodes = parse_nodes(text, "<test>", Context("<module>"))
+        resolve(nodes)
+        declare: FunctionDeclareNode = nodes[0]
+        self.assertEqual(declare.slots, {"x": 0, "y": 1, "z": 2})
+        global_assign, local_assign, return_node = declare.body[:3]
+        self.assertIsNone(global_assign.slot)
+        self.assertEqual(global_assign.value_node.slot, 0)
+        self.assertEqual(local_assign.slot, 2)
+        # Names only read in the function are looked up among the globals.
+        self.assertEqual(return_node.node.access_node.slot, 2)
+        self.assertIsNone(return_node.node.key.slot)
+
+    def test_call_contexts_reused(self) -> None:
+        text: str = "f(x) {\n    y := x * 2\n    return y\n}\na := f(1)\nb := f(2)\n"
+        for engine_class in main.ENGINES.values():
+            with self.subTest(engine=engine_class.__name__):
+                context: Context = Context("<module>")
+                context.symbol_table = SymbolTable({})
+                _, nodes = parse_nodes(text, "<test>", context)
+                resolve(nodes)
+                engine: Any = engine_class()
+                for node in nodes:
+                    self.assertIsNone(engine.visit(node, context).error)
+                self.assertEqual(context.symbol_table.get("b").value, 4)
+                # Both calls ran in the same context, released with its frame.
+                self.assertEqual(len(engine.free_contexts), 1)
+                self.assertIsNone(engine.free_contexts[0].frame)
+
 
 class TestComments(unittest.TestCase):
     def test_debug_line_comment(self) -> None:
@@ -486,5 +679,496 @@ class TestErrors(unittest.TestCase):
         self.assertEqual(stderr.decode("UTF-8"), expected_result)
 
 
+def get_token_stream(
+    lexer: Lexer | RegexLexer, compact: bool = False
+) -> tuple[list, tuple | None]:
+    tokens, error = lexer.tokenize(compact)
+    token_stream: list = [
+        (
+            tok.type,
+            type(tok.value),
+            tok.value,
+            tok.pos_start.idx,
+            tok.pos_start.line,
+            tok.pos_end.idx,
+            tok.pos_end.line,
+        )
+        for tok in tokens
+    ]
+    if error is None:
+        return token_stream, None
+    return token_stream, (error.details, error.pos_start.idx, error.pos_start.line)
+
+
+class TestLexer(unittest.TestCase):
+    def assert_same_tokens(self, text: str, file: str) -> None:
+        expected_result = get_token_stream(Lexer(text, file, Context("<module>")))
+        result = get_token_stream(RegexLexer(text, file, Context("<module>")))
+        self.assertEqual(result, expected_result)
+
+    def test_regex_lexer_files(self) -> None:
+        for file in sorted(glob.glob("tests/**/*.ahk", recursive=True)):
+            with open(file) as f:
+                text: str = f.read()
+            with self.subTest(file=file):
+                self.assert_same_tokens(text, file)
+
+    def test_regex_lexer_edge_cases(self) -> None:
+        for text in LEXER_EDGE_CASES:
+            with self.subTest(text=text):
+                self.assert_same_tokens(text, "<test>")
+
+    def test_escapes_resolved_when_lexed(self) -> None:
+        text: str = 'x := "a`tb""`n``n"\ny = c`rd\n'
+        for lexer_class in (Lexer, RegexLexer):
+            with self.subTest(lexer=lexer_class.__name__):
+                tokens, _ = lexer_class(text, "<test>", Context("<module>")).tokenize()
+                values: list[Any] = [
+                    tok.value for tok in tokens if tok.type in (T_STRING, T_U_STRING)
+                ]
+                self.assertEqual(values, ['a\tb"\n`\n', " c\rd"])
+
+    def test_regex_lexer_cli(self) -> None:
+        file: str = "tests/variable/expr.ahk"
+        proc: subprocess.Popen[bytes] = subprocess.Popen(
+            BASE_DEBUG_CMD.format(file).split() + ["--no-cache"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        expected_result: tuple[bytes, bytes] = proc.communicate()
+        proc = subprocess.Popen(
+            BASE_DEBUG_CMD.format(file).split() + ["--no-cache", "--lexer", "regex"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self.assertEqual(proc.communicate(), expected_result)
+
+    def test_compact_tokens(self) -> None:
+        files: list[str] = sorted(glob.glob("tests/**/*.ahk", recursive=True))
+        for file in files:
+            with open(file) as f:
+                text: str = f.read()
+            for lexer_class in (Lexer, RegexLexer):
+                with self.subTest(file=file, lexer=lexer_class.__name__):
+                    expected_result = get_token_stream(
+                        lexer_class(text, file, Context("<module>"))
+                    )
+                    result = get_token_stream(
+                        lexer_class(text, file, Context("<module>")), compact=True
+                    )
+                    self.assertEqual(result, expected_result)
+
+    def test_compact_tokens_cli(self) -> None:
+        file: str = "tests/variable/expr.ahk"
+        proc: subprocess.Popen[bytes] = subprocess.Popen(
+            BASE_DEBUG_CMD.format(file).split() + ["--no-cache"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        expected_result: tuple[bytes, bytes] = proc.communicate()
+        proc = subprocess.Popen(
+            BASE_DEBUG_CMD.format(file).split() + ["--no-cache", "--compact-tokens"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self.assertEqual(proc.communicate(), expected_result)
+
+    def test_token_stream(self) -> None:
+        for text in LEXER_EDGE_CASES:
+            for lexer_class in (Lexer, RegexLexer):
+                with self.subTest(text=text, lexer=lexer_class.__name__):
+                    tokens, error = lexer_class(
+                        text, "<test>", Context("<module>")
+                    ).tokenize()
+                    stream: TokenStream = TokenStream(
+                        lexer_class(text, "<test>", Context("<module>")).iter_tokens(),
+                        window=2,
+                    )
+                    streamed: list = []
+                    idx: int = 0
+                    while idx < len(stream):
+                        streamed.append((stream[idx].type, stream[idx].value))
+                        idx += 1
+                    if error is None:
+                        self.assertIsNone(stream.error)
+                        self.assertEqual(
+                            streamed, [(tok.type, tok.value) for tok in tokens]
+                        )
+                    else:
+                        self.assertEqual(stream.error.details, error.details)
+                        self.assertEqual(streamed[-1][0], "EOF")
+                    with self.assertRaises(IndexError):
+                        stream[0]
+
+
+def parse_nodes(text: str, file: str, context: Context) -> tuple[Lexer, list]:
+    lexer: Lexer = Lexer(text, file, context)
+    tokens, _ = lexer.tokenize()
+    ast, _ = Parser(tokens, context).parse()
+    return lexer, [res.node for res in ast]
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.cache: ASTCache = ASTCache(self.cache_dir.name)
+
+    def tearDown(self) -> None:
+        self.cache_dir.cleanup()
+
+    def test_cache_round_trip(self) -> None:
+        file: str = "tests/functions/declare.ahk"
+        with open(file) as f:
+            text: str = f.read()
+        context: Context = Context("<module>")
+        self.assertIsNone(self.cache.load(text, file, context))
+        lexer, nodes = parse_nodes(text, file, context)
+        self.cache.store(text, lexer.source, context, nodes)
+        cached_nodes = self.cache.load(text, "other.ahk", Context("<module>"))
+        self.assertEqual(repr(cached_nodes), repr(nodes))
+        self.assertEqual(cached_nodes[0].pos_start.filename, "other.ahk")
+
+    def test_cache_slotted_nodes(self) -> None:
+        text: str = 'x := [1, "a", y]\nf(x.1 + 2 * -x.2)\n'
+        context: Context = Context("<module>")
+        lexer, nodes = parse_nodes(text, "<test>", context)
+        self.cache.store(text, lexer.source, context, nodes)
+        cached_nodes = self.cache.load(text, "<test>", Context("<module>"))
+        for node, cached_node in zip(nodes, cached_nodes):
+            self.assertFalse(hasattr(cached_node, "__dict__"))
+            self.assertFalse(hasattr(cached_node.pos_start, "__dict__"))
+            self.assertEqual(cached_node.pos_start.idx, node.pos_start.idx)
+            self.assertEqual(cached_node.pos_end.line, node.pos_end.line)
+
+    def test_cache_corrupt_entry(self) -> None:
+        text: str = "x := 10\n"
+        path: str = self.cache.get_path(text)
+        with open(path, "wb") as f:
+            f.write(b"not a pickle")
+        self.assertIsNone(self.cache.load(text, "<test>", Context("<module>")))
+        self.assertFalse(os.path.exists(path))
+
+    def test_cache_eviction(self) -> None:
+        texts: list[str] = ["x := {}\n".format(value) for value in range(4)]
+        for idx, text in enumerate(texts):
+            context: Context = Context("<module>")
+            lexer, nodes = parse_nodes(text, "<test>", context)
+            self.cache.store(text, lexer.source, context, nodes)
+            # Spread the mtimes so the least recently used entry is well defined.
+            os.utime(self.cache.get_path(text), (idx, idx))
+        self.cache.max_bytes = os.path.getsize(self.cache.get_path(texts[-1])) * 2
+        self.cache.evict()
+        remaining: list[bool] = [
+            os.path.exists(self.cache.get_path(text)) for text in texts
+        ]
+        self.assertEqual(remaining, [False, False, True, True])
+
+    def test_cache_eviction_shared_with_code(self) -> None:
+        # Parsed scripts and code objects share the directory and its limit.
+        text: str = "x := 1\n"
+        context: Context = Context("<module>")
+        lexer, nodes = parse_nodes(text, "<test>", context)
+        self.cache.store(text, lexer.source, context, nodes)
+        ast_path: str = self.cache.get_path(text)
+        os.utime(ast_path, (0, 0))
+        code_cache: CodeCache = CodeCache(self.cache_dir.name)
+        code_cache.store_code(text, "<test>", 0, compile("y = 2", "<test>", "exec"))
+        code_path: str = code_cache.get_code_path(text, "<test>", 0)
+        # Either entry fits on its own, both together do not.
+        self.cache.max_bytes = (
+            os.path.getsize(ast_path) + os.path.getsize(code_path) - 1
+        )
+        self.cache.evict()
+        self.assertFalse(os.path.exists(ast_path))
+        self.assertTrue(os.path.exists(code_path))
+
+    def test_no_cache_cli(self) -> None:
+        file: str = "tests/arithmetic/add.ahk"
+        env: dict[str, str] = dict(os.environ, XDG_CACHE_HOME=self.cache_dir.name)
+        subprocess.run(
+            BASE_CMD.format(file).split() + ["--no-cache"],
+            env=env,
+            capture_output=True,
+        )
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
+        subprocess.run(BASE_CMD.format(file).split(), env=env, capture_output=True)
+        cache_entries: list[str] = os.listdir(
+            os.path.join(self.cache_dir.name, "ahklinux")
+        )
+        self.assertEqual(len(cache_entries), 1)
+
+
+def get_node_lines(nodes: list) -> list[tuple[str, int | None, int | None]]:
+    return [
+        (
+            repr(node),
+            node.pos_start.line if node.pos_start else None,
+            node.pos_end.line if node.pos_end else None,
+        )
+        for node in nodes
+    ]
+
+
+class TestIncremental(unittest.TestCase):
+    def test_incremental_files(self) -> None:
+        for file in sorted(glob.glob("tests/**/*.ahk", recursive=True)):
+            with open(file) as f:
+                text: str = f.read()
+            context: Context = Context("<module>")
+            tokens, error = RegexLexer(text, file, context).tokenize()
+            if error:
+                continue
+            with self.subTest(file=file):
+                ast, _ = Parser(tokens, context).parse()
+                document: IncrementalDocument = IncrementalDocument(
+                    text, file, Context("<module>")
+                )
+                self.assertEqual(
+                    get_node_lines(document.nodes),
+                    get_node_lines([res.node for res in ast]),
+                )
+
+    def test_incremental_edits(self) -> None:
+        text: str = (
+            "a := 1\n"
+            "f(x) {\n"
+            "    return x\n"
+            "}\n"
+            "if (a = 1) {\n"
+            "    b := 2\n"
+            "}\n"
+            "c := 3\n"
+        )
+        edits: list[tuple[str, str]] = [
+            ("a := 1\n", "a := 10\nz := 5\n"),
+            ("    return x\n", "    y := x * 2\n    return y\n"),
+            ("    b := 2\n}\n", "    b := 2\n}\nelse {\n    b := 4\n}\n"),
+            ("{\n    b := 2", "{\n    b := (2"),
+            ("f(x) {\n", ""),
+        ]
+        document: IncrementalDocument = IncrementalDocument(
+            text, "<test>", Context("<module>")
+        )
+        for old, new in edits:
+            with self.subTest(old=old, new=new):
+                last_chunk = document.chunks[-1]
+                start: int = text.index(old)
+                document.edit(start, start + len(old), new)
+                text = text[:start] + new + text[start + len(old) :]
+                expected: IncrementalDocument = IncrementalDocument(
+                    text, "<test>", Context("<module>")
+                )
+                self.assertEqual(document.text, text)
+                self.assertEqual(
+                    get_node_lines(document.nodes), get_node_lines(expected.nodes)
+                )
+                # The last statement is never touched and must be reused.
+                self.assertIs(document.chunks[-1], last_chunk)
+
+    def test_newline_edit_leaves_later_chunks(self) -> None:
+        text: str = "".join("v{0} := {0}\n".format(idx) for idx in range(10000))
+        document: IncrementalDocument = IncrementalDocument(
+            text, "<test>", Context("<module>")
+        )
+        last_chunk: Any = document.chunks[-1]
+        document.edit(0, 0, "w := 0\n\n")
+        # Nothing past the edited chunks was visited to shift its line, the line
+        # is only worked out once a position asks for it.
+        self.assertLessEqual(document.valid, 2)
+        self.assertEqual(last_chunk.source.first_line, 10000)
+        self.assertEqual(last_chunk.nodes[0].pos_start.line, 10002)
+        self.assertEqual(document.valid, len(document.chunks))
+        expected: IncrementalDocument = IncrementalDocument(
+            document.text, "<test>", Context("<module>")
+        )
+        self.assertEqual(get_node_lines(document.nodes), get_node_lines(expected.nodes))
+
+
+class TestEngines(unittest.TestCase):
+    def assert_same_output(self, engine: str) -> None:
+        for file in sorted(glob.glob("tests/**/*.ahk", recursive=True)):
+            with self.subTest(file=file):
+                proc: subprocess.Popen[bytes] = subprocess.Popen(
+                    BASE_DEBUG_CMD.format(file).split(),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+                expected_result: tuple[bytes, bytes] = proc.communicate()
+                proc = subprocess.Popen(
+                    BASE_DEBUG_CMD.format(file).split() + ["--engine", engine],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+                self.assertEqual(proc.communicate(), expected_result)
+
+    def test_closure_engine_cli(self) -> None:
+        self.assert_same_output("closure")
+
+    def test_closure_engine_compiles_function_bodies(self) -> None:
+        text: str = (
+            "f(x) {\n    y := x * 2\n    return y + 1\n}\na := f(1)\nb := f(2)\n"
+        )
+        context: Context = Context("<module>")
+        context.symbol_table = SymbolTable({})
+        _, nodes = parse_nodes(text, "<test>", context)
+        engine: ClosureCompiler = ClosureCompiler()
+        for node in nodes:
+            self.assertIsNone(engine.visit(node, context).error)
+        self.assertEqual(context.symbol_table.get("b").value, 5)
+        # Only the function body is compiled, module level code runs once.
+        for statement in nodes[0].body:
+            self.assertIn(statement, engine.compiled)
+        for node in nodes:
+            self.assertNotIn(node, engine.compiled)
+
+    def test_vm_engine_cli(self) -> None:
+        self.assert_same_output("vm")
+
+    def test_vm_engine_caches_function_bodies(self) -> None:
+        text: str = (
+            "f(x) {\n    y := x * 2\n    return y + 1\n}\na := f(1)\nb := f(2)\n"
+        )
+        context: Context = Context("<module>")
+        context.symbol_table = SymbolTable({})
+        _, nodes = parse_nodes(text, "<test>", context)
+        engine: VirtualMachine = VirtualMachine()
+        for node in nodes:
+            self.assertIsNone(engine.visit(node, context).error)
+        self.assertEqual(context.symbol_table.get("b").value, 5)
+        self.assertEqual(len(engine.bodies), 1)
+
+    def test_disassemble(self) -> None:
+        text: str = "f(x) {\n    if (x) {\n        return x + 1\n    }\n}\n"
+        _, nodes = parse_nodes(text, "<test>", Context("<module>"))
+        listing: str = disassemble(Compiler().compile_body(nodes[0].body, "f"))
+        self.assertEqual(
+            [line.split()[1] for line in listing.splitlines()[1:]],
+            [
+                "LOAD_NAME",
+                "POP_JUMP_IF_FALSE",
+                "CHECK_RETURN",
+                "LOAD_NAME",
+                "CHECK_NUMBER",
+                "MAKE_NUMBER",
+                "BINARY_ARITHMETIC",
+                "POP_RESULT",
+                "PUSH_NONE",
+                "JUMP",
+                "PUSH_NONE",
+                "POP_RESULT",
+                "MAKE_EMPTY_STRING",
+                "RETURN_VALUE",
+            ],
+        )
+        self.assertIn("LOAD_NAME                   0 ('x')", listing)
+
+    def test_disassemble_resolved(self) -> None:
+        text: str = "f(x) {\n    global g := x\n    y := g\n}\n"
+        _, nodes = parse_nodes(text, "<test>", Context("<module>"))
+        resolve(nodes)
+        listing: str = disassemble(Compiler().compile_body(nodes[0].body, "f"))
+        self.assertEqual(
+            [line.split()[1] for line in listing.splitlines()[1:6]],
+            ["LOAD_FAST", "STORE_NAME", "POP_RESULT", "LOAD_NAME", "STORE_FAST"],
+        )
+        self.assertIn("STORE_FAST                  4 (1, 'y')", listing)
+
+    def test_python_engine_cli(self) -> None:
+        self.assert_same_output("python")
+
+    def test_transpiled_code_lines(self) -> None:
+        text: str = "f(x) {\n    y := x * 2\n\n    return y + 1\n}\n"
+        _, nodes = parse_nodes(text, "script.ahk", Context("<module>"))
+        body: list = nodes[0].body
+        code = Transpiler(flatten(body)).compile_body(body, "script.ahk")
+        function_code = code.co_consts[0]
+        self.assertEqual(function_code.co_filename, "script.ahk")
+        lines: set = {line for _, _, line in function_code.co_lines()}
+        self.assertEqual(lines - {None, 1}, {2, 4})
+
+    def test_python_engine_code_cache(self) -> None:
+        text: str = (
+            "f(x) {\n    y := x * 2\n    return y + 1\n}\na := f(1)\nb := f(2)\n"
+        )
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for _ in range(2):
+                context: Context = Context("<module>")
+                context.symbol_table = SymbolTable({})
+                _, nodes = parse_nodes(text, "<test>", context)
+                engine: PythonEngine = PythonEngine(CodeCache(cache_dir))
+                for node in nodes:
+                    self.assertIsNone(engine.visit(node, context).error)
+                self.assertEqual(context.symbol_table.get("b").value, 5)
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_quiet_engines(self) -> None:
+        text: str = (
+            "f(x) {\n    y := x * 2\n    if (y) {\n        z := y\n    }\n"
+            "    return y + 1\n}\na := f(1)\nb := f(2)\n"
+        )
+        call: str = "f(3)\n"
+        for name, engine_class in main.ENGINES.items():
+            with self.subTest(engine=name):
+                context: Context = Context("<module>")
+                context.symbol_table = SymbolTable({})
+                _, nodes = parse_nodes(text + call, "<test>", context)
+                resolve(nodes)
+                engine: Any = engine_class()
+                for node in nodes[:-1]:
+                    result: Any = engine.visit(node, context)
+                    self.assertIsNone(result.error)
+                    self.assertIsNone(result.value)
+                self.assertEqual(context.symbol_table.get("b").value, 5)
+                # A call is only worth its return value.
+                self.assertEqual(
+                    [value.value for value in engine.visit(nodes[-1], context).value],
+                    [7],
+                )
+
+    def test_json_trace(self) -> None:
+        text: str = "f(x) {\n    y := x\n    return y\n}\na := f(1)\nMsgBox % a\n"
+        for name, engine_class in main.ENGINES.items():
+            with self.subTest(engine=name):
+                context: Context = Context("<module>")
+                context.symbol_table = SymbolTable({})
+                _, nodes = parse_nodes(text, "<test>", context)
+                resolve(nodes)
+                output: io.StringIO = io.StringIO()
+                engine: Any = engine_class(trace=JsonLinesSink(output))
+                for node in nodes:
+                    self.assertIsNone(engine.visit(node, context).error)
+                events: list[dict] = [
+                    json.loads(line) for line in output.getvalue().splitlines()
+                ]
+                self.assertEqual(
+                    [event["event"] for event in events],
+                    ["declare", "call", "assign", "return", "assign", "command"],
+                )
+                self.assertEqual(
+                    events[2],
+                    {
+                        "event": "assign",
+                        "scope": "f",
+                        "file": "<test>",
+                        "line": 2,
+                        "name": "y",
+                        "value": "1",
+                    },
+                )
+                self.assertEqual(events[3]["value"], "1")
+                self.assertEqual(events[5]["text"], "1")
+
+    def test_text_trace_discards_failed_statement(self) -> None:
+        sink: TextSink = TextSink()
+        sink.emit(TraceEvent(DECLARE, "<module>", None, None, name="f"))
+        sink.emit(TraceEvent(RESULT, "<module>", None, None, value=[[1], 2]))
+        self.assertEqual(
+            sink.lines, ["Function with name 'f' has been declared.", "1", "2"]
+        )
+        sink.discard()
+        sink.flush()
+        self.assertEqual(sink.lines, [])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -95,8 +95,6 @@ def make_msgbox(title: Any, text: Any, option: Any, timeout: Any) -> int:
     root.title(title)
     root.after(1000 * timeout, root.destroy)
     root.resizable(False, False)
-    if isinstance(option, str):
-        option = int(option, base=16)
     groups: str | None = ALL_COMBINATIONS.get(option, None)
     if groups is None:
         return 1